@@ -0,0 +1,201 @@
+"""
+Merkle tree tooling for MerkleDistributor airdrops.
+
+    ./kiwi.py airdrop build payouts.csv airdrop.bin     # prints the root
+    ./kiwi.py airdrop proof airdrop.bin 0x...           # claim arguments as JSON
+
+Leaves are keccak256(abi.encode(index, account, amount)) in CSV order and
+pairs are hashed sorted, as MerkleDistributor.claim verifies them. Preimages
+and pair ordering are built for a whole tree level at once with NumPy, so
+the per-node work left in Python is the keccak call itself.
+
+The tree file stores every level instead of one proof per leaf, which keeps
+it at 140 bytes per recipient. It is read through mmap, so a lookup
+touches only the pages of one leaf and its siblings:
+
+    header      magic, version, count, root
+    leaves      count x (account 20 bytes, amount 32 bytes), by index
+    lookup      count x (account 20 bytes, index 4 bytes), sorted by account
+    levels      count, ceil(count / 2), ... 1 nodes of 32 bytes, leaves first
+"""
+import csv
+import mmap
+import struct
+
+import numpy as np
+from eth_hash.auto import keccak
+from eth_utils import to_checksum_address
+
+MAGIC = b"KIWIDROP"
+VERSION = 1
+HEADER = struct.Struct(">8sBI32s")
+LEAF_SIZE = 52
+LOOKUP_SIZE = 24
+
+
+def read_recipients(path):
+    """
+    Reads `address,amount` rows from a CSV file.
+    """
+
+    accounts, amounts = [], []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            accounts.append(bytes.fromhex(row[0].strip()[2:]))
+            amounts.append(int(row[1]))
+    return accounts, amounts
+
+
+def leaf_hashes(accounts, amounts):
+    """
+    Leaf hashes as an (n, 32) uint8 array.
+    """
+
+    count = len(accounts)
+    preimages = np.zeros((count, 96), dtype=np.uint8)
+    preimages[:, 24:32] = np.arange(count, dtype=">u8").view(np.uint8).reshape(count, 8)
+    preimages[:, 44:64] = np.frombuffer(b"".join(accounts), dtype=np.uint8).reshape(count, 20)
+    preimages[:, 64:96] = np.frombuffer(b"".join(a.to_bytes(32, "big") for a in amounts), dtype=np.uint8).reshape(count, 32)
+    return _hash_rows(preimages)
+
+
+def _hash_rows(rows):
+    data = rows.tobytes()
+    width = rows.shape[1]
+    digests = b"".join(keccak(data[i:i + width]) for i in range(0, len(data), width))
+    return np.frombuffer(digests, dtype=np.uint8).reshape(len(rows), 32)
+
+
+def parent_level(level):
+    """
+    Hashes sorted pairs of a level; a last node without a sibling moves up unchanged.
+    """
+
+    pairs = len(level) // 2
+    left, right = level[0:2 * pairs:2], level[1:2 * pairs:2]
+    # Lexicographic left < right, decided by the first differing byte
+    first = (left != right).argmax(axis=1)
+    rows = np.arange(pairs)
+    ordered = (left[rows, first] < right[rows, first])[:, None]
+    preimages = np.where(ordered, np.hstack([left, right]), np.hstack([right, left]))
+    parents = _hash_rows(preimages)
+    if len(level) % 2:
+        parents = np.vstack([parents, level[-1:]])
+    return parents
+
+
+def build_tree(accounts, amounts):
+    """
+    All levels of the tree, leaves first, the root level last.
+    """
+
+    if not accounts:
+        raise ValueError("Airdrop has no recipients.")
+    if len(accounts) != len(amounts):
+        raise ValueError("Accounts and amounts length mismatch.")
+
+    levels = [leaf_hashes(accounts, amounts)]
+    while len(levels[-1]) > 1:
+        levels.append(parent_level(levels[-1]))
+    return levels
+
+
+def write_tree(path, accounts, amounts):
+    """
+    Builds the tree and writes it to path, returns the root.
+    """
+
+    levels = build_tree(accounts, amounts)
+    root = levels[-1][0].tobytes()
+    lookup = sorted((account, index) for index, account in enumerate(accounts))
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(accounts), root))
+        f.write(b"".join(account + amount.to_bytes(32, "big") for account, amount in zip(accounts, amounts)))
+        f.write(b"".join(account + index.to_bytes(4, "big") for account, index in lookup))
+        for level in levels:
+            f.write(level.tobytes())
+    return root
+
+
+def verify(root, index, account, amount, proof):
+    node = keccak(index.to_bytes(32, "big") + bytes(12) + bytes.fromhex(account[2:]) + amount.to_bytes(32, "big"))
+    for sibling in proof:
+        node = keccak(node + sibling if node < sibling else sibling + node)
+    return node == root
+
+
+class ProofFile:
+    """
+    Memory-mapped tree file written by write_tree.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.root = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an airdrop tree file.")
+
+        self._lookup = HEADER.size + self.count * LEAF_SIZE
+        self._levels = []
+        offset, size = self._lookup + self.count * LOOKUP_SIZE, self.count
+        while True:
+            self._levels.append((offset, size))
+            if size == 1:
+                break
+            offset, size = offset + size * 32, (size + 1) // 2
+
+    def leaf(self, index):
+        """
+        (account, amount) of a leaf.
+        """
+
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        start = HEADER.size + index * LEAF_SIZE
+        record = self._map[start:start + LEAF_SIZE]
+        return to_checksum_address(record[:20]), int.from_bytes(record[20:], "big")
+
+    def proof(self, index):
+        siblings = []
+        for offset, size in self._levels[:-1]:
+            sibling = index ^ 1
+            if sibling < size:
+                siblings.append(self._map[offset + sibling * 32:offset + sibling * 32 + 32])
+            index //= 2
+        return siblings
+
+    def find(self, account):
+        """
+        Index of the first leaf of an account, or None.
+        """
+
+        target = bytes.fromhex(account[2:].lower())
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            start = self._lookup + middle * LOOKUP_SIZE
+            if self._map[start:start + 20] < target:
+                low = middle + 1
+            else:
+                high = middle
+        start = self._lookup + low * LOOKUP_SIZE
+        if low < self.count and self._map[start:start + 20] == target:
+            return int.from_bytes(self._map[start + 20:start + 24], "big")
+        return None
+
+    def claim(self, account):
+        """
+        Arguments of MerkleDistributor.claim for an account.
+        """
+
+        index = self.find(account)
+        if index is None:
+            raise KeyError(f"{account} is not in the airdrop.")
+        account, amount = self.leaf(index)
+        return {"index": index, "account": account, "amount": amount, "proof": ["0x" + p.hex() for p in self.proof(index)]}
+
+    def close(self):
+        self._map.close()
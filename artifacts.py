@@ -0,0 +1,117 @@
+"""
+Content-addressed cache of compiled contract artifacts.
+
+An artifact is stored under the sha256 of the compiler version and the
+sources it is built from (the contract and the contracts it imports), so a
+contract is recompiled only when one of those changes.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+CONTRACTS_FOLDER = ROOT / "contracts"
+CACHE_FOLDER = ROOT / ".kiwi-cache"
+
+VERSION_PRAGMA = re.compile(r"^#\s*@version\s+([\w.]+)", re.MULTILINE)
+IMPORT = re.compile(r"^import\s+(\w+)\s+as\s+\w+", re.MULTILINE)
+
+
+def compiler_version(source):
+    match = VERSION_PRAGMA.search(source)
+    if match is None:
+        raise ValueError("Contract has no `# @version` pragma.")
+    return match.group(1)
+
+
+def compiler(version):
+    """
+    Path of the vyper binary for a version: $VYPER, the vvm install used by ape, or vyper on PATH.
+    """
+
+    if os.environ.get("VYPER"):
+        return os.environ["VYPER"]
+    vvm = Path.home() / ".vvm" / f"vyper-{version}"
+    if vvm.exists():
+        return str(vvm)
+    return shutil.which("vyper") or "vyper"
+
+
+class ArtifactCache:
+    """
+    Loads contract artifacts, compiling only on a cache miss.
+    Artifacts have the shape of ape's ContractType JSON (abi, deploymentBytecode,
+    runtimeBytecode) and are parsed only when requested.
+    """
+
+    def __init__(self, contracts_folder=CONTRACTS_FOLDER, cache_folder=CACHE_FOLDER):
+        self.contracts_folder = Path(contracts_folder)
+        self.cache_folder = Path(cache_folder)
+        self.compiled = []
+        self._loaded = {}
+
+    def _sources(self, name, seen=None):
+        seen = seen if seen is not None else {}
+        if name not in seen:
+            seen[name] = (self.contracts_folder / f"{name}.vy").read_bytes()
+            for imported in IMPORT.findall(seen[name].decode()):
+                self._sources(imported, seen)
+        return seen
+
+    def key(self, name):
+        sources = self._sources(name)
+        digest = hashlib.sha256(compiler_version(sources[name].decode()).encode())
+        for source_name in sorted(sources):
+            digest.update(source_name.encode() + b"\0" + hashlib.sha256(sources[source_name]).digest())
+        return digest.hexdigest()
+
+    def path(self, name):
+        return self.cache_folder / f"{name}-{self.key(name)}.json"
+
+    def compile(self, name):
+        source = (self.contracts_folder / f"{name}.vy").read_text()
+        result = subprocess.run(
+            [compiler(compiler_version(source)), "-f", "abi,bytecode,bytecode_runtime", "-p", str(self.contracts_folder), f"{name}.vy"],
+            cwd=self.contracts_folder,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Compiling {name} failed:\n{result.stderr.strip()}")
+        output = result.stdout.splitlines()
+        self.compiled.append(name)
+        return {
+            "contractName": name,
+            "abi": json.loads(output[0]),
+            "deploymentBytecode": {"bytecode": output[1]},
+            "runtimeBytecode": {"bytecode": output[2]},
+        }
+
+    def load(self, name):
+        if name in self._loaded:
+            return self._loaded[name]
+
+        path = self.path(name)
+        if path.exists():
+            artifact = json.loads(path.read_text())
+        else:
+            artifact = self.compile(name)
+            self.cache_folder.mkdir(parents=True, exist_ok=True)
+            for stale in self.cache_folder.glob(f"{name}-*.json"):
+                stale.unlink()
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(artifact))
+            os.replace(tmp, path)
+
+        self._loaded[name] = artifact
+        return artifact
+
+    def contracts(self):
+        # A source without a version pragma has nothing to compile yet
+        return sorted(
+            path.stem for path in self.contracts_folder.glob("*.vy") if VERSION_PRAGMA.search(path.read_text())
+        )
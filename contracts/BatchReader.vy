@@ -0,0 +1,78 @@
+# @version 0.3.7
+
+"""
+@title KiwiNative Batch Reader
+@license MIT
+@notice Stateless view contract reading Token state for many addresses in one eth_call.
+"""
+
+import Token as Token
+
+struct AccountState:
+    tokenBalance: uint256
+    blacklisted: bool
+    minter: bool
+    nonce: uint256
+
+
+@view
+@external
+def accounts(_token: address, _holders: DynArray[address, 1000]) -> DynArray[AccountState, 1000]:
+    """
+    @notice Balance, blacklist flag, minter flag and permit nonce of every holder.
+    @param _token The token address.
+    @param _holders The addresses to read.
+    @return One AccountState per holder, in order.
+    """
+
+    token: Token = Token(_token)
+    states: DynArray[AccountState, 1000] = []
+    for holder in _holders:
+        states.append(
+            AccountState({
+                tokenBalance: token.balanceOf(holder),
+                blacklisted: token.blackListAddresses(holder),
+                minter: token.isMinter(holder),
+                nonce: token.nonces(holder),
+            })
+        )
+    return states
+
+
+@view
+@external
+def balances(_token: address, _holders: DynArray[address, 1000]) -> DynArray[uint256, 1000]:
+    """
+    @notice Balance of every holder.
+    @param _token The token address.
+    @param _holders The addresses to read.
+    @return One balance per holder, in order.
+    """
+
+    token: Token = Token(_token)
+    amounts: DynArray[uint256, 1000] = []
+    for holder in _holders:
+        amounts.append(token.balanceOf(holder))
+    return amounts
+
+
+@view
+@external
+def allowances(_token: address, _owners: DynArray[address, 1000], _spenders: DynArray[address, 1000]) -> DynArray[uint256, 1000]:
+    """
+    @notice Allowance of every (owner, spender) pair.
+    @param _token The token address.
+    @param _owners The token owners.
+    @param _spenders The spenders, one per owner.
+    @return One allowance per pair, in order.
+    """
+
+    assert len(_owners) == len(_spenders), "Owners and spenders length mismatch."
+
+    token: Token = Token(_token)
+    amounts: DynArray[uint256, 1000] = []
+    i: uint256 = 0
+    for owner in _owners:
+        amounts.append(token.allowance(owner, _spenders[i]))
+        i += 1
+    return amounts
@@ -8,6 +8,8 @@ kiwinativeToken: public(Token)    # $KIWINATIVE
 wallet: public(address)     # Address where the funds are collected
 rate: public(uint256)       # How many token units a buyer gets per Wei (10-18 or 0.000000000000000001 BNB)
 weiRaised: public(uint256)
+inventoryMode: public(bool)  # Serve purchases from tokens held by the Crowdsale
+settlementThreshold: public(uint256)  # Wei held before sweeping to wallet, 0 forwards every purchase
 
 # Events
 event TokenPurchase:
@@ -19,6 +21,20 @@ event TokenPurchase:
 event UpdateRate:
     rate: uint256
 
+event UpdateInventoryMode:
+    enabled: bool
+
+event UpdateSettlementThreshold:
+    threshold: uint256
+
+event Sweep:
+    wallet: indexed(address)
+    value: uint256
+
+event OwnershipTransferred:
+    previousOwner: indexed(address)
+    newOwner: indexed(address)
+
 owner: public(address)
 
 
@@ -57,6 +73,110 @@ def updateRate(_rate: uint256) -> bool:
     return True
 
 
+@external
+def setInventoryMode(_enabled: bool) -> bool:
+    """
+    @notice
+        Function to switch between selling from the Crowdsale's own token inventory
+        and pulling tokens from the token owner with transferFrom.
+    @param _enabled True to sell from inventory.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    self.inventoryMode = _enabled
+
+    log UpdateInventoryMode(_enabled)
+
+    return True
+
+
+@external
+def depositInventory(_amount: uint256) -> bool:
+    """
+    @notice
+        Function to top up the token inventory from the owner's wallet.
+        The owner must have approved the Crowdsale for _amount first.
+    @param _amount The amount of tokens to deposit.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert self.kiwinativeToken.transferFrom(msg.sender, self, _amount)
+
+    return True
+
+
+@external
+def withdrawInventory(_amount: uint256) -> bool:
+    """
+    @notice Function to withdraw unsold tokens from the inventory to the owner.
+    @param _amount The amount of tokens to withdraw.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert self.kiwinativeToken.transfer(msg.sender, _amount)
+
+    return True
+
+
+@view
+@external
+def inventory() -> uint256:
+    """
+    @notice Function to get the amount of tokens left in the inventory.
+    @return Number of kiwinative tokens held by the Crowdsale.
+    """
+
+    return self.kiwinativeToken.balanceOf(self)
+
+
+@external
+def updateSettlementThreshold(_threshold: uint256) -> bool:
+    """
+    @notice
+        Function to update the settlement threshold.
+        Raised funds are held by the Crowdsale and swept to wallet once they reach it.
+    @param _threshold The new threshold in wei, 0 to forward every purchase to wallet.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    self.settlementThreshold = _threshold
+
+    log UpdateSettlementThreshold(_threshold)
+
+    return True
+
+
+@internal
+def _sweep():
+    """
+    @notice Internal function to forward all held funds to wallet.
+    """
+
+    amount: uint256 = self.balance
+    if amount > 0:
+        wallet: address = self.wallet
+        raw_call(wallet, b"", value=amount)
+
+        log Sweep(wallet, amount)
+
+
+@external
+def sweep() -> bool:
+    """
+    @notice Function to forward all held funds to wallet.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    self._sweep()
+
+    return True
+
+
 @view
 @internal
 def _getTokenAmount(_weiAmount: uint256) -> uint256:
@@ -84,11 +204,18 @@ def _buyTokens(_beneficiary: address, _weiAmount: uint256) -> bool:
 
     self.weiRaised += _weiAmount
 
-    assert self.kiwinativeToken.transferFrom(self.kiwinativeToken.owner(), _beneficiary, kiwinative)
+    if self.inventoryMode:
+        assert self.kiwinativeToken.transfer(_beneficiary, kiwinative)
+    else:
+        assert self.kiwinativeToken.transferFrom(self.kiwinativeToken.owner(), _beneficiary, kiwinative)
 
     log TokenPurchase(msg.sender, _beneficiary, _weiAmount, kiwinative)
 
-    send(self.wallet, _weiAmount)
+    threshold: uint256 = self.settlementThreshold
+    if threshold == 0:
+        send(self.wallet, _weiAmount)
+    elif self.balance >= threshold:
+        self._sweep()
     return True
 
 
@@ -113,6 +240,20 @@ def __default__():
     self._buyTokens(msg.sender, msg.value)
 
 
+@external
+def transferOwnership(newOwner: address) -> bool:
+    """
+    @notice Transfers crowdsale ownership
+    @param  newOwner The address to transfer crowdsale ownership to.
+    @return True, if transaction completes successfully
+    """
+    assert msg.sender == self.owner, "Access is denied."
+    assert newOwner != empty(address), "Cannot add zero address as new owner."
+    log OwnershipTransferred(self.owner, newOwner)
+    self.owner = newOwner
+    return True
+
+
 @external
 def destroy() -> bool:
     """
@@ -121,4 +262,5 @@ def destroy() -> bool:
     """
 
     assert msg.sender == self.owner, "Access is denied."
+    self._sweep()
     selfdestruct(msg.sender)
\ No newline at end of file
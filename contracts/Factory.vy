@@ -0,0 +1,126 @@
+# @version 0.3.7
+
+"""
+@title KiwiNative Launch Factory
+@license MIT
+@notice
+    Launches a Token and its Crowdsale in one transaction from ERC-5202
+    blueprints, at CREATE2 addresses known before the launch. The salt is
+    hashed with the caller, so nobody else can take a partner's addresses.
+    Token keeps its EIP-712 domain in immutables, which minimal proxies would
+    share with the implementation, so both contracts are full deployments.
+"""
+
+import Token as Token
+import Crowdsale as Crowdsale
+
+# Blueprints are deployed with the ERC-5202 preamble 0xFE7100
+BLUEPRINT_OFFSET: constant(uint256) = 3
+
+TOKEN_BLUEPRINT: immutable(address)
+CROWDSALE_BLUEPRINT: immutable(address)
+
+event Launched:
+    owner: indexed(address)
+    token: indexed(address)
+    crowdsale: address
+    salt: bytes32
+
+
+@external
+def __init__(_tokenBlueprint: address, _crowdsaleBlueprint: address):
+    """
+    @notice Constructor, runs at contracts deployment.
+    @param _tokenBlueprint Token blueprint address
+    @param _crowdsaleBlueprint Crowdsale blueprint address
+    """
+
+    assert _tokenBlueprint != empty(address)
+    assert _crowdsaleBlueprint != empty(address)
+    TOKEN_BLUEPRINT = _tokenBlueprint
+    CROWDSALE_BLUEPRINT = _crowdsaleBlueprint
+
+
+@view
+@external
+def tokenBlueprint() -> address:
+    """
+    @notice Gets the Token blueprint.
+    @return address
+    """
+
+    return TOKEN_BLUEPRINT
+
+
+@view
+@external
+def crowdsaleBlueprint() -> address:
+    """
+    @notice Gets the Crowdsale blueprint.
+    @return address
+    """
+
+    return CROWDSALE_BLUEPRINT
+
+
+@pure
+@external
+def launchSalt(_owner: address, _salt: bytes32) -> bytes32:
+    """
+    @notice Gets the CREATE2 salt of both contracts of a launch.
+    @param _owner The account calling launch.
+    @param _salt The salt passed to launch.
+    @return bytes32
+    """
+
+    return keccak256(_abi_encode(_owner, _salt))
+
+
+@external
+def launch(
+    _salt: bytes32,
+    _txfee: uint256,
+    _burnfee: uint256,
+    _feeAddress: address,
+    _wallet: address,
+    _rate: uint256,
+    _saleSupply: uint256,
+) -> (address, address):
+    """
+    @notice
+        Deploys a Token and a Crowdsale selling it, both owned by the caller.
+        The sale supply is moved into the Crowdsale's inventory and the rest of
+        the token supply to the caller, before the fees are set so no fees apply.
+        With a sale supply of 0 the Crowdsale pulls from the caller, who has to
+        approve it first.
+    @param _salt The launch salt, see launchSalt.
+    @param _txfee The txfee
+    @param _burnfee The burnfee
+    @param _feeAddress The address to transfer txfee to.
+    @param _wallet The address where collected funds will be forwarded to
+    @param _rate The number of KWN a buyer gets per wei
+    @param _saleSupply The number of KWN the Crowdsale can sell from its inventory.
+    @return The Token and Crowdsale addresses
+    """
+
+    salt: bytes32 = keccak256(_abi_encode(msg.sender, _salt))
+    token: address = create_from_blueprint(
+        TOKEN_BLUEPRINT, empty(uint256), empty(uint256), self, code_offset=BLUEPRINT_OFFSET, salt=salt
+    )
+    crowdsale: address = create_from_blueprint(
+        CROWDSALE_BLUEPRINT, token, _wallet, _rate, code_offset=BLUEPRINT_OFFSET, salt=salt
+    )
+
+    supply: uint256 = Token(token).totalSupply()
+    if _saleSupply > 0:
+        assert Token(token).transfer(crowdsale, _saleSupply)
+        assert Crowdsale(crowdsale).setInventoryMode(True)
+    if supply > _saleSupply:
+        assert Token(token).transfer(msg.sender, supply - _saleSupply)
+
+    assert Token(token).updateFees(_txfee, _burnfee, _feeAddress)
+    assert Token(token).transferOwnership(msg.sender)
+    assert Crowdsale(crowdsale).transferOwnership(msg.sender)
+
+    log Launched(msg.sender, token, crowdsale, _salt)
+    return token, crowdsale
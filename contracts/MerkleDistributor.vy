@@ -0,0 +1,98 @@
+# @version 0.3.7
+
+"""
+@title KiwiNative Merkle Distributor
+@license MIT
+@notice
+    Airdrop of tokens held by this contract to the leaves of a Merkle tree.
+    A leaf is keccak256(abi.encode(index, account, amount)), pairs are hashed sorted.
+"""
+
+import Token as Token
+
+token: public(Token)
+merkleRoot: public(bytes32)
+owner: public(address)
+
+# One bit per leaf index, 256 claims per storage slot
+claimedBitMap: HashMap[uint256, uint256]
+
+event Claimed:
+    index: uint256
+    account: indexed(address)
+    amount: uint256
+
+
+@external
+def __init__(_token: address, _merkleRoot: bytes32):
+    """
+    @notice Constructor, runs at contracts deployment.
+    @param _token KWN token address
+    @param _merkleRoot Root of the airdrop tree
+    """
+
+    assert _token != empty(address)
+
+    self.owner = msg.sender
+    self.token = Token(_token)
+    self.merkleRoot = _merkleRoot
+
+
+@view
+@external
+def isClaimed(index: uint256) -> bool:
+    """
+    @notice Whether the leaf at index has been claimed.
+    @param index The leaf index.
+    @return True, if the leaf was claimed
+    """
+
+    return (self.claimedBitMap[shift(index, -8)] & shift(1, convert(index % 256, int128))) != 0
+
+
+@external
+def claim(index: uint256, account: address, amount: uint256, proof: DynArray[bytes32, 32]) -> bool:
+    """
+    @notice
+        Transfers amount to account if the leaf is in the tree and unclaimed.
+        The payout uses Token.transfer, so fees apply and the airdrop stops while the token is paused.
+    @param index The leaf index.
+    @param account The address receiving the tokens.
+    @param amount The amount of the leaf.
+    @param proof Sibling hashes from the leaf up to the root.
+    @return True, if transaction completes successfully
+    """
+
+    word: uint256 = shift(index, -8)
+    bit: uint256 = shift(1, convert(index % 256, int128))
+    claimed: uint256 = self.claimedBitMap[word]
+    assert claimed & bit == 0, "Already claimed."
+    assert not self.token.blackListAddresses(account), "Account is blacklisted."
+
+    node: bytes32 = keccak256(_abi_encode(index, account, amount))
+    for sibling in proof:
+        if convert(node, uint256) < convert(sibling, uint256):
+            node = keccak256(concat(node, sibling))
+        else:
+            node = keccak256(concat(sibling, node))
+    assert node == self.merkleRoot, "Invalid proof."
+
+    self.claimedBitMap[word] = claimed | bit
+    assert self.token.transfer(account, amount)
+
+    log Claimed(index, account, amount)
+    return True
+
+
+@external
+def withdraw(_amount: uint256) -> bool:
+    """
+    @notice Function to return unclaimed tokens to the owner
+    @param _amount The number of tokens to withdraw.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert self.token.transfer(self.owner, _amount)
+
+    return True
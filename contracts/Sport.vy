@@ -1,44 +1,227 @@
-# import Token as Token
+# @version 0.3.7
 
-# # struct BettingEvent:
-    
+"""
+@title KiwiNative Sport Betting
+@license MIT
+@notice
+    Pari-mutuel betting on events created by the house. Stakes are pulled with
+    Token.transferFrom, so fees apply and the stake is the amount received.
+    resolveBets settles an event's bets in batches and credits the winners'
+    shares of the pool to claimable balances, which are paid out by claim.
+"""
 
-# # State Variables
-# kiwiToken: public(Token)
-# # bets: public(HashMap[uint256, Bet])
-# betCount: public(uint256)
+import Token as Token
 
-# # Events
+MAX_OUTCOMES: constant(uint256) = 16
+MAX_SETTLE: constant(uint256) = 500
 
+# Packed bet record, one storage slot per bet:
+#   bits   0..159  player
+#   bits 160..247  amount received
+#   bits 248..255  outcome
+PLAYER_MASK: constant(uint256) = 2 ** 160 - 1
+AMOUNT_SHIFT: constant(int128) = 160
+AMOUNT_MASK: constant(uint256) = 2 ** 88 - 1
+OUTCOME_SHIFT: constant(int128) = 248
 
+# Packed event record:
+#   bits   0..63   bets placed
+#   bits  64..127  bets settled
+#   bits 128..135  number of outcomes, 0 for unknown events
+#   bits 136..143  winning outcome
+#   bit  144       resolved flag, set by the first resolveBets call
+COUNT_MASK: constant(uint256) = 2 ** 64 - 1
+SETTLED_SHIFT: constant(int128) = 64
+OUTCOMES_SHIFT: constant(int128) = 128
+WINNER_SHIFT: constant(int128) = 136
+RESOLVED_FLAG: constant(uint256) = 2 ** 144
 
+# State Variables
+kiwiToken: public(Token)
+house: public(address)
+eventCount: public(uint256)
+events: HashMap[uint256, uint256]
+bets: public(HashMap[uint256, HashMap[uint256, uint256]])
+stakes: public(HashMap[uint256, HashMap[uint256, uint256]])
+claimable: public(HashMap[address, uint256])
 
-# @external
-# def __init__(_kiwiTokenAddress: address):
-#     """
-#     @notice Constructor, runs at contracts deployment.
-#     @param _kiwiTokenAddress KIWI token address
-#     """
+# Events
+event EventCreated:
+    eventId: indexed(uint256)
+    outcomes: uint256
 
-#     assert _kiwiTokenAddress != empty(address)
-#     self.kiwiToken = Token(_kiwiTokenAddress)
+event BetPlaced:
+    eventId: indexed(uint256)
+    betId: uint256
+    player: indexed(address)
+    outcome: uint256
+    amount: uint256
 
+event BetsResolved:
+    eventId: indexed(uint256)
+    winningOutcome: uint256
+    settled: uint256
+    remaining: uint256
 
-# @external
-# def placeBet(player2: address, amount: uint256):
-#         assert player2 != empty(address), "Invalid player 2 address."
-#         self.bets[self.betCount] = Bet({
-#             player1: msg.sender,
-#             player2: player2,
-#             amount: amount,
-#             player1Won: False,
-#             betTime: block.timestamp,
-#             resolveTime: 0
-#         })
+event Claimed:
+    player: indexed(address)
+    amount: uint256
 
-#         self.betCount += 1
-#         log BetPlaced(self.betCount-1, msg.sender, player2, amount, block.timestamp)
 
-# @external
-# def transfer(_from: address, _to: address, _amount: uint256):
-#     self.kiwiToken.transferFrom(_from, _to, _amount,)
\ No newline at end of file
+@external
+def __init__(_kiwiTokenAddress: address):
+    """
+    @notice Constructor, runs at contracts deployment.
+    @param _kiwiTokenAddress KIWI token address
+    """
+
+    assert _kiwiTokenAddress != empty(address)
+    self.kiwiToken = Token(_kiwiTokenAddress)
+    self.house = msg.sender
+
+
+@view
+@external
+def eventInfo(eventId: uint256) -> (uint256, uint256, uint256, uint256, bool):
+    """
+    @notice Gets the state of an event.
+    @param eventId The event.
+    @return Number of outcomes, bets placed, bets settled, winning outcome and whether it is resolved
+    """
+
+    info: uint256 = self.events[eventId]
+    return (
+        shift(info, -OUTCOMES_SHIFT) & 255,
+        info & COUNT_MASK,
+        shift(info, -SETTLED_SHIFT) & COUNT_MASK,
+        shift(info, -WINNER_SHIFT) & 255,
+        info & RESOLVED_FLAG != 0,
+    )
+
+
+@external
+def createEvent(outcomes: uint256) -> uint256:
+    """
+    @notice Opens an event for betting.
+    @param outcomes The number of possible outcomes, from 2 to 16.
+    @return uint256, the id of the event
+    """
+
+    assert msg.sender == self.house, "Access is denied."
+    assert outcomes >= 2 and outcomes <= MAX_OUTCOMES, "Invalid number of outcomes."
+
+    eventId: uint256 = self.eventCount
+    self.events[eventId] = shift(outcomes, OUTCOMES_SHIFT)
+    self.eventCount = eventId + 1
+
+    log EventCreated(eventId, outcomes)
+    return eventId
+
+
+@external
+def placeBet(eventId: uint256, outcome: uint256, amount: uint256) -> uint256:
+    """
+    @notice
+        Stakes amount on an outcome of an open event.
+        The stake is the amount this contract receives after the token's fees.
+    @param eventId The event.
+    @param outcome The outcome bet on.
+    @param amount The amount pulled from the caller, approved to this contract.
+    @return uint256, the id of the bet within the event
+    """
+
+    info: uint256 = self.events[eventId]
+    assert info & RESOLVED_FLAG == 0, "Betting is closed."
+    assert outcome < shift(info, -OUTCOMES_SHIFT) & 255, "Invalid outcome."
+
+    before: uint256 = self.kiwiToken.balanceOf(self)
+    assert self.kiwiToken.transferFrom(msg.sender, self, amount)
+    received: uint256 = self.kiwiToken.balanceOf(self) - before
+    assert received > 0 and received <= AMOUNT_MASK, "Invalid bet amount."
+
+    betId: uint256 = info & COUNT_MASK
+    self.bets[eventId][betId] = convert(msg.sender, uint256) | shift(received, AMOUNT_SHIFT) | shift(outcome, OUTCOME_SHIFT)
+    self.stakes[eventId][outcome] += received
+    self.events[eventId] = info + 1
+
+    log BetPlaced(eventId, betId, msg.sender, outcome, received)
+    return betId
+
+
+@external
+def resolveBets(eventId: uint256, winningOutcome: uint256) -> uint256:
+    """
+    @notice
+        Closes the event on its first call and settles up to 500 of its bets,
+        call again until no bets remain. Winners are credited their stake's
+        share of the whole pool, if nobody won every stake is refunded.
+    @param eventId The event.
+    @param winningOutcome The outcome that happened.
+    @return uint256, the number of bets left to settle
+    """
+
+    assert msg.sender == self.house, "Access is denied."
+    info: uint256 = self.events[eventId]
+    outcomes: uint256 = shift(info, -OUTCOMES_SHIFT) & 255
+    assert winningOutcome < outcomes, "Invalid outcome."
+    if info & RESOLVED_FLAG == 0:
+        info = info | RESOLVED_FLAG | shift(winningOutcome, WINNER_SHIFT)
+    else:
+        assert shift(info, -WINNER_SHIFT) & 255 == winningOutcome, "Event resolved with another outcome."
+
+    pool: uint256 = 0
+    for outcome in range(MAX_OUTCOMES):
+        if outcome == outcomes:
+            break
+        pool += self.stakes[eventId][outcome]
+    winningStake: uint256 = self.stakes[eventId][winningOutcome]
+
+    count: uint256 = info & COUNT_MASK
+    settled: uint256 = shift(info, -SETTLED_SHIFT) & COUNT_MASK
+    end: uint256 = min(count, settled + MAX_SETTLE)
+    for betId in range(settled, settled + MAX_SETTLE):
+        if betId == end:
+            break
+        bet: uint256 = self.bets[eventId][betId]
+        amount: uint256 = shift(bet, -AMOUNT_SHIFT) & AMOUNT_MASK
+        if winningStake == 0:
+            self.claimable[convert(bet & PLAYER_MASK, address)] += amount
+        elif shift(bet, -OUTCOME_SHIFT) == winningOutcome:
+            self.claimable[convert(bet & PLAYER_MASK, address)] += amount * pool / winningStake
+
+    self.events[eventId] = info + shift(end - settled, SETTLED_SHIFT)
+
+    log BetsResolved(eventId, winningOutcome, end - settled, count - end)
+    return count - end
+
+
+@external
+def claim() -> uint256:
+    """
+    @notice Pays out the caller's winnings and refunds. Token fees apply to the payout.
+    @return uint256, the amount claimed
+    """
+
+    amount: uint256 = self.claimable[msg.sender]
+    assert amount > 0, "Nothing to claim."
+    self.claimable[msg.sender] = 0
+    assert self.kiwiToken.transfer(msg.sender, amount)
+
+    log Claimed(msg.sender, amount)
+    return amount
+
+
+@external
+def transfer(_from: address, _to: address, _amount: uint256):
+    """
+    @notice
+        Pays out house tokens approved to this contract, e.g. for promotions.
+        Only the house can call it. Token fees apply, so _to receives _amount less the fees.
+    @param _from The house address, the only account this can spend from.
+    @param _to The address of the receipient.
+    @param _amount The amount to be transfered.
+    """
+
+    assert msg.sender == self.house, "Access is denied."
+    assert _from == self.house, "Only house funds can be transferred."
+    assert self.kiwiToken.transferFrom(_from, _to, _amount)
@@ -14,18 +14,59 @@ implements: ERC20
 NAME: constant(String[20]) = "KIWINATIVE"
 SYMBOL: constant(String[5]) = "KWN"
 DECIMALS: constant(uint8) = 18
+MAX_FEE: constant(uint256) = 1000
+
+# Packed fee config layout, read with a single SLOAD on the transfer path:
+#   bits   0..159  feeAddress
+#   bits 160..175  txfee
+#   bits 176..191  burnfee
+#   bits 192..207  1000 / txfee, 0 if no txfee
+#   bits 208..223  1000 / burnfee, 0 if no burnfee
+#   bit  224       paused flag
+#   bit  225       lazy fees flag
+#   bit  226       total supply checkpoints flag, set by the owner
+#   bit  227       balance checkpoints flag, set once a holder enabled checkpoints
+ADDRESS_MASK: constant(uint256) = 2 ** 160 - 1
+FIELD_MASK: constant(uint256) = 2 ** 16 - 1
+TXFEE_SHIFT: constant(int128) = 160
+BURNFEE_SHIFT: constant(int128) = 176
+TX_DIVISOR_SHIFT: constant(int128) = 192
+BURN_DIVISOR_SHIFT: constant(int128) = 208
+PAUSED_FLAG: constant(uint256) = 2 ** 224
+LAZY_FEES_FLAG: constant(uint256) = 2 ** 225
+SUPPLY_CHECKPOINTS_FLAG: constant(uint256) = 2 ** 226
+BALANCE_CHECKPOINTS_FLAG: constant(uint256) = 2 ** 227
+
+# Packed supply layout, so lazy fees and burns on a transfer share one SSTORE:
+#   bits   0..127  totalSupply
+#   bits 128..255  fees accrued for feeAddress and not yet credited to its balance
+SUPPLY_MASK: constant(uint256) = 2 ** 128 - 1
+ACCRUED_SHIFT: constant(int128) = 128
+
+# Packed checkpoint, the value at the end of a block:
+#   bits   0..127  balance or total supply
+#   bits 128..255  block number
+CHECKPOINT_BLOCK_SHIFT: constant(int128) = 128
+
+# Role bits of an address, one storage word per address so transferFrom
+# learns whether the caller is blacklisted or an operator with one read
+ROLE_BLACKLISTED: constant(uint256) = 1
+ROLE_MINTER: constant(uint256) = 2
+ROLE_OPERATOR: constant(uint256) = 4
+ROLE_CHECKPOINTS: constant(uint256) = 8
 
 # ERC20 State Variables
-totalSupply: public(uint256)
-balanceOf: public(HashMap[address, uint256])
+supplyAndFees: uint256
+balances: HashMap[address, uint256]
 allowance: public(HashMap[address, HashMap[address, uint256]])
 
 # KIWI token state variable
-isPaused: public(bool)
-blackListAddresses: public(HashMap[address, bool])
-txfee: public(uint256)
-burnfee: public(uint256)
-feeAddress: public(address)
+feeConfig: uint256
+roles: HashMap[address, uint256]
+
+# Balance checkpoints of holders that enabled them, total supply checkpoints under the zero address
+checkpoints: public(HashMap[address, HashMap[uint256, uint256]])
+numCheckpoints: public(HashMap[address, uint256])
 
 # Events
 event Paused: pass
@@ -55,13 +96,39 @@ event UpdateFees:
     burnfee: uint256
     feeAddress: indexed(address)
 
+event LazyFees:
+    enabled: bool
+
+event CheckpointsEnabled:
+    holder: indexed(address)
+    fromBlock: uint256
+
+event UpdateOperator:
+    operator: indexed(address)
+    enabled: bool
+
+event OperatorApproval:
+    holder: indexed(address)
+    operator: indexed(address)
+    approved: bool
+
+event AuthorizationUsed:
+    authorizer: indexed(address)
+    nonce: indexed(bytes32)
+
 owner: public(address)
-isMinter: public(HashMap[address, bool])
 
 nonces: public(HashMap[address, uint256])
-DOMAIN_SEPARATOR: public(bytes32)
+# EIP-3009 nonces are random, so they are tracked as used rather than counted
+authorizations: HashMap[address, HashMap[bytes32, bool]]
+# Holders that let a registered operator pull without an allowance, by holder and operator
+operatorApprovals: HashMap[address, HashMap[address, bool]]
+# EIP-712 domain separator of the deploy chain, rebuilt only after a fork changes chain.id
+CACHED_CHAIN_ID: immutable(uint256)
+CACHED_DOMAIN_SEPARATOR: immutable(bytes32)
 DOMAIN_TYPE_HASH: constant(bytes32) = keccak256('EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)')
 PERMIT_TYPE_HASH: constant(bytes32) = keccak256('Permit(address owner,address spender,uint256 value,uint256 nonce,uint256 deadline)')
+TRANSFER_WITH_AUTHORIZATION_TYPE_HASH: constant(bytes32) = keccak256('TransferWithAuthorization(address from,address to,uint256 value,uint256 validAfter,uint256 validBefore,bytes32 nonce)')
 
 
 @external
@@ -74,23 +141,15 @@ def __init__(_txfee: uint256, _burnfee: uint256, _feeAddress: address):
     """
 
     self.owner = msg.sender
-    self.totalSupply = 10000000000000 * 10 ** 18
-    self.balanceOf[msg.sender] = 10000000000000 * 10 ** 18
-    self.txfee = _txfee
-    self.burnfee = _burnfee
-    self.feeAddress = _feeAddress
+    self.supplyAndFees = 10000000000000 * 10 ** 18
+    self.balances[msg.sender] = 10000000000000 * 10 ** 18
+    self.feeConfig = self._packFees(_txfee, _burnfee, _feeAddress)
 
     # EIP-712
-    self.DOMAIN_SEPARATOR = keccak256(
-        concat(
-            DOMAIN_TYPE_HASH,
-            keccak256(NAME),
-            keccak256("1.0"),
-            _abi_encode(chain.id, self)
-        )
-    )
+    CACHED_CHAIN_ID = chain.id
+    CACHED_DOMAIN_SEPARATOR = self._buildDomainSeparator()
 
-    log Transfer(empty(address), msg.sender, self.totalSupply)
+    log Transfer(empty(address), msg.sender, 10000000000000 * 10 ** 18)
 
 
 @pure
@@ -126,6 +185,128 @@ def decimals() -> uint8:
     return DECIMALS
 
 
+@view
+@external
+def totalSupply() -> uint256:
+    """
+    @notice Gets the total supply, accrued fees included.
+    @return uint256, if transaction completes successfully
+    """
+
+    return self.supplyAndFees & SUPPLY_MASK
+
+
+@view
+@external
+def balanceOf(holder: address) -> uint256:
+    """
+    @notice Gets the balance of holder, for feeAddress including the fees accrued in lazy mode.
+    @param holder The address to query.
+    @return uint256, if transaction completes successfully
+    """
+
+    if holder == convert(self.feeConfig & ADDRESS_MASK, address):
+        return self.balances[holder] + shift(self.supplyAndFees, -ACCRUED_SHIFT)
+    return self.balances[holder]
+
+
+@view
+@external
+def accruedFees() -> uint256:
+    """
+    @notice Gets the fees accrued for feeAddress and not yet credited to its balance.
+    @return uint256, if transaction completes successfully
+    """
+
+    return shift(self.supplyAndFees, -ACCRUED_SHIFT)
+
+
+@view
+@external
+def lazyFees() -> bool:
+    """
+    @notice Gets whether txfees accrue instead of being credited on every transfer.
+    @return bool, True if lazy fees are enabled
+    """
+
+    return self.feeConfig & LAZY_FEES_FLAG != 0
+
+
+@view
+@external
+def isPaused() -> bool:
+    """
+    @notice Gets the pause state of the contract.
+    @return bool, True if the contract is paused
+    """
+
+    return self.feeConfig & PAUSED_FLAG != 0
+
+
+@view
+@external
+def txfee() -> uint256:
+    """
+    @notice Gets the txfee, in units of 1/1000.
+    @return uint256, if transaction completes successfully
+    """
+
+    return shift(self.feeConfig, -TXFEE_SHIFT) & FIELD_MASK
+
+
+@view
+@external
+def burnfee() -> uint256:
+    """
+    @notice Gets the burnfee, in units of 1/1000.
+    @return uint256, if transaction completes successfully
+    """
+
+    return shift(self.feeConfig, -BURNFEE_SHIFT) & FIELD_MASK
+
+
+@view
+@external
+def feeAddress() -> address:
+    """
+    @notice Gets the address txfees are transfered to.
+    @return address, if transaction completes successfully
+    """
+
+    return convert(self.feeConfig & ADDRESS_MASK, address)
+
+
+@pure
+@internal
+def _packFees(_txfee: uint256, _burnfee: uint256, _feeAddress: address) -> uint256:
+    """
+    @notice
+        Internal function that packs the fee parameters into one word.
+        The fee divisors are precomputed so transfers need no division by the fee.
+    @param _txfee The txfee, at most MAX_FEE.
+    @param _burnfee The burnfee, at most MAX_FEE.
+    @param _feeAddress The address to transfer txfee to.
+    @return uint256, the packed fee config without the paused flag.
+    """
+
+    assert _txfee <= MAX_FEE and _burnfee <= MAX_FEE, "Fees cannot exceed 1000."
+
+    txDivisor: uint256 = 0
+    if _txfee > 0:
+        txDivisor = MAX_FEE / _txfee
+    burnDivisor: uint256 = 0
+    if _burnfee > 0:
+        burnDivisor = MAX_FEE / _burnfee
+
+    return (
+        convert(_feeAddress, uint256)
+        | shift(_txfee, TXFEE_SHIFT)
+        | shift(_burnfee, BURNFEE_SHIFT)
+        | shift(txDivisor, TX_DIVISOR_SHIFT)
+        | shift(burnDivisor, BURN_DIVISOR_SHIFT)
+    )
+
+
 @external
 def pause() -> bool:
     """
@@ -134,9 +315,10 @@ def pause() -> bool:
     """
     
     assert msg.sender == self.owner, "Access is denied."
-    assert self.isPaused == False
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
 
-    self.isPaused = True
+    self.feeConfig = config | PAUSED_FLAG
 
     log Paused()
 
@@ -151,9 +333,10 @@ def unpause() -> bool:
     """
     
     assert msg.sender == self.owner, "Access is denied."
-    assert self.isPaused == True
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG != 0
 
-    self.isPaused = False
+    self.feeConfig = config ^ PAUSED_FLAG
 
     log Unpaused()
 
@@ -171,37 +354,122 @@ def _blackList(_address: address, _isblackListed: bool) -> bool:
     @return True, if transaction completes successfully.
     """
 
-    assert self.blackListAddresses[_address] != _isblackListed
+    roles: uint256 = self.roles[_address]
+    assert (roles & ROLE_BLACKLISTED != 0) != _isblackListed
 
-    self.blackListAddresses[_address] = _isblackListed
+    self.roles[_address] = roles ^ ROLE_BLACKLISTED
 
     log Blacklist(_address, _isblackListed)
     return True
 
 
 @internal
-def _decay(_address: address, _value: uint256) -> uint256:
+def _checkpoint(_key: address, _value: uint256):
+    """
+    @notice
+        Internal function that records the value of a balance or the total supply
+        at the end of the current block. Updates in one block share a checkpoint.
+    @param _key The holder, or the zero address for the total supply.
+    @param _value The value after the update.
+    """
+
+    count: uint256 = self.numCheckpoints[_key]
+    if count > 0:
+        last: uint256 = self.checkpoints[_key][count - 1]
+        if shift(last, -CHECKPOINT_BLOCK_SHIFT) == block.number:
+            self.checkpoints[_key][count - 1] = shift(block.number, CHECKPOINT_BLOCK_SHIFT) | _value
+            return
+
+    self.checkpoints[_key][count] = shift(block.number, CHECKPOINT_BLOCK_SHIFT) | _value
+    self.numCheckpoints[_key] = count + 1
+
+
+@internal
+def _checkpointBalance(_holder: address):
+    """
+    @notice Internal function that checkpoints the balance of a holder, if it enabled checkpoints.
+    @param _holder The address whose balance changed.
+    """
+
+    if self.roles[_holder] & ROLE_CHECKPOINTS != 0:
+        self._checkpoint(_holder, self.balances[_holder])
+
+
+@internal
+def _checkpointSupply():
+    """
+    @notice Internal function that checkpoints the total supply after a mint or burn.
+    """
+
+    self._checkpoint(empty(address), self.supplyAndFees & SUPPLY_MASK)
+
+
+@internal
+def _settleFees(_feeAddress: address, _config: uint256) -> uint256:
+    """
+    @notice Internal function that credits the accrued fees to the balance of feeAddress.
+    @param _feeAddress The current feeAddress.
+    @param _config The packed fee config, as read by the caller.
+    @return uint256, the amount credited.
+    """
+
+    packed: uint256 = self.supplyAndFees
+    accrued: uint256 = shift(packed, -ACCRUED_SHIFT)
+    if accrued > 0:
+        self.supplyAndFees = packed & SUPPLY_MASK
+        self.balances[_feeAddress] += accrued
+        if _config & BALANCE_CHECKPOINTS_FLAG != 0:
+            self._checkpointBalance(_feeAddress)
+    return accrued
+
+
+@internal
+def _decay(_address: address, _value: uint256, _config: uint256) -> uint256:
     """
     @notice 
         Internal function that implements deflationary decay on transaction.
+        Fees that round down to zero are neither credited nor logged.
+        In lazy mode the txfee is added to the accrued fees instead of the balance
+        of feeAddress, and feeAddress has its accrued fees credited before it spends.
     @param _address The address of the sender.
     @param _value The address' value to be sent.
+    @param _config The packed fee config, as read by the caller.
     @return uint256, if transaction completes successfully.
     """
 
-    tempValue: uint256 = _value
+    feeAddress: address = convert(_config & ADDRESS_MASK, address)
+    if _address == feeAddress:
+        if _config & LAZY_FEES_FLAG != 0:
+            self._settleFees(feeAddress, _config)
+        return _value
+
     newValue: uint256 = _value
-    if self.txfee > 0 and _address != self.feeAddress:
-        deflationaryDecay: uint256 = tempValue / (1000 / self.txfee)
-        self.balanceOf[self.feeAddress] += deflationaryDecay
-        log Transfer(_address, self.feeAddress, deflationaryDecay)
-        newValue -= deflationaryDecay
-
-    if self.burnfee > 0 and _address != self.feeAddress:
-        burnValue: uint256 = tempValue / (1000 / self.burnfee)
-        self.totalSupply -= self.totalSupply
-        log Transfer(_address, empty(address), burnValue)
-        newValue -= burnValue
+    accrued: uint256 = 0
+    txDivisor: uint256 = shift(_config, -TX_DIVISOR_SHIFT) & FIELD_MASK
+    if txDivisor > 0:
+        deflationaryDecay: uint256 = _value / txDivisor
+        if deflationaryDecay > 0:
+            if _config & LAZY_FEES_FLAG != 0:
+                accrued = deflationaryDecay
+            else:
+                self.balances[feeAddress] += deflationaryDecay
+                if _config & BALANCE_CHECKPOINTS_FLAG != 0:
+                    self._checkpointBalance(feeAddress)
+            log Transfer(_address, feeAddress, deflationaryDecay)
+            newValue -= deflationaryDecay
+
+    burnValue: uint256 = 0
+    burnDivisor: uint256 = shift(_config, -BURN_DIVISOR_SHIFT) & FIELD_MASK
+    if burnDivisor > 0:
+        burnValue = _value / burnDivisor
+        if burnValue > 0:
+            log Transfer(_address, empty(address), burnValue)
+            newValue -= burnValue
+
+    if accrued > 0 or burnValue > 0:
+        self.supplyAndFees = self.supplyAndFees + shift(accrued, ACCRUED_SHIFT) - burnValue
+        if burnValue > 0 and _config & SUPPLY_CHECKPOINTS_FLAG != 0:
+            self._checkpointSupply()
     return newValue
 
 
@@ -214,37 +482,134 @@ def transfer(receiver: address, amount: uint256) -> bool:
     @return True, if transaction completes successfully
     """
 
-    assert self.isPaused == False
-    assert self.blackListAddresses[msg.sender] == False
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
+    assert self.roles[msg.sender] & ROLE_BLACKLISTED == 0
     assert receiver not in [empty(address), self]
 
-    self.balanceOf[msg.sender] -= amount
-    newAmount: uint256 = self._decay(msg.sender, amount)
-    self.balanceOf[receiver] += newAmount
+    newAmount: uint256 = self._decay(msg.sender, amount, config)
+    self.balances[msg.sender] -= amount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(msg.sender)
+    self.balances[receiver] += newAmount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(receiver)
 
     log Transfer(msg.sender, receiver, newAmount)
     return True
 
 
+@external
+def transferBatch(receivers: DynArray[address, 500], amounts: DynArray[uint256, 500]) -> bool:
+    """
+    @notice
+        Transfers tokens to many receipients in one call.
+        The sender is debited once and the fee and burn amounts
+        of the whole batch are settled once.
+    @param receivers The addresses of the receipients.
+    @param amounts The amounts to be transfered, one per receipient.
+    @return True, if transaction completes successfully
+    """
+
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
+    assert self.roles[msg.sender] & ROLE_BLACKLISTED == 0
+    assert len(receivers) == len(amounts), "Receivers and amounts length mismatch."
+
+    feeAddress: address = convert(config & ADDRESS_MASK, address)
+    txDivisor: uint256 = 0
+    burnDivisor: uint256 = 0
+    if msg.sender != feeAddress:
+        txDivisor = shift(config, -TX_DIVISOR_SHIFT) & FIELD_MASK
+        burnDivisor = shift(config, -BURN_DIVISOR_SHIFT) & FIELD_MASK
+    elif config & LAZY_FEES_FLAG != 0:
+        self._settleFees(feeAddress, config)
+
+    total: uint256 = 0
+    for amount in amounts:
+        total += amount
+    self.balances[msg.sender] -= total
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(msg.sender)
+
+    feeTotal: uint256 = 0
+    burnTotal: uint256 = 0
+    i: uint256 = 0
+    for receiver in receivers:
+        assert receiver not in [empty(address), self]
+
+        # fees are rounded per receipient, exactly as in _decay
+        amount: uint256 = amounts[i]
+        newAmount: uint256 = amount
+        if txDivisor > 0:
+            deflationaryDecay: uint256 = amount / txDivisor
+            feeTotal += deflationaryDecay
+            newAmount -= deflationaryDecay
+        if burnDivisor > 0:
+            burnValue: uint256 = amount / burnDivisor
+            burnTotal += burnValue
+            newAmount -= burnValue
+
+        self.balances[receiver] += newAmount
+        if config & BALANCE_CHECKPOINTS_FLAG != 0:
+            self._checkpointBalance(receiver)
+        log Transfer(msg.sender, receiver, newAmount)
+        i += 1
+
+    accrued: uint256 = 0
+    if feeTotal > 0:
+        if config & LAZY_FEES_FLAG != 0:
+            accrued = feeTotal
+        else:
+            self.balances[feeAddress] += feeTotal
+            if config & BALANCE_CHECKPOINTS_FLAG != 0:
+                self._checkpointBalance(feeAddress)
+        log Transfer(msg.sender, feeAddress, feeTotal)
+
+    if burnTotal > 0:
+        log Transfer(msg.sender, empty(address), burnTotal)
+
+    if accrued > 0 or burnTotal > 0:
+        self.supplyAndFees = self.supplyAndFees + shift(accrued, ACCRUED_SHIFT) - burnTotal
+        if burnTotal > 0 and config & SUPPLY_CHECKPOINTS_FLAG != 0:
+            self._checkpointSupply()
+
+    return True
+
+
 @external
 def transferFrom(sender:address, receiver: address, amount: uint256) -> bool:
     """
-    @notice Transfers token to receipient on behalf of a sender.
+    @notice
+        Transfers token to receipient on behalf of a sender.
+        The allowance is decreased by the amount received, without an Approval log.
+        An allowance of max_value(uint256) is never decreased, and operators
+        transfer without an allowance from holders that approved them, see
+        setOperator and approveOperator.
     @param sender The address of the sender.
     @param receiver The address of the receipient.
     @param amount The amount to be transfered.
     @return True, if transaction completes successfully
     """
 
-    assert self.isPaused == False
-    assert self.blackListAddresses[msg.sender] == False
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
+    roles: uint256 = self.roles[msg.sender]
+    assert roles & ROLE_BLACKLISTED == 0
     assert receiver not in [empty(address), self]
 
-    newAmount: uint256 = self._decay(sender, amount)
+    newAmount: uint256 = self._decay(sender, amount, config)
 
-    self.allowance[sender][msg.sender] -= newAmount
-    self.balanceOf[sender] -= amount
-    self.balanceOf[receiver] += newAmount
+    if roles & ROLE_OPERATOR == 0 or not self.operatorApprovals[sender][msg.sender]:
+        allowed: uint256 = self.allowance[sender][msg.sender]
+        if allowed != max_value(uint256):
+            self.allowance[sender][msg.sender] = allowed - newAmount
+    self.balances[sender] -= amount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(sender)
+    self.balances[receiver] += newAmount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(receiver)
 
     log Transfer(sender, receiver, newAmount)
     return True
@@ -257,7 +622,7 @@ def approve(spender: address, amount: uint256) -> bool:
     @param amount The amount of token to be transfered.
     """
 
-    assert self.isPaused == False
+    assert self.feeConfig & PAUSED_FLAG == 0
     self.allowance[msg.sender][spender] = amount
 
     log Approval(msg.sender, spender, amount)
@@ -271,9 +636,17 @@ def burn(amount: uint256) -> bool:
     @param amount The amount of token to be burned.
     """
 
-    assert self.isPaused == False
-    self.balanceOf[msg.sender] -= amount
-    self.totalSupply -= amount
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
+    if config & LAZY_FEES_FLAG != 0 and msg.sender == convert(config & ADDRESS_MASK, address):
+        self._settleFees(msg.sender, config)
+
+    self.balances[msg.sender] -= amount
+    self.supplyAndFees -= amount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(msg.sender)
+    if config & SUPPLY_CHECKPOINTS_FLAG != 0:
+        self._checkpointSupply()
 
     log Transfer(msg.sender, empty(address), amount)
 
@@ -289,11 +662,18 @@ def mint(receiver: address, amount: uint256) -> bool:
     @return A boolean that indicates if the operation was successful.
     """
     
-    assert msg.sender == self.owner or self.isMinter[msg.sender], "Access is denied."
+    assert msg.sender == self.owner or self.roles[msg.sender] & ROLE_MINTER != 0, "Access is denied."
     assert receiver not in [empty(address), self]
 
-    self.totalSupply += amount
-    self.balanceOf[receiver] += amount
+    packed: uint256 = self.supplyAndFees
+    assert (packed & SUPPLY_MASK) + amount <= SUPPLY_MASK, "Total supply cannot exceed 2**128 - 1."
+    self.supplyAndFees = packed + amount
+    self.balances[receiver] += amount
+    config: uint256 = self.feeConfig
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(receiver)
+    if config & SUPPLY_CHECKPOINTS_FLAG != 0:
+        self._checkpointSupply()
 
     log Transfer(empty(address), receiver, amount)
 
@@ -310,30 +690,51 @@ def addMinter(target: address) -> bool:
 
     assert msg.sender == self.owner
     assert target != empty(address), "Cannot add zero address as minter."
-    self.isMinter[target] = True
+    self.roles[target] |= ROLE_MINTER
     return True
 
 
+@view
+@internal
+def _buildDomainSeparator() -> bytes32:
+    return keccak256(
+        concat(
+            DOMAIN_TYPE_HASH,
+            keccak256(NAME),
+            keccak256("1.0"),
+            _abi_encode(chain.id, self)
+        )
+    )
+
+
+@view
+@internal
+def _domainSeparator() -> bytes32:
+    if chain.id == CACHED_CHAIN_ID:
+        return CACHED_DOMAIN_SEPARATOR
+    return self._buildDomainSeparator()
+
+
+@view
 @external
-def permit(owner: address, spender: address, amount: uint256, expiry: uint256, signature: Bytes[65]) -> bool:
+def DOMAIN_SEPARATOR() -> bytes32:
     """
-    @notice
-        Approves spender by owner's signature to expend owner's tokens.
-        See https://eips.ethereum.org/EIPS/eip-2612.
-    @param owner The address which is a source of funds and has signed the Permit.
-    @param spender The address which is allowed to spend the funds.
-    @param amount The amount of tokens to be spent.
-    @param expiry The timestamp after which the Permit is no longer valid.
-    @param signature A valid secp256k1 signature of Permit by owner encoded as r, s, v.
-    @return True, if transaction completes successfully
+    @notice EIP-712 domain separator of the current chain.
+    @return The domain separator
     """
+
+    return self._domainSeparator()
+
+
+@internal
+def _usePermit(owner: address, spender: address, amount: uint256, expiry: uint256, signature: Bytes[65]):
     assert owner != empty(address)  # dev: invalid owner
     assert expiry == 0 or expiry >= block.timestamp  # dev: permit expired
     nonce: uint256 = self.nonces[owner]
     digest: bytes32 = keccak256(
         concat(
             b'\x19\x01',
-            self.DOMAIN_SEPARATOR,
+            self._domainSeparator(),
             keccak256(
                 _abi_encode(
                     PERMIT_TYPE_HASH,
@@ -351,13 +752,105 @@ def permit(owner: address, spender: address, amount: uint256, expiry: uint256, s
     s: uint256 = convert(slice(signature, 32, 32), uint256)
     v: uint256 = convert(slice(signature, 64, 1), uint256)
     assert ecrecover(digest, v, r, s) == owner  # dev: invalid signature
-    self.allowance[owner][spender] = amount
     self.nonces[owner] = nonce + 1
 
+
+@view
+@internal
+def _authorizationSigner(
+    _authorizer: address,
+    _receiver: address,
+    _amount: uint256,
+    _validAfter: uint256,
+    _validBefore: uint256,
+    _nonce: bytes32,
+    _signature: Bytes[65],
+) -> address:
+    digest: bytes32 = keccak256(
+        concat(
+            b'\x19\x01',
+            self._domainSeparator(),
+            keccak256(
+                _abi_encode(
+                    TRANSFER_WITH_AUTHORIZATION_TYPE_HASH,
+                    _authorizer,
+                    _receiver,
+                    _amount,
+                    _validAfter,
+                    _validBefore,
+                    _nonce,
+                )
+            )
+        )
+    )
+    # NOTE: signature is packed as r, s, v
+    r: uint256 = convert(slice(_signature, 0, 32), uint256)
+    s: uint256 = convert(slice(_signature, 32, 32), uint256)
+    v: uint256 = convert(slice(_signature, 64, 1), uint256)
+    return ecrecover(digest, v, r, s)
+
+
+@external
+def permit(owner: address, spender: address, amount: uint256, expiry: uint256, signature: Bytes[65]) -> bool:
+    """
+    @notice
+        Approves spender by owner's signature to expend owner's tokens.
+        See https://eips.ethereum.org/EIPS/eip-2612.
+    @param owner The address which is a source of funds and has signed the Permit.
+    @param spender The address which is allowed to spend the funds.
+    @param amount The amount of tokens to be spent.
+    @param expiry The timestamp after which the Permit is no longer valid.
+    @param signature A valid secp256k1 signature of Permit by owner encoded as r, s, v.
+    @return True, if transaction completes successfully
+    """
+
+    self._usePermit(owner, spender, amount, expiry, signature)
+    self.allowance[owner][spender] = amount
+
     log Approval(owner, spender, amount)
     return True
 
 
+@external
+def permitAndTransferFrom(owner: address, receiver: address, amount: uint256, permitValue: uint256, expiry: uint256, signature: Bytes[65]) -> bool:
+    """
+    @notice
+        Applies owner's Permit for the caller and transfers from owner in one call.
+        The allowance left is permitValue minus the amount received, as in transferFrom,
+        or max_value(uint256) for a Permit of max_value(uint256).
+    @param owner The address which is a source of funds and has signed the Permit.
+    @param receiver The address of the receipient.
+    @param amount The amount to be transfered.
+    @param permitValue The amount of the Permit, signed for the caller as spender.
+    @param expiry The timestamp after which the Permit is no longer valid.
+    @param signature A valid secp256k1 signature of Permit by owner encoded as r, s, v.
+    @return True, if transaction completes successfully
+    """
+
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
+    assert self.roles[msg.sender] & ROLE_BLACKLISTED == 0
+    assert receiver not in [empty(address), self]
+
+    self._usePermit(owner, msg.sender, permitValue, expiry, signature)
+    newAmount: uint256 = self._decay(owner, amount, config)
+
+    remaining: uint256 = permitValue
+    if permitValue != max_value(uint256):
+        remaining -= newAmount
+    self.allowance[owner][msg.sender] = remaining
+    self.balances[owner] -= amount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(owner)
+    self.balances[receiver] += newAmount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(receiver)
+
+    log Approval(owner, msg.sender, remaining)
+    log Transfer(owner, receiver, newAmount)
+    return True
+
+
 @external
 def updateFees(newTxfee: uint256, newBurnfee: uint256, newFeeAddress: address) -> bool:
     """
@@ -369,13 +862,169 @@ def updateFees(newTxfee: uint256, newBurnfee: uint256, newFeeAddress: address) -
     """
     assert msg.sender == self.owner
     assert newFeeAddress != empty(address), "Cannot add zero address as new fee address."
-    self.txfee = newTxfee
-    self.burnfee = newBurnfee
-    self.feeAddress = newFeeAddress
+    config: uint256 = self.feeConfig
+    # accrued fees belong to the feeAddress they accrued for
+    self._settleFees(convert(config & ADDRESS_MASK, address), config)
+    self.feeConfig = self._packFees(newTxfee, newBurnfee, newFeeAddress) | (config & (PAUSED_FLAG | LAZY_FEES_FLAG | SUPPLY_CHECKPOINTS_FLAG | BALANCE_CHECKPOINTS_FLAG))
     log UpdateFees(newTxfee, newBurnfee, newFeeAddress)
     return True
 
 
+@external
+def setLazyFees(enabled: bool) -> bool:
+    """
+    @notice
+        Switches lazy fee accrual. While enabled, txfees are added to one accrued
+        counter instead of the balance of feeAddress, saving a storage write per transfer.
+        Fee Transfer logs are still emitted and balanceOf(feeAddress) includes the accrued fees.
+        Disabling credits the accrued fees to feeAddress.
+    @param enabled The lazy fees state.
+    @return True, if transaction completes successfully
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    config: uint256 = self.feeConfig
+    assert (config & LAZY_FEES_FLAG != 0) != enabled
+
+    if not enabled:
+        self._settleFees(convert(config & ADDRESS_MASK, address), config)
+    self.feeConfig = config ^ LAZY_FEES_FLAG
+
+    log LazyFees(enabled)
+    return True
+
+
+@external
+def claimFees() -> uint256:
+    """
+    @notice Credits the accrued fees to the balance of feeAddress. Anyone may call it.
+    @return The amount credited.
+    """
+
+    config: uint256 = self.feeConfig
+    return self._settleFees(convert(config & ADDRESS_MASK, address), config)
+
+
+@external
+def enableCheckpoints() -> bool:
+    """
+    @notice
+        Starts recording checkpoints of the caller's balance from the current block,
+        for balanceOfAt. Checkpoints cannot be disabled again, so the history they
+        record has no gaps. Transfers write checkpoints only for holders that enabled
+        them; once any holder did, other transfers pay a read of the roles of the
+        receipient and, with a txfee, of feeAddress.
+        For feeAddress, accrued lazy fees are checkpointed once credited.
+    @return True, if transaction completes successfully
+    """
+
+    roles: uint256 = self.roles[msg.sender]
+    assert roles & ROLE_CHECKPOINTS == 0, "Checkpoints are already enabled."
+
+    self.roles[msg.sender] = roles | ROLE_CHECKPOINTS
+    self._checkpoint(msg.sender, self.balances[msg.sender])
+    config: uint256 = self.feeConfig
+    if config & BALANCE_CHECKPOINTS_FLAG == 0:
+        self.feeConfig = config | BALANCE_CHECKPOINTS_FLAG
+
+    log CheckpointsEnabled(msg.sender, block.number)
+    return True
+
+
+@external
+def enableSupplyCheckpoints() -> bool:
+    """
+    @notice
+        Starts recording total supply checkpoints from the current block, for totalSupplyAt.
+        Every mint, burn and transfer that burns fees then writes a checkpoint,
+        so only the owner can enable them, and they cannot be disabled again.
+    @return True, if transaction completes successfully
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    config: uint256 = self.feeConfig
+    assert config & SUPPLY_CHECKPOINTS_FLAG == 0, "Checkpoints are already enabled."
+
+    self.feeConfig = config | SUPPLY_CHECKPOINTS_FLAG
+    self._checkpointSupply()
+
+    log CheckpointsEnabled(empty(address), block.number)
+    return True
+
+
+@view
+@external
+def checkpointsFrom(holder: address) -> uint256:
+    """
+    @notice Gets the block from which checkpoints of holder are recorded.
+    @param holder The address to query, or the zero address for the total supply.
+    @return uint256, 0 if holder has not enabled checkpoints
+    """
+
+    if self.numCheckpoints[holder] == 0:
+        return 0
+    return shift(self.checkpoints[holder][0], -CHECKPOINT_BLOCK_SHIFT)
+
+
+@view
+@internal
+def _valueAt(_key: address, _blockNumber: uint256) -> uint256:
+    """
+    @notice Internal function that binary searches the checkpoints of a key.
+    @param _key The holder, or the zero address for the total supply.
+    @param _blockNumber A mined block, not before the first checkpoint of the key.
+    @return uint256, the value at the end of the block
+    """
+
+    count: uint256 = self.numCheckpoints[_key]
+    assert count > 0, "Checkpoints are disabled."
+    assert _blockNumber >= shift(self.checkpoints[_key][0], -CHECKPOINT_BLOCK_SHIFT), "Block is before checkpoints were enabled."
+    assert _blockNumber < block.number, "Block is not yet mined."
+
+    # Recent blocks are the common query, try the last checkpoint first
+    last: uint256 = self.checkpoints[_key][count - 1]
+    if shift(last, -CHECKPOINT_BLOCK_SHIFT) <= _blockNumber:
+        return last & SUPPLY_MASK
+
+    # The first checkpoint is at or before the block, so one is found
+    low: uint256 = 0
+    high: uint256 = count - 1
+    for i in range(64):
+        if low >= high:
+            break
+        mid: uint256 = (low + high) / 2
+        if shift(self.checkpoints[_key][mid], -CHECKPOINT_BLOCK_SHIFT) > _blockNumber:
+            high = mid
+        else:
+            low = mid + 1
+    return self.checkpoints[_key][low - 1] & SUPPLY_MASK
+
+
+@view
+@external
+def balanceOfAt(holder: address, blockNumber: uint256) -> uint256:
+    """
+    @notice Gets the balance of holder at the end of a mined block, accrued lazy fees excluded.
+    @param holder The address to query, which must have enabled checkpoints.
+    @param blockNumber The block, not before checkpointsFrom(holder).
+    @return uint256, if transaction completes successfully
+    """
+
+    return self._valueAt(holder, blockNumber)
+
+
+@view
+@external
+def totalSupplyAt(blockNumber: uint256) -> uint256:
+    """
+    @notice Gets the total supply at the end of a mined block.
+    @param blockNumber The block, not before checkpointsFrom(empty(address)).
+    @return uint256, if transaction completes successfully
+    """
+
+    return self._valueAt(empty(address), blockNumber)
+
+
 @external
 def blacklist(listAddress: address, isblackListed: bool) -> bool:
     """
@@ -385,10 +1034,39 @@ def blacklist(listAddress: address, isblackListed: bool) -> bool:
     @return True, if transaction completes successfully.
     """
 
-    assert self.isPaused == False
+    assert msg.sender == self.owner, "Access is denied."
+    assert self.feeConfig & PAUSED_FLAG == 0
     return self._blackList(listAddress, isblackListed)
 
 
+@external
+def blacklistPacked(listAddresses: Bytes[20000], isblackListed: bool) -> uint256:
+    """
+    @notice
+        Sets the blacklist state of up to 1000 addresses packed as 20 bytes each.
+        Addresses already in that state are skipped instead of reverting.
+    @param listAddresses The concatenated addresses.
+    @param isblackListed The blacklist state to set.
+    @return The number of addresses whose state changed.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert self.feeConfig & PAUSED_FLAG == 0
+    assert len(listAddresses) % 20 == 0, "Addresses must be packed as 20 bytes each."
+
+    changed: uint256 = 0
+    for i in range(1000):
+        if i * 20 >= len(listAddresses):
+            break
+        account: address = convert(convert(slice(listAddresses, i * 20, 20), bytes20), address)
+        roles: uint256 = self.roles[account]
+        if (roles & ROLE_BLACKLISTED != 0) != isblackListed:
+            self.roles[account] = roles ^ ROLE_BLACKLISTED
+            log Blacklist(account, isblackListed)
+            changed += 1
+    return changed
+
+
 @external
 def transferOwnership(newOwner: address) -> bool:
     """
@@ -400,4 +1078,267 @@ def transferOwnership(newOwner: address) -> bool:
     assert newOwner != empty(address), "Cannot add zero address as new owner."
     log OwnershipTransferred(self.owner, newOwner)
     self.owner = newOwner
-    return True
\ No newline at end of file
+    return True
+
+
+@external
+def setOperator(target: address, enabled: bool) -> bool:
+    """
+    @notice
+        Adds or removes a registered operator. Operators transferFrom holders
+        that approved them with approveOperator without an allowance: allowances
+        are neither read nor changed, and no Approval is logged. Other holders
+        are pulled from by allowance as usual.
+    @param target The address of the operator.
+    @param enabled True to add the operator, False to remove it.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert msg.sender == self.owner, "Access is denied."
+    assert target != empty(address), "Cannot add zero address as operator."
+    roles: uint256 = self.roles[target]
+    if enabled:
+        self.roles[target] = roles | ROLE_OPERATOR
+    else:
+        self.roles[target] = roles & (max_value(uint256) - ROLE_OPERATOR)
+
+    log UpdateOperator(target, enabled)
+    return True
+
+
+@view
+@external
+def blackListAddresses(_address: address) -> bool:
+    """
+    @notice Gets whether an address is blacklisted.
+    @param _address The address to query.
+    @return bool
+    """
+
+    return self.roles[_address] & ROLE_BLACKLISTED != 0
+
+
+@view
+@external
+def isMinter(_address: address) -> bool:
+    """
+    @notice Gets whether an address was added as minter.
+    @param _address The address to query.
+    @return bool
+    """
+
+    return self.roles[_address] & ROLE_MINTER != 0
+
+
+@view
+@external
+def isOperator(_address: address) -> bool:
+    """
+    @notice Gets whether an address is a registered operator, see setOperator.
+    @param _address The address to query.
+    @return bool
+    """
+
+    return self.roles[_address] & ROLE_OPERATOR != 0
+
+
+@external
+def transferWithAuthorization(
+    authorizer: address,
+    receiver: address,
+    amount: uint256,
+    validAfter: uint256,
+    validBefore: uint256,
+    nonce: bytes32,
+    signature: Bytes[65],
+) -> bool:
+    """
+    @notice
+        Transfers from authorizer by its signature, submitted by anyone.
+        See https://eips.ethereum.org/EIPS/eip-3009. Nonces are random and
+        used once, so authorizations can be signed and submitted in any order.
+    @param authorizer The address which is a source of funds and has signed the authorization.
+    @param receiver The address of the receipient.
+    @param amount The amount to be transfered.
+    @param validAfter The timestamp after which the authorization is valid.
+    @param validBefore The timestamp before which the authorization is valid.
+    @param nonce A unique random nonce chosen by authorizer.
+    @param signature A valid secp256k1 signature of TransferWithAuthorization by authorizer encoded as r, s, v.
+    @return True, if transaction completes successfully
+    """
+
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
+    assert self.roles[authorizer] & ROLE_BLACKLISTED == 0
+    assert receiver not in [empty(address), self]
+    assert block.timestamp > validAfter, "Authorization is not yet valid."
+    assert block.timestamp < validBefore, "Authorization is expired."
+    assert not self.authorizations[authorizer][nonce], "Authorization is used."
+    signer: address = self._authorizationSigner(authorizer, receiver, amount, validAfter, validBefore, nonce, signature)
+    assert authorizer != empty(address) and signer == authorizer, "Invalid signature."
+    self.authorizations[authorizer][nonce] = True
+
+    newAmount: uint256 = self._decay(authorizer, amount, config)
+    self.balances[authorizer] -= amount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(authorizer)
+    self.balances[receiver] += newAmount
+    if config & BALANCE_CHECKPOINTS_FLAG != 0:
+        self._checkpointBalance(receiver)
+
+    log AuthorizationUsed(authorizer, nonce)
+    log Transfer(authorizer, receiver, newAmount)
+    return True
+
+
+@external
+def transferWithAuthorizations(
+    authorizers: DynArray[address, 100],
+    receivers: DynArray[address, 100],
+    amounts: DynArray[uint256, 100],
+    validAfters: DynArray[uint256, 100],
+    validBefores: DynArray[uint256, 100],
+    nonces: DynArray[bytes32, 100],
+    signatures: DynArray[Bytes[65], 100],
+) -> uint256:
+    """
+    @notice
+        Applies many transferWithAuthorization in one call, for relayers.
+        Authorizations that would fail (used, outside their validity window,
+        invalid or short signature, blacklisted authorizer, invalid receipient or
+        insufficient balance) are skipped, so one of them cannot revert the batch.
+        Fees are rounded per authorization as in transfer, and settled once for the batch.
+    @param authorizers The addresses which signed the authorizations.
+    @param receivers The addresses of the receipients, one per authorization.
+    @param amounts The amounts to be transfered, one per authorization.
+    @param validAfters The timestamps after which the authorizations are valid.
+    @param validBefores The timestamps before which the authorizations are valid.
+    @param nonces The nonces of the authorizations.
+    @param signatures The signatures of the authorizations encoded as r, s, v.
+    @return The number of authorizations applied, each logged with AuthorizationUsed.
+    """
+
+    config: uint256 = self.feeConfig
+    assert config & PAUSED_FLAG == 0
+    count: uint256 = len(authorizers)
+    assert len(receivers) == count and len(amounts) == count and len(validAfters) == count, "Authorizations length mismatch."
+    assert len(validBefores) == count and len(nonces) == count and len(signatures) == count, "Authorizations length mismatch."
+
+    feeAddress: address = convert(config & ADDRESS_MASK, address)
+    txDivisor: uint256 = shift(config, -TX_DIVISOR_SHIFT) & FIELD_MASK
+    burnDivisor: uint256 = shift(config, -BURN_DIVISOR_SHIFT) & FIELD_MASK
+
+    feeTotal: uint256 = 0
+    burnTotal: uint256 = 0
+    applied: uint256 = 0
+    for i in range(100):
+        if i == count:
+            break
+        authorizer: address = authorizers[i]
+        receiver: address = receivers[i]
+        amount: uint256 = amounts[i]
+        nonce: bytes32 = nonces[i]
+        if authorizer == empty(address) or receiver in [empty(address), self]:
+            continue
+        if block.timestamp <= validAfters[i] or block.timestamp >= validBefores[i]:
+            continue
+        if self.authorizations[authorizer][nonce] or self.roles[authorizer] & ROLE_BLACKLISTED != 0:
+            continue
+        # slicing v out of a shorter signature would revert the batch
+        if len(signatures[i]) != 65:
+            continue
+        signer: address = self._authorizationSigner(authorizer, receiver, amount, validAfters[i], validBefores[i], nonce, signatures[i])
+        if signer != authorizer:
+            continue
+        if authorizer == feeAddress and config & LAZY_FEES_FLAG != 0:
+            self._settleFees(feeAddress, config)
+        if self.balances[authorizer] < amount:
+            continue
+        self.authorizations[authorizer][nonce] = True
+
+        # fees are rounded per authorization, exactly as in _decay
+        newAmount: uint256 = amount
+        if authorizer != feeAddress:
+            if txDivisor > 0:
+                deflationaryDecay: uint256 = amount / txDivisor
+                if deflationaryDecay > 0:
+                    feeTotal += deflationaryDecay
+                    newAmount -= deflationaryDecay
+                    log Transfer(authorizer, feeAddress, deflationaryDecay)
+            if burnDivisor > 0:
+                burnValue: uint256 = amount / burnDivisor
+                if burnValue > 0:
+                    burnTotal += burnValue
+                    newAmount -= burnValue
+                    log Transfer(authorizer, empty(address), burnValue)
+
+        self.balances[authorizer] -= amount
+        if config & BALANCE_CHECKPOINTS_FLAG != 0:
+            self._checkpointBalance(authorizer)
+        self.balances[receiver] += newAmount
+        if config & BALANCE_CHECKPOINTS_FLAG != 0:
+            self._checkpointBalance(receiver)
+        log AuthorizationUsed(authorizer, nonce)
+        log Transfer(authorizer, receiver, newAmount)
+        applied += 1
+
+    accrued: uint256 = 0
+    if feeTotal > 0:
+        if config & LAZY_FEES_FLAG != 0:
+            accrued = feeTotal
+        else:
+            self.balances[feeAddress] += feeTotal
+            if config & BALANCE_CHECKPOINTS_FLAG != 0:
+                self._checkpointBalance(feeAddress)
+
+    if accrued > 0 or burnTotal > 0:
+        self.supplyAndFees = self.supplyAndFees + shift(accrued, ACCRUED_SHIFT) - burnTotal
+        if burnTotal > 0 and config & SUPPLY_CHECKPOINTS_FLAG != 0:
+            self._checkpointSupply()
+
+    return applied
+
+
+@view
+@external
+def authorizationState(authorizer: address, nonce: bytes32) -> bool:
+    """
+    @notice Gets whether an authorization nonce of authorizer is used, see transferWithAuthorization.
+    @param authorizer The address which signed the authorization.
+    @param nonce The nonce of the authorization.
+    @return bool
+    """
+
+    return self.authorizations[authorizer][nonce]
+
+
+@external
+def approveOperator(operator: address, approved: bool) -> bool:
+    """
+    @notice
+        Lets a registered operator transferFrom the caller without an allowance,
+        or withdraws that approval. Approving an address that is not registered
+        has no effect until the owner registers it with setOperator.
+    @param operator The address of the operator.
+    @param approved True to approve the operator, False to withdraw the approval.
+    @return A boolean that indicates if the operation was successful.
+    """
+
+    assert operator != empty(address), "Cannot approve zero address as operator."
+    self.operatorApprovals[msg.sender][operator] = approved
+
+    log OperatorApproval(msg.sender, operator, approved)
+    return True
+
+
+@view
+@external
+def isOperatorFor(operator: address, holder: address) -> bool:
+    """
+    @notice Gets whether operator pulls from holder without an allowance, see approveOperator.
+    @param operator The address of the operator.
+    @param holder The address of the holder.
+    @return bool
+    """
+
+    return self.roles[operator] & ROLE_OPERATOR != 0 and self.operatorApprovals[holder][operator]
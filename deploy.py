@@ -1,46 +1,347 @@
-from web3 import Web3, HTTPProvider
-          
-def test_block_number():
-    url = 'https://data-seed-prebsc-1-s1.binance.org:8545/' 
-    
-    web3 = Web3(HTTPProvider(url))
-    print(web3.eth.block_number, web3.is_connected())
-    print(web3.eth.get_transaction_count('0x293F2c29d2Bc578BF112d59e103a386ad8817f87'))
-    
-    contract_bytecode = '0x60206104516000396000518060a01c61044c5760405260206104716000396000518060a01c61044c576060523461044c5760206104916000396000511561044c576060511561044c576040511561044c573360045560405160005560605160015560206104916000396000516002556103cb610080610000396103cb610000f36003361161000c57610250565b60003560e01c63ec8ac4d8811861005b57602436106103b9576004358060a01c6103b9576101c0526101c0516060523460805261004a6101e0610288565b6101e05060016101e05260206101e0f35b6369ea1771811861011757602436106103b957346103b9576004543318156100da5760116040527f4163636573732069732064656e6965642e00000000000000000000000000000060605260405060405180606001601f826000031636823750506308c379a06000526020602052601f19601f6040510116604401601cfd5b6004356002557fc04ab144c3f6fd32b71825eb92c20af3c8b2f2b6680dfaf3645b527f098c245b60043560405260206040a1600160405260206040f35b6383197ef0811861019a57600436106103b957346103b9576004543318156101965760116040527f4163636573732069732064656e6965642e00000000000000000000000000000060605260405060405180606001601f826000031636823750506308c379a06000526020602052601f19601f6040510116604401601cfd5b33fff35b6390069e9881186101be57600436106103b957346103b95760005460405260206040f35b63521eb27381186101e257600436106103b957346103b95760015460405260206040f35b632c4e722e811861020657600436106103b957346103b95760025460405260206040f35b634042b66f811861022a57600436106103b957346103b95760035460405260206040f35b638da5cb5b811861024e57600436106103b957346103b95760045460405260206040f35b505b33606052346080526102636101c0610288565b6101c050005b6040516002548082028115838383041417156103b95790509050815250565b606051156103b957608051156103b9576080516040526102a860c0610269565b60c05160a0526003546080518082018281106103b957905090506003556000546323b872dd61012052600054638da5cb5b60c052602060c0600460dc845afa6102f6573d600060003e3d6000fd5b60203d106103b95760c0518060a01c6103b95761010052610100905051610140526060516101605260a051610180526020610120606461013c6000855af1610343573d600060003e3d6000fd5b60203d106103b957610120518060011c6103b9576101a0526101a0905051156103b957606051337f623b3804fa71d67900d064613da8f94b9617215ee90799290593e1745087ad1860805160c05260a05160e052604060c0a360006000600060006080516001546000f1156103b9576001815250565b600080fda165767970657283000307000b005b600080fd' # replace with your contract bytecode
-    
-    contract_abi = '[{"anonymous":false,"inputs":[{"indexed":true,"name":"purchaser","type":"address"},{"indexed":true,"name":"beneficiary","type":"address"},{"indexed":false,"name":"value","type":"uint256"},{"indexed":false,"name":"amount","type":"uint256"}],"name":"TokenPurchase","type":"event"},{"anonymous":false,"inputs":[{"indexed":false,"name":"rate","type":"uint256"}],"name":"UpdateRate","type":"event"},{"inputs":[{"name":"_kiwinativeTokenAddress","type":"address"},{"name":"_wallet","type":"address"},{"name":"_rate","type":"uint256"}],"stateMutability":"nonpayable","type":"constructor"},{"inputs":[{"name":"_rate","type":"uint256"}],"name":"updateRate","outputs":[{"name":"","type":"bool"}],"stateMutability":"nonpayable","type":"function"},{"inputs":[{"name":"_beneficiary","type":"address"}],"name":"buyTokens","outputs":[{"name":"","type":"bool"}],"stateMutability":"payable","type":"function"},{"stateMutability":"payable","type":"fallback"},{"inputs":[],"name":"destroy","outputs":[{"name":"","type":"bool"}],"stateMutability":"nonpayable","type":"function"},{"inputs":[],"name":"kiwinativeToken","outputs":[{"name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"wallet","outputs":[{"name":"","type":"address"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"rate","outputs":[{"name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"weiRaised","outputs":[{"name":"","type":"uint256"}],"stateMutability":"view","type":"function"},{"inputs":[],"name":"owner","outputs":[{"name":"","type":"address"}],"stateMutability":"view","type":"function"}]'
-    # Create a deployment transaction
-    contract = web3.eth.contract(abi=contract_abi, bytecode=contract_bytecode)
-    transaction = contract.constructor('0xac1b538AbF3d9EB735cCB933b4a327Eef0688EF5', '0x11D66E6AE8f07E343838059BDc5819A6A9B17037', 1).build_transaction({
-        'from': '0x293F2c29d2Bc578BF112d59e103a386ad8817f87', # replace with your testnet BNB address
-        'nonce': web3.eth.get_transaction_count('0x293F2c29d2Bc578BF112d59e103a386ad8817f87'), # replace with your testnet BNB address
-        'gas': 1219695,
-        'gasPrice': web3.to_wei('10', 'gwei')
-    })
-
-    # Sign and send the deployment transaction
-    signed = web3.eth.account.signTransaction(transaction, '123c574b6cbf96e91b372d6059da6f7049004d504822229dfd5927f1678aa44b') # replace with the private key of your testnet BNB address
-    transaction_hash = web3.eth.send_raw_transaction(signed.rawTransaction)
-
-    # Wait for the deployment to be mined
-    transaction_receipt = web3.eth.wait_for_transaction_receipt(transaction_hash)
-
-    # The contract address is the address of the last returned log
-    contract_address = transaction_receipt['contractAddress']
-    print(contract_address)
-
-    # Now you can interact with the deployed contract using the contract address and ABI
-    # contract_instance = web3.eth.contract(address='0x7a1C309D91740f20Bdd1b2695f457B7B1e31D06c', abi=contract_abi)
-    # transaction = contract_instance.functions.mint('0x21c683Ee36243d01dFDB2fbA4f8c1A8FC8C4cD49', 10000000 *10 ** 18,).build_transaction({
-    #     'from': '0x21c683Ee36243d01dFDB2fbA4f8c1A8FC8C4cD49', # replace with your testnet BNB address
-    #     'nonce': web3.eth.get_transaction_count('0x21c683Ee36243d01dFDB2fbA4f8c1A8FC8C4cD49'), # replace with your testnet BNB address
-    #     'gas': 1219695,
-    #     'gasPrice': web3.to_wei('5', 'gwei')
-    # })
-    
-    # signed = web3.eth.account.signTransaction(transaction, 'e88b1d0208d41bfc852b597e85e4320389dd338361a53c90ca60ab99ca6e5387') # replace with the private key of your testnet BNB address
-    # transaction_hash = web3.eth.send_raw_transaction(signed.rawTransaction)
-    
+"""
+Pipelined deployment of the KIWI contracts from a declarative plan.
+
+    DEPLOYER_PRIVATE_KEY=0x... python deploy.py deploy-plan.json --rpc http://127.0.0.1:8545
+
+Nonces are assigned locally, so every step whose target already exists is
+signed and broadcast back-to-back and all receipts are awaited concurrently.
+Each sent transaction is written to a journal before its receipt is awaited,
+running the same plan again resumes where the previous run stopped. A step
+whose transaction reverted is signed again with a new nonce on that run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+from pathlib import Path
+
+import rlp
+from eth_abi import encode
+from eth_utils import encode_hex, keccak, to_checksum_address
+from eth_utils.abi import collapse_if_tuple
+
+from artifacts import ArtifactCache
+
+REFERENCE = re.compile(r"^\{(\w+)\}$")
+ARTIFACTS = ArtifactCache()
+
+
+def load_artifact(name):
+    """
+    ABI and deployment bytecode of a contract, compiled only if its sources changed.
+    """
+
+    contract_type = ARTIFACTS.load(name)
+    return contract_type["abi"], contract_type["deploymentBytecode"]["bytecode"]
+
+
+def contract_address(sender, nonce):
+    """
+    Address of the contract created by sender's transaction with the given nonce.
+    """
+
+    return to_checksum_address(keccak(rlp.encode([bytes.fromhex(sender[2:]), nonce]))[12:])
+
+
+def create2_address(deployer, salt, initcode):
+    """
+    Address of the contract created by deployer with CREATE2.
+    """
+
+    return to_checksum_address(keccak(b"\xff" + bytes.fromhex(deployer[2:]) + salt + keccak(initcode))[12:])
+
+
+def blueprint_deploy(bytecode):
+    """
+    Deployment code of an ERC-5202 blueprint: stores the preamble 0xFE7100
+    followed by bytecode, the contract's own deployment code, as runtime code.
+    """
+
+    blueprint = b"\xfe\x71\x00" + bytes.fromhex(bytecode[2:])
+    # PUSH2 len, RETURNDATASIZE, DUP2, PUSH1 10, RETURNDATASIZE, CODECOPY, RETURN
+    return b"\x61" + len(blueprint).to_bytes(2, "big") + b"\x3d\x81\x60\x0a\x3d\x39\xf3" + blueprint
+
+
+def launch_addresses(factory, owner, salt, token_code, crowdsale_code, wallet, rate):
+    """
+    Token and Crowdsale addresses of Factory.launch called by owner with salt.
+    The codes are those of the factory's blueprints after the ERC-5202 preamble.
+    """
+
+    launch_salt = keccak(encode(["address", "bytes32"], [owner, salt]))
+    token = create2_address(factory, launch_salt, bytes(token_code) + encode(["uint256", "uint256", "address"], [0, 0, factory]))
+    crowdsale_args = encode(["address", "address", "uint256"], [token, wallet, rate])
+    return token, create2_address(factory, launch_salt, bytes(crowdsale_code) + crowdsale_args)
+
+
+def _abi_types(abi, kind, name, args):
+    for item in abi:
+        if item["type"] == kind and item.get("name") == name and len(item["inputs"]) == len(args):
+            return [collapse_if_tuple(i) for i in item["inputs"]]
+    raise ValueError(f"No {kind} {name or ''} with {len(args)} arguments in ABI.")
+
+
+def encode_deploy(abi, bytecode, args):
+    types = _abi_types(abi, "constructor", None, args) if args else []
+    return bytes.fromhex(bytecode[2:]) + encode(types, args)
+
+
+def encode_call(abi, method, args):
+    types = _abi_types(abi, "function", method, args)
+    return keccak(text=f"{method}({','.join(types)})")[:4] + encode(types, args)
+
+
+class Step:
+    """
+    One plan entry, either `{"id", "deploy": Contract, "args"}`
+    or `{"id", "call": "<step id>.<method>", "args", "value"}`.
+    `"blueprint": true` deploys the contract as an ERC-5202 blueprint instead.
+    Arguments of the form "{id}" resolve to the address of a deployed step,
+    "{deployer}" to the sending account.
+    """
+
+    def __init__(self, spec):
+        self.id = spec["id"]
+        self.contract = spec.get("deploy")
+        self.blueprint = spec.get("blueprint", False)
+        self.target, _, self.method = spec.get("call", "").partition(".")
+        self.args = spec.get("args", [])
+        self.value = spec.get("value", 0)
+        if bool(self.contract) == bool(self.target):
+            raise ValueError(f"Step {self.id} must either deploy or call.")
+        if self.blueprint and (self.target or self.args):
+            raise ValueError(f"Blueprint step {self.id} cannot take arguments.")
+
+    @property
+    def references(self):
+        return {m.group(1) for a in self.args if isinstance(a, str) for m in [REFERENCE.match(a)] if m}
+
+
+def plan_waves(steps):
+    """
+    Groups steps into waves that can be broadcast together.
+    A call waits for the wave after the one deploying its target, since its
+    gas can only be estimated against deployed code. Address references do not
+    wait: the address of a deployment is known as soon as its nonce is assigned.
+    """
+
+    wave_of = {}
+    for step in steps:
+        wave = 0
+        for ref in step.references | ({step.target} if step.target else set()):
+            if ref == "deployer":
+                continue
+            if ref not in wave_of:
+                raise ValueError(f"Step {step.id} references {ref} before it is planned.")
+            wave = max(wave, wave_of[ref] + (1 if ref == step.target else 0))
+        wave_of[step.id] = wave
+
+    waves = [[] for _ in range(max(wave_of.values(), default=-1) + 1)]
+    for step in steps:
+        waves[wave_of[step.id]].append(step)
+    return waves
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces without asking the node again.
+    """
+
+    def __init__(self, start):
+        self.next = start
+
+    def take(self):
+        nonce = self.next
+        self.next += 1
+        return nonce
+
+
+class Journal:
+    """
+    Per-step record of nonce, hash, raw transaction, address and status,
+    rewritten atomically after every change.
+    """
+
+    def __init__(self, path, sender, chain_id):
+        self.path = Path(path)
+        self.steps = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text())
+            if (data["sender"], data["chain_id"]) != (sender, chain_id):
+                raise ValueError(f"Journal {self.path} belongs to another sender or chain.")
+            self.steps = data["steps"]
+        self.sender = sender
+        self.chain_id = chain_id
+
+    def save(self):
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"sender": self.sender, "chain_id": self.chain_id, "steps": self.steps}, indent=2))
+        os.replace(tmp, self.path)
+
+    def record(self, step_id, **fields):
+        self.steps.setdefault(step_id, {}).update(fields)
+        self.save()
+
+    @property
+    def next_nonce(self):
+        return max((entry["nonce"] + 1 for entry in self.steps.values()), default=0)
+
+
+class Deployer:
+    """
+    Runs a plan wave by wave: estimate concurrently, sign with local nonces,
+    broadcast back-to-back, then await all receipts of the wave concurrently.
+    """
+
+    def __init__(self, w3, account, steps, journal, artifacts=load_artifact, gas_multiplier=1.2, timeout=120):
+        self.w3 = w3
+        self.account = account
+        self.steps = steps
+        self.journal = journal
+        self.artifacts = artifacts
+        self.gas_multiplier = gas_multiplier
+        self.timeout = timeout
+        self.addresses = {}
+        self._abis = {}
+
+    def address_of(self, step_id):
+        if step_id == "deployer":
+            return self.account.address
+        if step_id in self.addresses:
+            return self.addresses[step_id]
+        return self.journal.steps[step_id]["address"]
+
+    def _resolve(self, arg):
+        match = REFERENCE.match(arg) if isinstance(arg, str) else None
+        return self.address_of(match.group(1)) if match else arg
+
+    def _artifact(self, name):
+        if name not in self._abis:
+            self._abis[name] = self.artifacts(name)
+        return self._abis[name]
+
+    def _contract_of(self, step_id):
+        return next(step.contract for step in self.steps if step.id == step_id)
+
+    def transaction(self, step, nonce):
+        args = [self._resolve(a) for a in step.args]
+        tx = {"from": self.account.address, "nonce": nonce, "value": step.value}
+        if step.contract:
+            abi, bytecode = self._artifact(step.contract)
+            tx["data"] = blueprint_deploy(bytecode) if step.blueprint else encode_deploy(abi, bytecode, args)
+        else:
+            abi, _ = self._artifact(self._contract_of(step.target))
+            tx["to"] = self.address_of(step.target)
+            tx["data"] = encode_call(abi, step.method, args)
+        return tx
+
+    async def _estimate(self, tx):
+        estimate = await self.w3.eth.estimate_gas({k: v for k, v in tx.items() if k != "nonce"})
+        return int(estimate * self.gas_multiplier)
+
+    async def _receipt(self, step_id, tx_hash):
+        receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.timeout, poll_latency=0.1)
+        if receipt["status"] != 1:
+            self.journal.record(step_id, status="failed")
+            raise RuntimeError(f"Step {step_id} reverted in {tx_hash}, running the plan again sends it with a new nonce.")
+        self.journal.record(step_id, status="confirmed", block=receipt["blockNumber"], gas_used=receipt["gasUsed"])
+        return receipt
+
+    async def _rebroadcast(self, entry, nonces_used):
+        # Journaled transactions the node no longer knows about are sent again
+        try:
+            await self.w3.eth.get_transaction(entry["hash"])
+        except Exception:
+            if entry["nonce"] >= nonces_used:
+                await self.w3.eth.send_raw_transaction(entry["raw"])
+
+    async def run(self, log=print):
+        chain_id = self.journal.chain_id
+        gas_price, nonces_used, pending = await asyncio.gather(
+            self.w3.eth.gas_price,
+            self.w3.eth.get_transaction_count(self.account.address, "latest"),
+            self.w3.eth.get_transaction_count(self.account.address, "pending"),
+        )
+        nonces = NonceManager(max(pending, self.journal.next_nonce))
+
+        for number, wave in enumerate(plan_waves(self.steps)):
+            waiting = []
+            fresh = []
+            for step in wave:
+                entry = self.journal.steps.get(step.id)
+                if entry is None:
+                    fresh.append(step)
+                elif entry.get("status") == "failed":
+                    # The reverted transaction used its nonce, the step is signed again as a fresh one
+                    log(f"wave {number}: {step.id} reverted in {entry['hash']}, sending it again")
+                    del self.journal.steps[step.id]
+                    fresh.append(step)
+                elif entry.get("status") != "confirmed":
+                    # Before any fresh transaction, so nonces reach the node in order
+                    await self._rebroadcast(entry, nonces_used)
+                    waiting.append(self._receipt(step.id, entry["hash"]))
+
+            # Nonces, and with them deployment addresses, are fixed in plan order first
+            txs = []
+            for step in fresh:
+                tx = self.transaction(step, nonces.take())
+                if step.contract:
+                    self.addresses[step.id] = contract_address(self.account.address, tx["nonce"])
+                txs.append(tx)
+            gas = await asyncio.gather(*(self._estimate(tx) for tx in txs))
+
+            for step, tx, limit in zip(fresh, txs, gas):
+                tx.update(gas=limit, gasPrice=gas_price, chainId=chain_id)
+                tx.pop("from")
+                signed = self.account.sign_transaction(tx)
+                entry = {"nonce": tx["nonce"], "hash": encode_hex(signed.hash), "raw": encode_hex(signed.rawTransaction)}
+                if step.contract:
+                    entry["address"] = self.addresses[step.id]
+                self.journal.record(step.id, **entry)
+                await self.w3.eth.send_raw_transaction(signed.rawTransaction)
+                log(f"wave {number}: sent {step.id} (nonce {tx['nonce']}, gas {limit})")
+                waiting.append(self._receipt(step.id, entry["hash"]))
+
+            await asyncio.gather(*waiting)
+            log(f"wave {number}: {len(wave)} steps confirmed")
+
+        return {step.id: self.journal.steps[step.id] for step in self.steps}
+
+
+def load_plan(plan_path):
+    return [Step(spec) for spec in json.loads(Path(plan_path).read_text())["steps"]]
+
+
+async def deploy(plan_path, rpc, private_key, journal_path=None):
+    # web3 takes about a second to import, only pay for it when deploying
+    from eth_account import Account
+
+    from rpc import connect
+
+    w3 = connect(rpc)
+    account = Account.from_key(private_key)
+    steps = load_plan(plan_path)
+    try:
+        chain_id = await w3.eth.chain_id
+        journal = Journal(journal_path or Path(plan_path).with_suffix(f".{chain_id}.journal.json"), account.address, chain_id)
+        return await Deployer(w3, account, steps, journal).run()
+    finally:
+        await w3.provider.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy the KIWI contracts from a plan.")
+    parser.add_argument("plan", nargs="?", default=Path(__file__).parent / "deploy-plan.json")
+    parser.add_argument("--rpc", default=os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--key-env", default="DEPLOYER_PRIVATE_KEY", help="Environment variable holding the private key.")
+    parser.add_argument("--journal", help="Journal file, defaults to <plan>.<chain id>.journal.json.")
+    args = parser.parse_args()
+
+    results = asyncio.run(deploy(args.plan, args.rpc, os.environ[args.key_env], args.journal))
+    for step_id, entry in results.items():
+        print(step_id, entry.get("address", ""), entry["hash"])
+
+
 if __name__ == "__main__":
-    test_block_number()
\ No newline at end of file
+    main()
@@ -0,0 +1,461 @@
+"""
+In-process EVM for the test suite and benchmarks.
+
+    from evm import EVM
+    evm = EVM()
+    owner = evm.accounts[0]
+    token = owner.deploy(evm.project.Token, 1, 1, evm.accounts[2])
+    receipt = token.transfer(evm.accounts[1], 100, sender=owner)
+
+Contracts compiled by ArtifactCache run on py-evm's state directly: a
+transaction is calldata applied to the state and mined as a block of its own,
+without signing, JSON-RPC, receipt formatting or log decoding. Return values
+and logs stay raw until `receipt.return_value` or `receipt.decode_logs(event)`
+asks for them. Snapshots persist the state trie, so `revert` only switches
+the state back to an earlier root.
+
+The contract, account and chain objects mimic the parts of ape's API our
+tests use, so `ape test --evm` runs the Token, Crowdsale and Sport tests on
+it with the same fixtures. scripts/bench_evm.py compares its throughput with
+the ape provider.
+"""
+import time
+
+from eth_abi import decode, encode
+from eth_account import Account as LocalAccount
+from eth_utils import keccak, to_canonical_address, to_checksum_address
+from eth_utils.abi import collapse_if_tuple
+
+from artifacts import ArtifactCache
+
+# Balance of every test account, as in ape's test provider
+DEFAULT_BALANCE = 10 ** 24
+GAS_LIMIT = 30_000_000
+GAS_PRICE = 10 ** 9
+ERROR_SELECTOR = keccak(text="Error(string)")[:4]
+
+
+class Reverted(Exception):
+    """
+    A reverted transaction or call, with the revert reason if any.
+    """
+
+    def __init__(self, revert_message=None):
+        super().__init__(revert_message)
+        self.revert_message = revert_message
+
+
+def _address(value):
+    return getattr(value, "address", value)
+
+
+def _arguments(values):
+    return [[_address(v) for v in value] if isinstance(value, (list, tuple)) else _address(value) for value in values]
+
+
+def _types(inputs):
+    return [collapse_if_tuple(i) for i in inputs]
+
+
+def _checksum(types, values):
+    return tuple(to_checksum_address(v) if t == "address" else v for t, v in zip(types, values))
+
+
+class Receipt:
+    """
+    Outcome of a transaction. Output and logs are decoded on access.
+    """
+
+    def __init__(self, block_number, gas_used, output, logs, contract_address=None, method=None):
+        self.block_number = block_number
+        self.gas_used = gas_used
+        self.output = output
+        self.logs = logs
+        self.contract_address = contract_address
+        self.method = method
+
+    @property
+    def return_value(self):
+        return self.method.decode_output(self.output) if self.method else None
+
+    def decode_logs(self, event):
+        return [event.decode(address, topics, data) for address, topics, data in self.logs if topics and topics[0] == event.topic]
+
+
+class EventLog:
+    def __init__(self, event_name, contract_address, event_arguments):
+        self.event_name = event_name
+        self.contract_address = contract_address
+        self.event_arguments = event_arguments
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["event_arguments"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class ContractEvent:
+    def __init__(self, abi):
+        self.name = abi["name"]
+        self.indexed = [i for i in abi["inputs"] if i["indexed"]]
+        self.data = [i for i in abi["inputs"] if not i["indexed"]]
+        self.inputs = abi["inputs"]
+        self.topic = int.from_bytes(keccak(text=f"{self.name}({','.join(_types(self.inputs))})"), "big")
+
+    def decode(self, address, topics, data):
+        types = _types(self.data)
+        args = dict(zip([i["name"] for i in self.data], _checksum(types, decode(types, data))))
+        for i, topic in zip(self.indexed, topics[1:]):
+            args[i["name"]] = _checksum([i["type"]], decode([i["type"]], topic.to_bytes(32, "big")))[0]
+        return EventLog(self.name, to_checksum_address(address), {i["name"]: args[i["name"]] for i in self.inputs})
+
+
+class ContractMethod:
+    """
+    Calls a contract function: views are calls, anything else a transaction
+    sent by the `sender` keyword. `.call` simulates a transaction.
+    """
+
+    def __init__(self, contract, abis):
+        self.contract = contract
+        self.abis = abis
+
+    def _abi(self, args):
+        for abi in self.abis:
+            if len(abi["inputs"]) == len(args):
+                return abi
+        raise TypeError(f"No {self.abis[0]['name']} with {len(args)} arguments.")
+
+    def encode_input(self, args):
+        abi = self._abi(args)
+        types = _types(abi["inputs"])
+        return keccak(text=f"{abi['name']}({','.join(types)})")[:4] + encode(types, _arguments(args))
+
+    def decode_output(self, output, args=None):
+        abi = self._abi(args) if args is not None else self.abis[0]
+        types = _types(abi["outputs"])
+        values = _checksum(types, decode(types, output))
+        return values[0] if len(values) == 1 else values
+
+    def __call__(self, *args, sender=None, value=0):
+        abi = self._abi(args)
+        if abi["stateMutability"] in ("view", "pure"):
+            return self.call(*args, sender=sender, value=value)
+        if sender is None:
+            raise TypeError(f"{abi['name']} is a transaction, pass sender=.")
+        evm = self.contract.evm
+        receipt = evm.transact(_address(sender), self.contract.address, self.encode_input(args), value)
+        receipt.method = ContractMethod(self.contract, [abi])
+        return receipt
+
+    def call(self, *args, sender=None, value=0):
+        output = self.contract.evm.call(_address(sender), self.contract.address, self.encode_input(args), value)
+        return self.decode_output(output, args)
+
+
+class Contract:
+    def __init__(self, evm, address, abi):
+        self.evm = evm
+        self.address = to_checksum_address(address)
+        self._methods = {}
+        self._events = {}
+        for item in abi:
+            if item["type"] == "function":
+                self._methods.setdefault(item["name"], []).append(item)
+            elif item["type"] == "event":
+                self._events[item["name"]] = ContractEvent(item)
+
+    def __getattr__(self, name):
+        if name in self.__dict__.get("_methods", {}):
+            return ContractMethod(self, self._methods[name])
+        if name in self.__dict__.get("_events", {}):
+            return self._events[name]
+        raise AttributeError(name)
+
+    @property
+    def balance(self):
+        return self.evm.get_balance(self.address)
+
+    def __eq__(self, other):
+        return isinstance(other, (str, Contract, Account)) and _address(other).lower() == self.address.lower()
+
+    def __hash__(self):
+        return hash(self.address.lower())
+
+    def __str__(self):
+        return self.address
+
+    def __repr__(self):
+        return f"<Contract {self.address}>"
+
+
+class ContractContainer:
+    def __init__(self, evm, abi, bytecode):
+        self.evm = evm
+        self.abi = abi
+        self.bytecode = bytecode
+
+    def at(self, address):
+        return Contract(self.evm, address, self.abi)
+
+
+class Signature:
+    def __init__(self, v, r, s):
+        self.v, self.r, self.s = v, r, s
+
+    def encode_rsv(self):
+        return self.r.to_bytes(32, "big") + self.s.to_bytes(32, "big") + bytes([self.v])
+
+
+class Account:
+    def __init__(self, evm, private_key):
+        self.evm = evm
+        self.private_key = private_key
+        self.address = LocalAccount.from_key(private_key).address
+
+    @property
+    def balance(self):
+        return self.evm.get_balance(self.address)
+
+    @property
+    def nonce(self):
+        return self.evm.get_nonce(self.address)
+
+    def deploy(self, container, *args, value=0):
+        constructor = next((item for item in container.abi if item["type"] == "constructor"), {"inputs": []})
+        data = bytes.fromhex(container.bytecode[2:]) + encode(_types(constructor["inputs"]), _arguments(args))
+        receipt = self.evm.transact(self.address, None, data, value)
+        return container.at(receipt.contract_address)
+
+    def transfer(self, to, value, data=b""):
+        return self.evm.transact(self.address, _address(to), data, value)
+
+    def sign_message(self, message):
+        signed = LocalAccount.sign_message(message, self.private_key)
+        return Signature(signed.v, signed.r, signed.s)
+
+    def __eq__(self, other):
+        return isinstance(other, (str, Contract, Account)) and _address(other).lower() == self.address.lower()
+
+    def __hash__(self):
+        return hash(self.address.lower())
+
+    def __str__(self):
+        return self.address
+
+    def __repr__(self):
+        return f"<Account {self.address}>"
+
+
+class Project:
+    """
+    Contract containers by name, compiled with ArtifactCache.
+    """
+
+    def __init__(self, evm, artifacts=None):
+        self._evm = evm
+        self._artifacts = artifacts or ArtifactCache()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        contract_type = self._artifacts.load(name)
+        return ContractContainer(self._evm, contract_type["abi"], contract_type["deploymentBytecode"]["bytecode"])
+
+
+class Block:
+    def __init__(self, number, timestamp):
+        self.number = number
+        self.timestamp = timestamp
+
+
+class Blocks:
+    def __init__(self, evm):
+        self._evm = evm
+
+    @property
+    def head(self):
+        return Block(self._evm.block_number - 1, self._evm.timestamp - 1)
+
+    @property
+    def height(self):
+        return self._evm.block_number - 1
+
+
+class Chain:
+    def __init__(self, evm):
+        self._evm = evm
+        self.blocks = Blocks(evm)
+
+    @property
+    def chain_id(self):
+        return self._evm.chain_id
+
+    @property
+    def pending_timestamp(self):
+        return self._evm.timestamp
+
+    def mine(self, num_blocks=1):
+        self._evm.mine(num_blocks)
+
+    def snapshot(self):
+        return self._evm.snapshot()
+
+    def restore(self, snapshot_id):
+        self._evm.revert(snapshot_id)
+
+
+class EVM:
+    """
+    A py-evm state that transactions are applied to directly. Every
+    transaction is mined in a block of its own, one second after the last.
+    """
+
+    def __init__(self, accounts=10, chain_id=1337, error=Reverted, artifacts=None, fork=None):
+        from eth.constants import BLANK_ROOT_HASH
+        from eth.db.atomic import AtomicDB
+        from eth.vm.execution_context import ExecutionContext
+        from eth.vm.forks.shanghai import ShanghaiVM
+
+        fork = fork or ShanghaiVM
+        self.chain_id = chain_id
+        self.error = error
+        self._transaction_builder = fork.get_transaction_builder()
+        self._state_class = fork.get_state_class()
+        self._db = AtomicDB()
+        # Base fee 0 so calls can run at gas price 0, transactions still pay GAS_PRICE
+        self._context = ExecutionContext(
+            b"\x00" * 20, int(time.time()), 1, 0, b"\x00" * 32, GAS_LIMIT, [], chain_id, 0
+        )
+        self._state = self._state_class(self._db, self._context, BLANK_ROOT_HASH)
+        self._snapshots = []
+
+        self.accounts = [Account(self, keccak(text=f"kiwi test account {i}")) for i in range(accounts)]
+        for account in self.accounts:
+            self._state.set_balance(to_canonical_address(account.address), DEFAULT_BALANCE)
+        self._state.lock_changes()
+        self.project = Project(self, artifacts)
+        self.chain = Chain(self)
+
+    @property
+    def block_number(self):
+        """
+        Number of the pending block, which the next transaction is mined in.
+        """
+
+        return self._context._block_number
+
+    @property
+    def timestamp(self):
+        return self._context._timestamp
+
+    def mine(self, blocks=1):
+        self._context._block_number += blocks
+        self._context._timestamp += blocks
+
+    def get_balance(self, address):
+        return self._state.get_balance(to_canonical_address(address))
+
+    def get_nonce(self, address):
+        return self._state.get_nonce(to_canonical_address(address))
+
+    def get_code(self, address):
+        return self._state.get_code(to_canonical_address(address))
+
+    def _apply(self, sender, to, data, value, gas_price):
+        from eth.vm.spoof import SpoofTransaction
+
+        sender = to_canonical_address(sender or b"\x00" * 20)
+        tx = self._transaction_builder.new_transaction(
+            nonce=self._state.get_nonce(sender),
+            gas_price=gas_price,
+            gas=GAS_LIMIT,
+            to=to_canonical_address(to) if to else b"",
+            value=value,
+            data=data,
+            v=27,
+            r=1,
+            s=1,
+        )
+        # Spoofed senders are not signed, skip the signature check of tx.validate
+        return tx, self._state.apply_transaction(SpoofTransaction(tx, sender=sender, validate=lambda: None))
+
+    def _raise(self, computation):
+        output = computation.output
+        message = None
+        if output[:4] == ERROR_SELECTOR:
+            message = decode(["string"], output[4:])[0]
+        raise self.error(message or "Transaction failed.")
+
+    def transact(self, sender, to, data, value=0):
+        """
+        Applies a transaction and mines it. Failed transactions leave no trace and raise self.error.
+        """
+
+        snapshot = self._state.snapshot()
+        tx, computation = self._apply(sender, to, data, value, GAS_PRICE)
+        if computation.is_error:
+            self._state.revert(snapshot)
+            self._raise(computation)
+        self._state.commit(snapshot)
+        self._state.lock_changes()
+
+        used = tx.gas - computation.get_gas_remaining()
+        gas_used = used - min(computation.get_gas_refund(), used // 5)
+        contract_address = None
+        if not to:
+            from eth._utils.address import generate_contract_address
+
+            contract_address = to_checksum_address(generate_contract_address(to_canonical_address(sender), tx.nonce))
+        receipt = Receipt(self.block_number, gas_used, computation.output, computation.get_log_entries(), contract_address)
+        self.mine()
+        return receipt
+
+    def call(self, sender, to, data, value=0):
+        """
+        Output of a call in the pending block, discarding its changes.
+        """
+
+        snapshot = self._state.snapshot()
+        try:
+            _, computation = self._apply(sender, to, data, value, 0)
+        finally:
+            self._state.revert(snapshot)
+        if computation.is_error:
+            self._raise(computation)
+        return computation.output
+
+    def snapshot(self):
+        """
+        Id of the current state, block number and timestamp for revert.
+        """
+
+        self._state.persist()
+        self._snapshots.append((self._state.state_root, self.block_number, self.timestamp))
+        return len(self._snapshots) - 1
+
+    def revert(self, snapshot_id):
+        state_root, self._context._block_number, self._context._timestamp = self._snapshots[snapshot_id]
+        del self._snapshots[snapshot_id:]
+        self._state = self._state_class(self._db, self._context, state_root)
+
+
+def benchmark(transactions=5_000):
+    """
+    Token transfers per second between ten accounts.
+    """
+
+    evm = EVM()
+    owner = evm.accounts[0]
+    token = owner.deploy(evm.project.Token, 1, 1, evm.accounts[2])
+    for account in evm.accounts[1:]:
+        token.transfer(account, 10 ** 24, sender=owner)
+
+    started = time.perf_counter()
+    for i in range(transactions):
+        sender = evm.accounts[i % 10]
+        token.transfer(evm.accounts[(i + 1) % 10], 1000 + i, sender=sender)
+    seconds = time.perf_counter() - started
+    return {"transactions": transactions, "seconds": seconds, "tps": transactions / seconds}
+
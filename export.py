@@ -0,0 +1,323 @@
+"""
+Columnar export of Transfer and TokenPurchase logs to Parquet.
+
+    python export.py logs/ --token 0x... --crowdsale 0x... --rpc http://127.0.0.1:8545
+
+Raw eth_getLogs results are decoded without an object per log: the hex of
+the topics and data of all logs of an event is joined, converted to bytes
+once and sliced as numpy arrays into Arrow columns. Addresses are 20 byte
+fixed size binaries, uint256 amounts are split into big-endian uint64 limbs
+`<name>_hi` and `<name>_lo` (amounts of 2**128 or more are rejected, the
+token caps its supply at 2**128 - 1); `amount(table, "amount")` joins them.
+
+Files are written per event and per bucket of `bucket` blocks,
+
+    logs/Transfer/bucket=1200000/part-000001234567-000001240000.parquet
+
+and `logs/_checkpoint.json` records the last exported block, so the next run
+appends new files only. Read the result with
+
+    pyarrow.dataset.dataset("logs/Transfer", partitioning="hive")
+
+    python export.py --benchmark 1000000
+
+times the columnar decoding against the per-log decoding of the indexer.
+"""
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from eth_utils import keccak
+
+from indexer import Indexer
+
+TRANSFER_TOPIC = "0x" + keccak(text="Transfer(address,address,uint256)").hex()
+PURCHASE_TOPIC = "0x" + keccak(text="TokenPurchase(address,address,uint256,uint256)").hex()
+
+# Event name: (topic0, indexed address columns, uint256 data columns)
+EVENTS = {
+    "Transfer": (TRANSFER_TOPIC, ("sender", "receiver"), ("amount",)),
+    "TokenPurchase": (PURCHASE_TOPIC, ("purchaser", "beneficiary"), ("value", "amount")),
+}
+
+
+def schema(name):
+    _, addresses, amounts = EVENTS[name]
+    fields = [("block", pa.uint64()), ("log_index", pa.uint32()), ("tx_hash", pa.binary(32))]
+    fields += [(column, pa.binary(20)) for column in addresses]
+    fields += [(f"{column}_{limb}", pa.uint64()) for column in amounts for limb in ("hi", "lo")]
+    return pa.schema(fields)
+
+
+def _integers(values):
+    return np.fromiter((int(v, 16) if isinstance(v, str) else v for v in values), dtype=np.uint64, count=len(values))
+
+
+def _fixed_binary(matrix, width):
+    """
+    Arrow fixed size binary column from an (n, width) uint8 array.
+    """
+
+    data = np.ascontiguousarray(matrix)
+    return pa.FixedSizeBinaryArray.from_buffers(pa.binary(width), len(data), [None, pa.py_buffer(data.tobytes())])
+
+
+def decode_logs(name, logs):
+    """
+    Table of raw JSON-RPC logs of one event. Logs must be in the event's layout.
+    """
+
+    _, addresses, amounts = EVENTS[name]
+    count = len(logs)
+    if count == 0:
+        return schema(name).empty_table()
+
+    # One hex string per log: indexed topics, then the data words
+    words = len(addresses) + len(amounts)
+    hex_rows = "".join("".join(topic[2:] for topic in log["topics"][1:]) + log["data"][2:] for log in logs)
+    raw = np.frombuffer(bytes.fromhex(hex_rows), dtype=np.uint8)
+    if len(raw) != count * 32 * words:
+        raise ValueError(f"{name} logs do not have {words} words each.")
+    raw = raw.reshape(count, words, 32)
+
+    columns = {
+        "block": pa.array(_integers([log["blockNumber"] for log in logs]), pa.uint64()),
+        "log_index": pa.array(_integers([log["logIndex"] for log in logs]).astype(np.uint32), pa.uint32()),
+        "tx_hash": _fixed_binary(
+            np.frombuffer(bytes.fromhex("".join(log["transactionHash"][2:] for log in logs)), dtype=np.uint8).reshape(count, 32),
+            32,
+        ),
+    }
+    for i, column in enumerate(addresses):
+        columns[column] = _fixed_binary(raw[:, i, 12:], 20)
+    for i, column in enumerate(amounts):
+        limbs = raw[:, len(addresses) + i].copy().view(">u8").reshape(count, 4)
+        if limbs[:, :2].any():
+            raise ValueError(f"{name}.{column} of 2**128 or more cannot be exported.")
+        columns[f"{column}_hi"] = pa.array(limbs[:, 2].astype(np.uint64), pa.uint64())
+        columns[f"{column}_lo"] = pa.array(limbs[:, 3].astype(np.uint64), pa.uint64())
+    return pa.table(columns, schema=schema(name))
+
+
+def amount(table, column):
+    """
+    Python ints of a split uint256 column.
+    """
+
+    return [hi << 64 | lo for hi, lo in zip(table[f"{column}_hi"].to_pylist(), table[f"{column}_lo"].to_pylist())]
+
+
+def split_events(logs):
+    """
+    Raw logs grouped by event name, other events dropped.
+    """
+
+    names = {topic: name for name, (topic, _, _) in EVENTS.items()}
+    grouped = {name: [] for name in EVENTS}
+    for log in logs:
+        name = names.get(log["topics"][0] if log["topics"] else None)
+        if name is not None:
+            grouped[name].append(log)
+    return grouped
+
+
+class LogExporter(Indexer):
+    """
+    Exports the Transfer and TokenPurchase logs of a token and crowdsale to
+    partitioned Parquet, resuming after the block in the checkpoint file.
+    Block ranges are fetched as by Indexer, but as raw JSON.
+    """
+
+    def __init__(self, w3, out_dir, token, crowdsale=None, bucket=100_000, **options):
+        super().__init__(w3, None, token, crowdsale, **options)
+        self.out_dir = Path(out_dir)
+        self.bucket = bucket
+        self.checkpoint_path = self.out_dir / "_checkpoint.json"
+        self.topics = [EVENTS["Transfer"][0]] + ([EVENTS["TokenPurchase"][0]] if crowdsale else [])
+
+    async def _get_logs(self, first, last):
+        self.requests += 1
+        response = await self.w3.provider.make_request(
+            "eth_getLogs", [{"fromBlock": hex(first), "toBlock": hex(last), "address": self.addresses, "topics": [self.topics]}]
+        )
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    @property
+    def checkpoint(self):
+        if not self.checkpoint_path.exists():
+            return None
+        return json.loads(self.checkpoint_path.read_text())["block"]
+
+    def _save_checkpoint(self, block):
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"block": block}))
+        os.replace(tmp, self.checkpoint_path)
+
+    def _drop_unfinished(self, checkpoint):
+        # Files of a run that stopped before saving its checkpoint would duplicate rows
+        for path in self.out_dir.glob("*/bucket=*/part-*.parquet"):
+            first = int(path.stem.split("-")[1])
+            if checkpoint is None or first > checkpoint:
+                path.unlink()
+
+    def write(self, name, table, first, last):
+        """
+        Writes the rows of blocks first..last, one file per bucket they touch.
+        """
+
+        blocks = table["block"].to_numpy()
+        for start in range(first - first % self.bucket, last + 1, self.bucket):
+            low, high = max(first, start), min(last, start + self.bucket - 1)
+            rows = np.flatnonzero((blocks >= low) & (blocks <= high))
+            if len(rows) == 0:
+                continue
+            folder = self.out_dir / name / f"bucket={start}"
+            folder.mkdir(parents=True, exist_ok=True)
+            pq.write_table(table.take(pa.array(rows)), folder / f"part-{low:012d}-{high:012d}.parquet")
+
+    async def run(self, log=print):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        head = await self.w3.eth.block_number - self.confirmations
+        checkpoint = self.checkpoint
+        self._drop_unfinished(checkpoint)
+        next_block = self.start_block if checkpoint is None else checkpoint + 1
+
+        exported = 0
+        while next_block <= head:
+            # One batch of concurrent ranges is written with one checkpoint
+            ranges = []
+            while len(ranges) < self.concurrency and next_block <= head:
+                last = min(next_block + self.chunk - 1, head)
+                ranges.append((next_block, last))
+                next_block = last + 1
+            results = await asyncio.gather(*(self.fetch(first, last) for first, last in ranges))
+
+            first, last = ranges[0][0], ranges[-1][1]
+            grouped = split_events([raw for logs in results for raw in logs])
+            for name, logs in grouped.items():
+                table = decode_logs(name, logs).sort_by([("block", "ascending"), ("log_index", "ascending")])
+                self.write(name, table, first, last)
+                exported += len(logs)
+            self._save_checkpoint(last)
+            log(f"blocks {first}-{last}: {sum(len(logs) for logs in grouped.values())} logs")
+
+        return exported
+
+
+def read_events(out_dir, name):
+    """
+    All exported rows of an event as one table, in block and log order.
+    """
+
+    import pyarrow.dataset as ds
+
+    folder = Path(out_dir) / name
+    if not folder.exists():
+        return schema(name).empty_table()
+    table = ds.dataset(folder, format="parquet", partitioning="hive").to_table()
+    return table.sort_by([("block", "ascending"), ("log_index", "ascending")])
+
+
+def synthetic_transfers(count, holders=10_000, seed=0):
+    """
+    Raw JSON-RPC Transfer logs between random holders, 100 per block.
+    """
+
+    rng = np.random.default_rng(seed)
+    accounts = ["0x" + "0" * 24 + rng.bytes(20).hex() for _ in range(holders)]
+    senders = rng.integers(0, holders, count)
+    receivers = rng.integers(0, holders, count)
+    amounts = rng.integers(1, 2**62, count)
+    tx_hashes = rng.bytes(32 * count).hex()
+    return [
+        {
+            "address": "0x" + "11" * 20,
+            "topics": [TRANSFER_TOPIC, accounts[senders[i]], accounts[receivers[i]]],
+            "data": f"0x{int(amounts[i]):064x}",
+            "blockNumber": hex(i // 100),
+            "logIndex": hex(i % 100),
+            "transactionHash": "0x" + tx_hashes[64 * i:64 * i + 64],
+        }
+        for i in range(count)
+    ]
+
+
+def benchmark(count=1_000_000, seed=0):
+    """
+    Seconds to turn `count` raw Transfer logs into an Arrow table, columnar
+    versus decoding every log with indexer.EventDecoder as the indexer does.
+    """
+
+    import time
+
+    from hexbytes import HexBytes
+
+    from artifacts import ArtifactCache
+    from indexer import TOKEN_EVENTS, EventDecoder
+
+    logs = synthetic_transfers(count, seed=seed)
+
+    started = time.perf_counter()
+    table = decode_logs("Transfer", logs)
+    columnar = time.perf_counter() - started
+
+    decoder = EventDecoder(ArtifactCache().load("Token")["abi"], TOKEN_EVENTS)
+    started = time.perf_counter()
+    rows = {name: [] for name in schema("Transfer").names}
+    for log in logs:
+        _, args = decoder.decode({"topics": [HexBytes(topic) for topic in log["topics"]], "data": HexBytes(log["data"])})
+        rows["block"].append(int(log["blockNumber"], 16))
+        rows["log_index"].append(int(log["logIndex"], 16))
+        rows["tx_hash"].append(bytes(HexBytes(log["transactionHash"])))
+        rows["sender"].append(bytes(HexBytes(args["sender"])))
+        rows["receiver"].append(bytes(HexBytes(args["receiver"])))
+        rows["amount_hi"].append(args["amount"] >> 64)
+        rows["amount_lo"].append(args["amount"] & (2**64 - 1))
+    per_log = pa.table(rows, schema=schema("Transfer"))
+    per_log_time = time.perf_counter() - started
+
+    assert per_log.equals(table)
+    return {"logs": count, "columnar_s": columnar, "per_log_s": per_log_time, "speedup": per_log_time / columnar}
+
+
+async def export(out_dir, rpc, token, crowdsale=None, **options):
+    from rpc import connect
+
+    w3 = connect(rpc)
+    try:
+        return await LogExporter(w3, out_dir, token, crowdsale, **options).run()
+    finally:
+        await w3.provider.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export KIWI Transfer and TokenPurchase logs to Parquet.")
+    parser.add_argument("out", nargs="?", help="Output folder.")
+    parser.add_argument("--token", help="Token address.")
+    parser.add_argument("--crowdsale", help="Crowdsale address.")
+    parser.add_argument("--rpc", default=os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--start-block", type=int, default=0, help="First block when there is no checkpoint yet.")
+    parser.add_argument("--confirmations", type=int, default=0, help="Blocks to stay behind the head.")
+    parser.add_argument("--bucket", type=int, default=100_000, help="Blocks per partition.")
+    parser.add_argument("--benchmark", type=int, metavar="LOGS", help="Only time decoding LOGS synthetic transfers.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(" ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}" for key, value in benchmark(args.benchmark).items()))
+        return
+    if not args.out or not args.token:
+        parser.error("out and --token are required")
+
+    options = dict(start_block=args.start_block, confirmations=args.confirmations, bucket=args.bucket)
+    print(asyncio.run(export(args.out, args.rpc, args.token, args.crowdsale, **options)), "logs exported")
+
+
+if __name__ == "__main__":
+    main()
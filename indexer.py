@@ -0,0 +1,328 @@
+"""
+Incremental indexer of KIWI token and crowdsale events into SQLite.
+
+    python indexer.py kiwi.sqlite --token 0x... --crowdsale 0x... --rpc http://127.0.0.1:8545
+
+Logs are fetched with eth_getLogs over block ranges that shrink when the node
+rejects or times out a query and grow again while results stay small. Several
+ranges are in flight at once, but they are applied in block order: every range
+is written in one SQLite transaction together with the checkpoint, so a
+restarted indexer resumes from the last applied range.
+
+Balances, allowances, blacklist, fee settings and supply totals are kept as
+tables next to the raw events so dashboards can query them without RPC.
+Amounts are uint256 and are stored as decimal text. Token.transferFrom does
+not log Approval, so an allowance row is the amount last approved, not what
+is left of it.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+from collections import deque
+
+from eth_abi import decode
+from eth_utils import keccak, to_checksum_address
+
+from artifacts import ArtifactCache
+
+ZERO_ADDRESS = "0x" + "00" * 20
+
+TOKEN_EVENTS = ("Transfer", "Approval", "Blacklist", "UpdateFees")
+CROWDSALE_EVENTS = ("TokenPurchase",)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (source TEXT PRIMARY KEY, block INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS events (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    address TEXT NOT NULL,
+    event TEXT NOT NULL,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE INDEX IF NOT EXISTS events_by_name ON events (event, block);
+CREATE TABLE IF NOT EXISTS balances (holder TEXT PRIMARY KEY, balance TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS allowances (
+    owner TEXT NOT NULL,
+    spender TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    PRIMARY KEY (owner, spender)
+);
+CREATE TABLE IF NOT EXISTS blacklist (address TEXT PRIMARY KEY, listed INTEGER NOT NULL, block INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS fees (block INTEGER NOT NULL, txfee INTEGER NOT NULL, burnfee INTEGER NOT NULL, fee_address TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS purchases (
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    purchaser TEXT NOT NULL,
+    beneficiary TEXT NOT NULL,
+    value TEXT NOT NULL,
+    amount TEXT NOT NULL,
+    PRIMARY KEY (block, log_index)
+);
+CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+class EventDecoder:
+    """
+    Decodes the logs of the named events of one contract ABI.
+    """
+
+    def __init__(self, abi, names):
+        self.events = {}
+        for item in abi:
+            if item["type"] == "event" and item["name"] in names:
+                types = ",".join(i["type"] for i in item["inputs"])
+                self.events[keccak(text=f"{item['name']}({types})")] = item
+
+    @property
+    def topics(self):
+        return ["0x" + topic.hex() for topic in self.events]
+
+    def decode(self, log):
+        topics = [bytes(topic) for topic in log["topics"]]
+        item = self.events.get(topics[0])
+        if item is None:
+            return None
+
+        indexed = [i for i in item["inputs"] if i["indexed"]]
+        data = [i for i in item["inputs"] if not i["indexed"]]
+        args = dict(zip([i["name"] for i in data], decode([i["type"] for i in data], bytes(log["data"]))))
+        for i, topic in zip(indexed, topics[1:]):
+            args[i["name"]] = decode([i["type"]], topic)[0]
+        for i in item["inputs"]:
+            if i["type"] == "address":
+                args[i["name"]] = to_checksum_address(args[i["name"]])
+        return item["name"], args
+
+
+class Store:
+    """
+    SQLite tables of the index. `apply` writes one block range and its
+    checkpoint atomically.
+    """
+
+    def __init__(self, path, source):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.source = source
+
+    @property
+    def checkpoint(self):
+        row = self.db.execute("SELECT block FROM checkpoint WHERE source = ?", (self.source,)).fetchone()
+        return row[0] if row else None
+
+    def _number(self, query, *params):
+        row = self.db.execute(query, params).fetchone()
+        return int(row[0]) if row else 0
+
+    def apply(self, events, last_block):
+        balances = {}
+        totals = {name: self.total(name) for name in ("minted", "burned", "purchased_wei", "purchased_tokens")}
+
+        def credit(holder, amount):
+            if holder not in balances:
+                balances[holder] = self.balance(holder)
+            balances[holder] += amount
+
+        with self.db:
+            for log, name, args in events:
+                block, log_index = log["blockNumber"], log["logIndex"]
+                self.db.execute(
+                    "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        block,
+                        log_index,
+                        "0x" + bytes(log["transactionHash"]).hex(),
+                        to_checksum_address(log["address"]),
+                        name,
+                        json.dumps({k: str(v) if isinstance(v, int) and not isinstance(v, bool) else v for k, v in args.items()}),
+                    ),
+                )
+
+                if name == "Transfer":
+                    if args["sender"] == ZERO_ADDRESS:
+                        totals["minted"] += args["amount"]
+                    else:
+                        credit(args["sender"], -args["amount"])
+                    if args["receiver"] == ZERO_ADDRESS:
+                        totals["burned"] += args["amount"]
+                    else:
+                        credit(args["receiver"], args["amount"])
+                elif name == "Approval":
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO allowances VALUES (?, ?, ?, ?)",
+                        (args["owner"], args["spender"], str(args["amount"]), block),
+                    )
+                elif name == "Blacklist":
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO blacklist VALUES (?, ?, ?)", (args["blackListed"], args["value"], block)
+                    )
+                elif name == "UpdateFees":
+                    self.db.execute(
+                        "INSERT INTO fees VALUES (?, ?, ?, ?)", (block, args["txfee"], args["burnfee"], args["feeAddress"])
+                    )
+                elif name == "TokenPurchase":
+                    totals["purchased_wei"] += args["value"]
+                    totals["purchased_tokens"] += args["amount"]
+                    self.db.execute(
+                        "INSERT OR IGNORE INTO purchases VALUES (?, ?, ?, ?, ?, ?)",
+                        (block, log_index, args["purchaser"], args["beneficiary"], str(args["value"]), str(args["amount"])),
+                    )
+
+            totals["total_supply"] = totals["minted"] - totals["burned"]
+            self.db.executemany("INSERT OR REPLACE INTO balances VALUES (?, ?)", [(h, str(b)) for h, b in balances.items()])
+            self.db.executemany("INSERT OR REPLACE INTO totals VALUES (?, ?)", [(n, str(v)) for n, v in totals.items()])
+            self.db.execute("INSERT OR REPLACE INTO checkpoint VALUES (?, ?)", (self.source, last_block))
+
+    def balance(self, holder):
+        return self._number("SELECT balance FROM balances WHERE holder = ?", holder)
+
+    def allowance(self, owner, spender):
+        return self._number("SELECT amount FROM allowances WHERE owner = ? AND spender = ?", owner, spender)
+
+    def total(self, name):
+        return self._number("SELECT value FROM totals WHERE name = ?", name)
+
+
+class Indexer:
+    """
+    Pulls the logs of the token and crowdsale into a Store, starting after
+    its checkpoint (or at `start_block`) and stopping `confirmations` blocks
+    behind the head.
+    """
+
+    def __init__(
+        self,
+        w3,
+        store,
+        token,
+        crowdsale=None,
+        start_block=0,
+        confirmations=0,
+        chunk=2_000,
+        max_chunk=100_000,
+        target_logs=5_000,
+        concurrency=4,
+        artifacts=None,
+    ):
+        artifacts = artifacts or ArtifactCache()
+        self.w3 = w3
+        self.store = store
+        self.addresses = [to_checksum_address(token)]
+        self.decoders = {self.addresses[0]: EventDecoder(artifacts.load("Token")["abi"], TOKEN_EVENTS)}
+        if crowdsale:
+            self.addresses.append(to_checksum_address(crowdsale))
+            self.decoders[self.addresses[1]] = EventDecoder(artifacts.load("Crowdsale")["abi"], CROWDSALE_EVENTS)
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.chunk = chunk
+        self.max_chunk = max_chunk
+        self.target_logs = target_logs
+        self.concurrency = concurrency
+        self.requests = 0
+
+    async def _get_logs(self, first, last):
+        self.requests += 1
+        topics = [topic for decoder in self.decoders.values() for topic in decoder.topics]
+        return await self.w3.eth.get_logs(
+            {"fromBlock": first, "toBlock": last, "address": self.addresses, "topics": [topics]}
+        )
+
+    async def fetch(self, first, last):
+        """
+        Logs of a block range. Ranges the node refuses, typically for too many
+        results or a timeout, are split in half and the chunk size shrinks.
+        """
+
+        try:
+            logs = await self._get_logs(first, last)
+        except Exception:
+            if first == last:
+                raise
+            self.chunk = max(1, (last - first + 1) // 2)
+            middle = first + (last - first) // 2
+            left, right = await asyncio.gather(self.fetch(first, middle), self.fetch(middle + 1, last))
+            return left + right
+
+        if len(logs) < self.target_logs // 2 and last - first + 1 >= self.chunk:
+            self.chunk = min(self.max_chunk, self.chunk * 2)
+        return logs
+
+    def decode(self, logs):
+        events = []
+        for log in sorted(logs, key=lambda log: (log["blockNumber"], log["logIndex"])):
+            decoder = self.decoders.get(to_checksum_address(log["address"]))
+            decoded = decoder.decode(log) if decoder else None
+            if decoded:
+                events.append((log, *decoded))
+        return events
+
+    async def run(self, log=print):
+        head = await self.w3.eth.block_number - self.confirmations
+        checkpoint = self.store.checkpoint
+        next_block = self.start_block if checkpoint is None else checkpoint + 1
+
+        in_flight = deque()
+        applied = 0
+        while next_block <= head or in_flight:
+            while len(in_flight) < self.concurrency and next_block <= head:
+                last = min(next_block + self.chunk - 1, head)
+                in_flight.append((next_block, last, asyncio.ensure_future(self.fetch(next_block, last))))
+                next_block = last + 1
+
+            first, last, task = in_flight.popleft()
+            try:
+                events = self.decode(await task)
+            except Exception:
+                for *_, pending in in_flight:
+                    pending.cancel()
+                raise
+            self.store.apply(events, last)
+            applied += len(events)
+            log(f"blocks {first}-{last}: {len(events)} events")
+
+        return applied
+
+
+async def index(db_path, rpc, token, crowdsale=None, **options):
+    from rpc import connect
+
+    w3 = connect(rpc)
+    store = Store(db_path, f"{token}:{crowdsale or ''}")
+    try:
+        return await Indexer(w3, store, token, crowdsale, **options).run()
+    finally:
+        await w3.provider.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index KIWI events into SQLite.")
+    parser.add_argument("db", help="SQLite database file.")
+    parser.add_argument("--token", required=True, help="Token address.")
+    parser.add_argument("--crowdsale", help="Crowdsale address.")
+    parser.add_argument("--rpc", default=os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--start-block", type=int, default=0, help="First block when there is no checkpoint yet.")
+    parser.add_argument("--confirmations", type=int, default=0, help="Blocks to stay behind the head.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Block ranges requested at once.")
+    args = parser.parse_args()
+
+    asyncio.run(
+        index(
+            args.db,
+            args.rpc,
+            args.token,
+            args.crowdsale,
+            start_block=args.start_block,
+            confirmations=args.confirmations,
+            concurrency=args.concurrency,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Command line entry point for everyday KIWI tasks.
+
+    ./kiwi.py compile                       # compile changed contracts into .kiwi-cache/
+    ./kiwi.py deploy --dry-run              # print the plan without a node or key
+    ./kiwi.py deploy deploy-plan.json       # deploy, see deploy.py
+    ./kiwi.py index kiwi.sqlite --token 0x...   # index events, see indexer.py
+    ./kiwi.py airdrop build payouts.csv airdrop.bin  # Merkle airdrop, see airdrop.py
+    ./kiwi.py simulate --txfee 5 --burnfee 2    # fee change what-if, see simulator.py
+    ./kiwi.py load --token 0x... --crowdsale 0x...  # TPS and latency, see loadgen.py
+
+Only the standard library is imported at start-up; web3, eth_abi and the
+compiler are loaded by the command that needs them.
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+DEFAULT_PLAN = Path(__file__).parent / "deploy-plan.json"
+
+
+def compile_contracts(args):
+    from artifacts import ArtifactCache
+
+    cache = ArtifactCache()
+    for name in args.contracts or cache.contracts():
+        artifact = cache.load(name)
+        state = "compiled" if name in cache.compiled else "cached"
+        print(f"{name:<12} {state:<8} {len(artifact['deploymentBytecode']['bytecode']) // 2 - 1} bytes")
+
+
+def dry_run(args):
+    from deploy import Deployer, NonceManager, contract_address, load_plan, plan_waves
+
+    sender = args.sender
+    if sender is None and os.environ.get(args.key_env):
+        from eth_account import Account
+
+        sender = Account.from_key(os.environ[args.key_env]).address
+    if sender is None:
+        sender = "0x" + "00" * 20
+
+    class _Sender:
+        address = sender
+
+    steps = load_plan(args.plan)
+    deployer = Deployer(None, _Sender(), steps, journal=None)
+    nonces = NonceManager(args.nonce)
+    for number, wave in enumerate(plan_waves(steps)):
+        print(f"wave {number}")
+        for step in wave:
+            tx = deployer.transaction(step, nonces.take())
+            if step.contract:
+                deployer.addresses[step.id] = contract_address(sender, tx["nonce"])
+                target = f"deploy {step.contract} at {deployer.addresses[step.id]}"
+            else:
+                target = f"call {step.target}.{step.method} at {tx['to']}"
+            print(f"  nonce {tx['nonce']:<4} {step.id:<12} {target} ({len(tx['data'])} bytes)")
+
+
+def deploy(args):
+    if args.dry_run:
+        return dry_run(args)
+
+    import asyncio
+
+    from deploy import deploy as run_plan
+
+    rpc = args.rpc or os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545")
+    results = asyncio.run(run_plan(args.plan, rpc, os.environ[args.key_env], args.journal))
+    for step_id, entry in results.items():
+        print(step_id, entry.get("address", ""), entry["hash"])
+
+
+def index(args):
+    import asyncio
+
+    from indexer import index as run_index
+
+    rpc = args.rpc or os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545")
+    options = dict(start_block=args.start_block, confirmations=args.confirmations, concurrency=args.concurrency)
+    print(asyncio.run(run_index(args.db, rpc, args.token, args.crowdsale, **options)), "events indexed")
+
+
+def airdrop_build(args):
+    from airdrop import read_recipients, write_tree
+
+    accounts, amounts = read_recipients(args.csv)
+    root = write_tree(args.out, accounts, amounts)
+    print(f"{len(accounts)} recipients, {sum(amounts)} tokens, root 0x{root.hex()}")
+
+
+def airdrop_proof(args):
+    import json
+
+    from airdrop import ProofFile
+
+    print(json.dumps(ProofFile(args.tree).claim(args.account)))
+
+
+def simulate(args):
+    import time
+
+    from simulator import simulate_history, simulate_workload
+
+    txfee, burnfee, fee_address = args.initial_fees
+    initial_fees = (int(txfee), int(burnfee), fee_address)
+    runs = {"current": None, "proposed": (args.txfee, args.burnfee)}
+    for name, fees in runs.items():
+        started = time.perf_counter()
+        if args.db:
+            sim, failed = simulate_history(args.db, initial_fees, fees, args.token)
+        else:
+            txfee, burnfee = fees or initial_fees[:2]
+            sim, failed = simulate_workload(txfee, burnfee, args.holders, args.transfers, args.seed)
+        print(f"{name} txfee {sim.txfee} burnfee {sim.burnfee}: {failed} reverted, {time.perf_counter() - started:.1f}s")
+        for key, value in sim.summary().items():
+            print(f"  {key:<13} {value}")
+
+
+def load(args):
+    import asyncio
+
+    from loadgen import format_report, parse_mix
+    from loadgen import load as run_load
+
+    rpc = args.rpc or os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545")
+    options = dict(wallets=args.wallets, ops=args.ops, mix=parse_mix(args.mix), depth=args.depth, seed=args.seed)
+    print(format_report(asyncio.run(run_load(rpc, os.environ[args.key_env], args.token, args.crowdsale, **options))))
+
+
+def parser():
+    parser = argparse.ArgumentParser(prog="kiwi", description="KIWI contract tooling.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser("compile", help="Compile contracts whose sources changed.")
+    compile_parser.add_argument("contracts", nargs="*", help="Contract names, defaults to all.")
+    compile_parser.set_defaults(func=compile_contracts)
+
+    deploy_parser = commands.add_parser("deploy", help="Deploy the contracts from a plan.")
+    deploy_parser.add_argument("plan", nargs="?", default=DEFAULT_PLAN)
+    deploy_parser.add_argument("--rpc", help="JSON-RPC endpoint, defaults to $KIWI_RPC_URL or a local node.")
+    deploy_parser.add_argument("--key-env", default="DEPLOYER_PRIVATE_KEY", help="Environment variable holding the private key.")
+    deploy_parser.add_argument("--journal", help="Journal file, defaults to <plan>.<chain id>.journal.json.")
+    deploy_parser.add_argument("--dry-run", action="store_true", help="Print waves, nonces and addresses without sending.")
+    deploy_parser.add_argument("--sender", help="Deployer address for --dry-run, defaults to the key's address.")
+    deploy_parser.add_argument("--nonce", type=int, default=0, help="First nonce for --dry-run.")
+    deploy_parser.set_defaults(func=deploy)
+
+    index_parser = commands.add_parser("index", help="Index token and crowdsale events into SQLite.")
+    index_parser.add_argument("db", help="SQLite database file.")
+    index_parser.add_argument("--token", required=True, help="Token address.")
+    index_parser.add_argument("--crowdsale", help="Crowdsale address.")
+    index_parser.add_argument("--rpc", help="JSON-RPC endpoint, defaults to $KIWI_RPC_URL or a local node.")
+    index_parser.add_argument("--start-block", type=int, default=0, help="First block when there is no checkpoint yet.")
+    index_parser.add_argument("--confirmations", type=int, default=0, help="Blocks to stay behind the head.")
+    index_parser.add_argument("--concurrency", type=int, default=4, help="Block ranges requested at once.")
+    index_parser.set_defaults(func=index)
+
+    airdrop_parser = commands.add_parser("airdrop", help="Build MerkleDistributor trees and proofs.")
+    airdrop_commands = airdrop_parser.add_subparsers(dest="airdrop_command", required=True)
+    build_parser = airdrop_commands.add_parser("build", help="Build a tree file from `address,amount` rows.")
+    build_parser.add_argument("csv")
+    build_parser.add_argument("out")
+    build_parser.set_defaults(func=airdrop_build)
+    proof_parser = airdrop_commands.add_parser("proof", help="Print the claim arguments of an account.")
+    proof_parser.add_argument("tree")
+    proof_parser.add_argument("account")
+    proof_parser.set_defaults(func=airdrop_proof)
+
+    simulate_parser = commands.add_parser("simulate", help="Compare supply and fee income under new fees.")
+    simulate_parser.add_argument("--txfee", type=int, required=True, help="Proposed txfee, in units of 1/1000.")
+    simulate_parser.add_argument("--burnfee", type=int, required=True, help="Proposed burnfee, in units of 1/1000.")
+    simulate_parser.add_argument(
+        "--initial-fees",
+        nargs=3,
+        metavar=("TXFEE", "BURNFEE", "FEE_ADDRESS"),
+        default=[1, 1, "0x" + "fe" * 20],
+        help="Fees the token was deployed with, needed to rebuild a history.",
+    )
+    simulate_parser.add_argument("--db", help="indexer.py database to replay instead of a random workload.")
+    simulate_parser.add_argument("--token", help="Token address, when the database indexes several.")
+    simulate_parser.add_argument("--transfers", type=int, default=1_000_000, help="Random transfers to run.")
+    simulate_parser.add_argument("--holders", type=int, default=10_000, help="Accounts of the random workload.")
+    simulate_parser.add_argument("--seed", type=int, default=0)
+    simulate_parser.set_defaults(func=simulate)
+
+    load_parser = commands.add_parser("load", help="Measure throughput and latency under concurrent load.")
+    load_parser.add_argument("--token", required=True, help="Token address.")
+    load_parser.add_argument("--crowdsale", required=True, help="Crowdsale address.")
+    load_parser.add_argument("--rpc", help="JSON-RPC endpoint, defaults to $KIWI_RPC_URL or a local node.")
+    load_parser.add_argument("--key-env", default="FUNDER_PRIVATE_KEY", help="Environment variable holding the token owner's key.")
+    load_parser.add_argument("--wallets", type=int, default=100, help="Concurrent sending wallets.")
+    load_parser.add_argument("--ops", type=int, default=10, help="Operations per wallet.")
+    load_parser.add_argument("--mix", default="transfer=5,transferFrom=2,permit=2,buyTokens=1", help="Operation weights.")
+    load_parser.add_argument("--depth", type=int, default=4, help="Transactions in flight per wallet.")
+    load_parser.add_argument("--seed", type=int, default=0)
+    load_parser.set_defaults(func=load)
+    return parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,363 @@
+"""
+Concurrent load generator for Token and Crowdsale on a local dev node.
+
+    FUNDER_PRIVATE_KEY=0x... python loadgen.py --token 0x... --crowdsale 0x... \\
+        --wallets 200 --ops 20 --mix transfer=5,transferFrom=2,permit=2,buyTokens=1
+
+The funder, the token owner, sends every wallet ether for gas and tokens
+with transferBatch, and approves the Crowdsale for the purchases it serves
+with transferFrom. Each wallet approves its neighbour, which then drives
+transferFrom on its funds, and relays permits signed by its own unfunded
+permit key, so permit nonces reach the token in order.
+
+Every wallet signs with locally assigned nonces and keeps up to `depth`
+transactions in flight. Receipts are collected by one watcher following
+new blocks instead of a poll per transaction, so the node serves the load
+rather than the bookkeeping. Gas limits are estimated once per operation,
+which lets reverts land on chain and show up in the revert rate.
+
+Runs with the same seed, wallets and mix send the same operations, so two
+contract versions can be compared under one load profile.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict, namedtuple
+
+from eth_abi import decode
+from eth_utils import encode_hex, keccak
+
+from deploy import NonceManager, encode_call, load_artifact
+from permits import permit_digest
+
+OPERATIONS = ("transfer", "transferFrom", "permit", "buyTokens")
+DEFAULT_MIX = {"transfer": 5, "transferFrom": 2, "permit": 2, "buyTokens": 1}
+BATCH_SIZE = 500
+AMOUNT = 10 ** 18
+
+Result = namedtuple("Result", ["operation", "latency", "status", "gas_used"])
+
+
+def parse_mix(text):
+    """
+    Operation weights from `transfer=5,permit=1`.
+    """
+
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name}, expected one of {', '.join(OPERATIONS)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def wallet_keys(count, seed, label="wallet"):
+    """
+    Deterministic private keys, so runs with one seed use the same wallets.
+    """
+
+    return [encode_hex(keccak(text=f"kiwi-load-{label}-{seed}-{i}")) for i in range(count)]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def summarize(results, duration):
+    """
+    Throughput, latency percentiles, revert rate and mean gas per operation.
+    """
+
+    by_operation = defaultdict(list)
+    for result in results:
+        by_operation[result.operation].append(result)
+
+    report = {"transactions": len(results), "duration": duration, "tps": len(results) / duration if duration else 0.0}
+    for operation, rows in sorted(by_operation.items()):
+        latencies = [r.latency for r in rows]
+        report[operation] = {
+            "count": len(rows),
+            "reverted": sum(r.status != 1 for r in rows),
+            "revert_rate": sum(r.status != 1 for r in rows) / len(rows),
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "gas": sum(r.gas_used for r in rows) // len(rows),
+        }
+    return report
+
+
+class ReceiptWatcher:
+    """
+    Resolves the receipt futures of pending transactions as blocks include them.
+    """
+
+    def __init__(self, w3, poll=0.05):
+        self.w3 = w3
+        self.poll = poll
+        self.pending = {}
+        self.block = None
+
+    def wait(self, tx_hash):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[tx_hash] = future
+        return future
+
+    async def run(self):
+        self.block = await self.w3.eth.block_number
+        # Transactions sent before the watcher started may already be mined
+        await self._collect(self.block)
+        while True:
+            head = await self.w3.eth.block_number
+            for number in range(self.block + 1, head + 1):
+                await self._collect(number)
+            self.block = head
+            await asyncio.sleep(self.poll)
+
+    async def _collect(self, number):
+        block = await self.w3.eth.get_block(number)
+        included = [encode_hex(h) for h in block["transactions"] if encode_hex(h) in self.pending]
+        receipts = await asyncio.gather(*(self.w3.eth.get_transaction_receipt(h) for h in included))
+        for tx_hash, receipt in zip(included, receipts):
+            self.pending.pop(tx_hash).set_result(receipt)
+
+
+class Wallet:
+    def __init__(self, account, permit_account, nonce):
+        self.account = account
+        self.address = account.address
+        self.permit_account = permit_account
+        self.nonces = NonceManager(nonce)
+        self.permit_nonce = 0
+
+
+class LoadGenerator:
+    """
+    Funds wallets from `funder` and drives the operation mix from all of them at once.
+    """
+
+    def __init__(
+        self,
+        w3,
+        funder,
+        token,
+        crowdsale,
+        wallets=100,
+        ops=10,
+        mix=None,
+        depth=4,
+        seed=0,
+        ether=10 ** 18,
+        tokens=1000 * AMOUNT,
+        purchase_wei=1000,
+        gas_multiplier=1.5,
+        artifacts=load_artifact,
+    ):
+        self.w3 = w3
+        self.funder = funder
+        self.token = token
+        self.crowdsale = crowdsale
+        self.wallet_count = wallets
+        self.ops = ops
+        self.mix = mix or DEFAULT_MIX
+        self.depth = depth
+        self.seed = seed
+        self.ether = ether
+        self.tokens = tokens
+        self.purchase_wei = purchase_wei
+        self.gas_multiplier = gas_multiplier
+        self.token_abi, _ = artifacts("Token")
+        self.crowdsale_abi, _ = artifacts("Crowdsale")
+        self.wallets = []
+        self.gas = {}
+        self.watcher = ReceiptWatcher(w3)
+
+    async def _call(self, to, abi, method, args, types):
+        data = await self.w3.eth.call({"to": to, "data": encode_call(abi, method, args)})
+        return decode(types, data)[0]
+
+    def _sign(self, account, nonce, to, data, gas, value=0):
+        tx = {
+            "to": to,
+            "data": data,
+            "value": value,
+            "nonce": nonce,
+            "gas": gas,
+            "gasPrice": self.gas_price,
+            "chainId": self.chain_id,
+        }
+        return account.sign_transaction(tx)
+
+    async def _send_all(self, signed):
+        receipts = []
+        for tx in signed:
+            receipts.append(self.watcher.wait(encode_hex(tx.hash)))
+            await self.w3.eth.send_raw_transaction(tx.rawTransaction)
+        for receipt in await asyncio.gather(*receipts):
+            if receipt["status"] != 1:
+                raise RuntimeError(f"Setup transaction {encode_hex(receipt['transactionHash'])} reverted.")
+
+    async def setup(self):
+        """
+        Creates and funds the wallets, approves the spenders, and estimates gas limits.
+        """
+
+        from eth_account import Account
+        from eth_keys import keys
+
+        self.chain_id = await self.w3.eth.chain_id
+        self.gas_price = await self.w3.eth.gas_price
+        self.domain = await self._call(self.token, self.token_abi, "DOMAIN_SEPARATOR", [], ["bytes32"])
+        private_keys = wallet_keys(self.wallet_count, self.seed)
+        permit_keys = wallet_keys(self.wallet_count, self.seed, "permit")
+        accounts = [Account.from_key(key) for key in private_keys]
+        nonces = await asyncio.gather(*(self.w3.eth.get_transaction_count(a.address, "pending") for a in accounts))
+        self.wallets = [Wallet(a, keys.PrivateKey(bytes.fromhex(k[2:])), n) for a, k, n in zip(accounts, permit_keys, nonces)]
+
+        funder = NonceManager(await self.w3.eth.get_transaction_count(self.funder.address, "pending"))
+        signed = [self._sign(self.funder, funder.take(), w.address, b"", 21000, self.ether) for w in self.wallets]
+        for start in range(0, len(self.wallets), BATCH_SIZE):
+            batch = self.wallets[start:start + BATCH_SIZE]
+            data = encode_call(self.token_abi, "transferBatch", [[w.address for w in batch], [self.tokens] * len(batch)])
+            signed.append(self._sign(self.funder, funder.take(), self.token, data, 60_000 + 40_000 * len(batch)))
+        if self.mix.get("buyTokens") and not await self._call(self.crowdsale, self.crowdsale_abi, "inventoryMode", [], ["bool"]):
+            # Purchases are served with transferFrom from the token owner
+            data = encode_call(self.token_abi, "approve", [self.crowdsale, 2 ** 256 - 1])
+            signed.append(self._sign(self.funder, funder.take(), self.token, data, 100_000))
+        await self._send_all(signed)
+
+        # Every wallet lets the next one spend its tokens
+        signed = []
+        for i, wallet in enumerate(self.wallets):
+            spender = self.wallets[(i + 1) % len(self.wallets)].address
+            data = encode_call(self.token_abi, "approve", [spender, 2 ** 256 - 1])
+            signed.append(self._sign(wallet.account, wallet.nonces.take(), self.token, data, 100_000))
+        await self._send_all(signed)
+
+        samples = {operation: self._operation(operation, 0, random.Random(self.seed), sample=True) for operation in self.mix}
+        estimates = await asyncio.gather(
+            *(
+                self.w3.eth.estimate_gas({"from": self.wallets[0].address, "to": to, "data": data, "value": value})
+                for to, data, value in samples.values()
+            )
+        )
+        self.gas = {operation: int(estimate * self.gas_multiplier) for operation, estimate in zip(samples, estimates)}
+
+    def _operation(self, operation, index, rng, sample=False):
+        """
+        (to, data, value) of one operation sent by wallet `index`.
+        """
+
+        wallet = self.wallets[index]
+        other = self.wallets[rng.randrange(len(self.wallets))].address
+        amount = rng.randrange(1, AMOUNT)
+        if operation == "transfer":
+            return self.token, encode_call(self.token_abi, "transfer", [other, amount]), 0
+        if operation == "transferFrom":
+            owner = self.wallets[index - 1].address
+            return self.token, encode_call(self.token_abi, "transferFrom", [owner, other, amount]), 0
+        if operation == "permit":
+            permit_owner = wallet.permit_account
+            nonce = wallet.permit_nonce
+            if not sample:
+                wallet.permit_nonce += 1
+            owner_address = permit_owner.public_key.to_checksum_address()
+            signature = permit_owner.sign_msg_hash(permit_digest(self.domain, owner_address, wallet.address, amount, nonce, 0))
+            packed = signature.r.to_bytes(32, "big") + signature.s.to_bytes(32, "big") + bytes([signature.v + 27])
+            data = encode_call(self.token_abi, "permit", [owner_address, wallet.address, amount, 0, packed])
+            return self.token, data, 0
+        return self.crowdsale, encode_call(self.crowdsale_abi, "buyTokens", [wallet.address]), self.purchase_wei
+
+    async def _drive(self, index, results):
+        wallet = self.wallets[index]
+        # Wallets draw from their own generator so the sequence does not depend on scheduling
+        rng = random.Random(f"{self.seed}-{index}")
+        operations, weights = zip(*self.mix.items())
+        in_flight = asyncio.Semaphore(self.depth)
+        tasks = []
+
+        async def track(operation, submitted, receipt):
+            try:
+                receipt = await receipt
+                results.append(Result(operation, time.perf_counter() - submitted, receipt["status"], receipt["gasUsed"]))
+            finally:
+                in_flight.release()
+
+        for _ in range(self.ops):
+            operation = rng.choices(operations, weights)[0]
+            to, data, value = self._operation(operation, index, rng)
+            signed = self._sign(wallet.account, wallet.nonces.take(), to, data, self.gas[operation], value)
+            await in_flight.acquire()
+            receipt = self.watcher.wait(encode_hex(signed.hash))
+            submitted = time.perf_counter()
+            await self.w3.eth.send_raw_transaction(signed.rawTransaction)
+            tasks.append(asyncio.create_task(track(operation, submitted, receipt)))
+        await asyncio.gather(*tasks)
+
+    async def run(self):
+        """
+        Sets up the wallets, runs the load and returns the summary.
+        """
+
+        watcher = asyncio.create_task(self.watcher.run())
+        try:
+            await self.setup()
+            results = []
+            started = time.perf_counter()
+            await asyncio.gather(*(self._drive(i, results) for i in range(len(self.wallets))))
+            return summarize(results, time.perf_counter() - started)
+        finally:
+            watcher.cancel()
+
+
+def format_report(report):
+    lines = [f"{report['transactions']} transactions in {report['duration']:.2f}s, {report['tps']:.1f} tx/s"]
+    lines.append(f"{'operation':<14}{'count':>7}{'reverted':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'gas':>9}")
+    for operation in OPERATIONS:
+        row = report.get(operation)
+        if row:
+            lines.append(
+                f"{operation:<14}{row['count']:>7}{row['revert_rate']:>9.1%} "
+                f"{row['p50'] * 1000:>8.1f} {row['p90'] * 1000:>8.1f} {row['p99'] * 1000:>8.1f} {row['gas']:>8}"
+            )
+    return "\n".join(lines)
+
+
+async def load(rpc, private_key, token, crowdsale, **options):
+    from eth_account import Account
+
+    from rpc import connect
+
+    # No state cache, a cached head would show up as receipt latency
+    w3 = connect(rpc, head_ttl=0)
+    try:
+        return await LoadGenerator(w3, Account.from_key(private_key), token, crowdsale, **options).run()
+    finally:
+        await w3.provider.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent Token and Crowdsale load against a dev node.")
+    parser.add_argument("--token", required=True, help="Token address.")
+    parser.add_argument("--crowdsale", required=True, help="Crowdsale address.")
+    parser.add_argument("--rpc", default=os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--key-env", default="FUNDER_PRIVATE_KEY", help="Environment variable holding the token owner's key.")
+    parser.add_argument("--wallets", type=int, default=100, help="Concurrent sending wallets.")
+    parser.add_argument("--ops", type=int, default=10, help="Operations per wallet.")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="Operation weights, e.g. transfer=5,permit=1.")
+    parser.add_argument("--depth", type=int, default=4, help="Transactions in flight per wallet.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    options = dict(wallets=args.wallets, ops=args.ops, mix=args.mix, depth=args.depth, seed=args.seed)
+    print(format_report(asyncio.run(load(args.rpc, os.environ[args.key_env], args.token, args.crowdsale, **options))))
+
+
+if __name__ == "__main__":
+    main()
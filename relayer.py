@@ -0,0 +1,357 @@
+"""
+Relayer of EIP-3009 transfers signed off-chain.
+
+    from relayer import Relayer, sign_authorization
+    relayer = Relayer(w3, Account.from_key(key), token, max_batch=100, max_age=2.0)
+    await relayer.setup()
+    relayer.add(sign_authorization(user_key, relayer.domain, receiver, amount, valid_before))
+    await relayer.run(stop)
+
+Custodial users sign a TransferWithAuthorization with a random 32-byte nonce
+instead of a Permit with the next Token.nonces value, so signing needs nothing
+from the chain and authorizations can be signed and relayed in any order.
+
+The relayer checks every signature locally, drops duplicates, expired and
+invalid authorizations, and queues the rest. The queue is flushed as one
+Token.transferWithAuthorizations call once it holds `max_batch`
+authorizations or its oldest one has waited `max_age` seconds. The token
+skips authorizations that fail on chain instead of reverting the batch;
+the flush reports them as skipped.
+
+Each flush is accounted with the token's fee rounding: the amount the
+receivers got, the txfee and the burn of every applied authorization, and
+the gas of the batch per authorization.
+
+    RELAYER_PRIVATE_KEY=0x... python relayer.py --token 0x... --queue signed.jsonl
+
+relays the authorizations of a JSON lines file, one per line with the
+fields of Authorization, hex encoded nonce and signature.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import namedtuple
+
+from eth_abi import decode, encode
+from eth_keys import keys
+from eth_utils import encode_hex, keccak, to_checksum_address
+
+from deploy import NonceManager, encode_call, load_artifact
+from simulator import fee_divisor
+
+TRANSFER_WITH_AUTHORIZATION_TYPE_HASH = keccak(
+    text="TransferWithAuthorization(address from,address to,uint256 value,uint256 validAfter,uint256 validBefore,bytes32 nonce)"
+)
+AUTHORIZATION_USED_TOPIC = keccak(text="AuthorizationUsed(address,bytes32)")
+
+# Upper bound of the authorizations array in Token.transferWithAuthorizations
+MAX_AUTHORIZATIONS = 100
+
+# Argument order of Token.transferWithAuthorization
+Authorization = namedtuple(
+    "Authorization", ["authorizer", "receiver", "amount", "valid_after", "valid_before", "nonce", "signature"]
+)
+
+Flush = namedtuple("Flush", ["tx_hash", "applied", "skipped", "gas_used", "received", "fees", "burned"])
+
+
+def new_nonce():
+    return os.urandom(32)
+
+
+def authorization_digest(domain, authorizer, receiver, amount, valid_after, valid_before, nonce):
+    struct = keccak(
+        TRANSFER_WITH_AUTHORIZATION_TYPE_HASH
+        + encode(
+            ["address", "address", "uint256", "uint256", "uint256", "bytes32"],
+            [authorizer, receiver, amount, valid_after, valid_before, nonce],
+        )
+    )
+    return keccak(b"\x19\x01" + domain + struct)
+
+
+def sign_authorization(key, domain, receiver, amount, valid_before, valid_after=0, nonce=None):
+    """
+    Authorization to transfer amount to receiver, signed with key under a new random nonce.
+    """
+
+    private_key = keys.PrivateKey(bytes.fromhex(key[2:]) if isinstance(key, str) else bytes(key))
+    authorizer = private_key.public_key.to_checksum_address()
+    nonce = nonce or new_nonce()
+    digest = authorization_digest(domain, authorizer, receiver, amount, valid_after, valid_before, nonce)
+    signature = private_key.sign_msg_hash(digest)
+    packed = signature.r.to_bytes(32, "big") + signature.s.to_bytes(32, "big") + bytes([signature.v + 27])
+    return Authorization(authorizer, to_checksum_address(receiver), amount, valid_after, valid_before, nonce, packed)
+
+
+def recover_authorizer(domain, authorization):
+    """
+    Address that signed the authorization, None for a malformed signature.
+    """
+
+    authorizer, receiver, amount, valid_after, valid_before, nonce, signature = authorization
+    if len(signature) != 65 or signature[64] not in (27, 28):
+        return None
+    digest = authorization_digest(domain, authorizer, receiver, amount, valid_after, valid_before, nonce)
+    vrs = (signature[64] - 27, int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:64], "big"))
+    try:
+        return keys.Signature(vrs=vrs).recover_public_key_from_msg_hash(digest).to_checksum_address()
+    except Exception:
+        return None
+
+
+def split_fees(amount, tx_divisor, burn_divisor):
+    """
+    (received, txfee, burned) of a transfer, rounded as Token._decay does.
+    """
+
+    fee = amount // tx_divisor if tx_divisor else 0
+    burned = amount // burn_divisor if burn_divisor else 0
+    return amount - fee - burned, fee, burned
+
+
+def columns(authorizations):
+    """
+    Arguments of Token.transferWithAuthorizations, one list per Authorization field.
+    """
+
+    return [list(column) for column in zip(*authorizations)] if authorizations else [[] for _ in Authorization._fields]
+
+
+class Relayer:
+    """
+    Queues signed authorizations and submits them in batches from `account`.
+    """
+
+    def __init__(self, w3, account, token, max_batch=MAX_AUTHORIZATIONS, max_age=2.0, gas_multiplier=1.5, poll=0.05, max_backoff=30.0, artifacts=load_artifact):
+        if not 0 < max_batch <= MAX_AUTHORIZATIONS:
+            raise ValueError(f"max_batch must be between 1 and {MAX_AUTHORIZATIONS}.")
+        self.w3 = w3
+        self.account = account
+        self.token = token
+        self.max_batch = max_batch
+        self.max_age = max_age
+        self.gas_multiplier = gas_multiplier
+        self.poll = poll
+        self.max_backoff = max_backoff
+        self.token_abi, _ = artifacts("Token")
+        self.domain = None
+        self.pending = []
+        # (authorizer, nonce) of every authorization queued, by validBefore for pruning
+        self.seen = {}
+        # (hash, batch, txfee, burnfee, feeAddress) of the transaction awaiting its receipt
+        self.sent = None
+
+    async def _call(self, method, args, output_type):
+        data = await self.w3.eth.call({"to": self.token, "data": encode_call(self.token_abi, method, args)})
+        return decode([output_type], data)[0]
+
+    async def setup(self):
+        self.chain_id = await self.w3.eth.chain_id
+        self.domain = await self._call("DOMAIN_SEPARATOR", [], "bytes32")
+        await self._sync_nonces()
+
+    async def _sync_nonces(self):
+        self.nonces = NonceManager(await self.w3.eth.get_transaction_count(self.account.address, "pending"))
+
+    def add(self, authorization):
+        """
+        Queues a signed authorization, False if it is a duplicate, expired or not signed by its authorizer.
+        """
+
+        authorization = Authorization(*authorization)
+        key = (authorization.authorizer.lower(), bytes(authorization.nonce))
+        if key in self.seen or authorization.valid_before <= time.time():
+            return False
+        if recover_authorizer(self.domain, authorization) != to_checksum_address(authorization.authorizer):
+            return False
+        self.seen[key] = authorization.valid_before
+        self.pending.append((time.monotonic(), authorization))
+        return True
+
+    def due(self):
+        """
+        Whether a sent batch awaits its receipt, the queue is full or its oldest authorization waited max_age.
+        """
+
+        if self.sent is not None:
+            return True
+        if not self.pending:
+            return False
+        return len(self.pending) >= self.max_batch or time.monotonic() - self.pending[0][0] >= self.max_age
+
+    async def _send(self, batch):
+        """
+        Signs and broadcasts the batch, then remembers it as sent until its receipt arrives.
+        """
+
+        try:
+            if self.nonces is None:
+                await self._sync_nonces()
+            txfee, burnfee, fee_address, gas_price = await asyncio.gather(
+                self._call("txfee", [], "uint256"),
+                self._call("burnfee", [], "uint256"),
+                self._call("feeAddress", [], "address"),
+                self.w3.eth.gas_price,
+            )
+            data = encode_call(self.token_abi, "transferWithAuthorizations", columns(batch))
+            gas = await self.w3.eth.estimate_gas({"from": self.account.address, "to": self.token, "data": data})
+            tx = {
+                "to": self.token,
+                "data": data,
+                "value": 0,
+                "nonce": self.nonces.take(),
+                "gas": int(gas * self.gas_multiplier),
+                "gasPrice": gas_price,
+                "chainId": self.chain_id,
+            }
+            signed = self.account.sign_transaction(tx)
+            try:
+                await self.w3.eth.send_raw_transaction(signed.rawTransaction)
+            except Exception:
+                # A rejected send leaves its nonce unused, the next flush asks the node again
+                self.nonces = None
+                raise
+        except Exception:
+            # Nothing was sent, the batch goes back to the front of the queue
+            self._requeue(batch)
+            raise
+        self.sent = (signed.hash, batch, txfee, burnfee, fee_address)
+
+    def _requeue(self, batch):
+        self.pending[:0] = [(time.monotonic(), authorization) for authorization in batch]
+
+    async def flush(self):
+        """
+        Submits up to max_batch queued authorizations in one transaction, None if the queue is empty.
+        A batch that was sent is awaited until it mines: if waiting fails, the next flush
+        awaits the same transaction instead of sending its authorizations again.
+        """
+
+        if self.sent is None:
+            batch = [authorization for _, authorization in self.pending[: self.max_batch]]
+            if not batch:
+                return None
+            del self.pending[: len(batch)]
+            now = time.time()
+            self.seen = {key: valid_before for key, valid_before in self.seen.items() if valid_before > now}
+            await self._send(batch)
+
+        tx_hash, batch, txfee, burnfee, fee_address = self.sent
+        try:
+            receipt = await self.w3.eth.wait_for_transaction_receipt(tx_hash, poll_latency=self.poll)
+        except Exception:
+            from web3.exceptions import TransactionNotFound
+
+            try:
+                await self.w3.eth.get_transaction(tx_hash)
+            except TransactionNotFound:
+                # The node dropped the transaction, its batch and nonce are free again
+                self.sent = self.nonces = None
+                self._requeue(batch)
+            raise
+        self.sent = None
+        if receipt["status"] != 1:
+            # Nothing was applied, the batch goes back to the front of the queue
+            self._requeue(batch)
+            raise RuntimeError(f"Batch {encode_hex(tx_hash)} reverted.")
+
+        used = set()
+        for log in receipt["logs"]:
+            topics = [bytes(topic) for topic in log["topics"]]
+            if to_checksum_address(log["address"]) == to_checksum_address(self.token) and topics[0] == AUTHORIZATION_USED_TOPIC:
+                used.add((to_checksum_address(topics[1][12:]), topics[2]))
+
+        applied, skipped = [], []
+        received = fees = burned = 0
+        tx_divisor, burn_divisor = fee_divisor(txfee), fee_divisor(burnfee)
+        for authorization in batch:
+            authorizer = to_checksum_address(authorization.authorizer)
+            if (authorizer, bytes(authorization.nonce)) not in used:
+                skipped.append(authorization)
+                continue
+            applied.append(authorization)
+            if authorizer == to_checksum_address(fee_address):
+                received += authorization.amount
+            else:
+                amounts = split_fees(authorization.amount, tx_divisor, burn_divisor)
+                received, fees, burned = received + amounts[0], fees + amounts[1], burned + amounts[2]
+        return Flush(encode_hex(tx_hash), applied, skipped, receipt["gasUsed"], received, fees, burned)
+
+    async def run(self, stop, log=print):
+        """
+        Flushes whenever the queue is due until `stop`, an asyncio.Event, is set, then flushes the rest.
+        A failed flush is logged and retried after a delay that doubles up to max_backoff;
+        once stopped, a failed flush raises with the rest still queued.
+        """
+
+        delay = self.poll
+        while not stop.is_set():
+            if not self.due():
+                await asyncio.sleep(self.poll)
+                continue
+            try:
+                log(format_flush(await self.flush()))
+                delay = self.poll
+            except Exception as error:
+                log(f"Flush failed, retrying in {delay:.2f} s: {error!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+        while self.pending or self.sent is not None:
+            log(format_flush(await self.flush()))
+
+
+def format_flush(flush):
+    count = len(flush.applied) + len(flush.skipped)
+    per_authorization = flush.gas_used // max(len(flush.applied), 1)
+    return (
+        f"{flush.tx_hash} applied {len(flush.applied)}/{count}, received {flush.received}, "
+        f"fees {flush.fees}, burned {flush.burned}, {flush.gas_used} gas ({per_authorization} per authorization)"
+    )
+
+
+def read_queue(path):
+    with open(path) as lines:
+        for line in lines:
+            if line.strip():
+                item = json.loads(line)
+                item["nonce"] = bytes.fromhex(item["nonce"].removeprefix("0x"))
+                item["signature"] = bytes.fromhex(item["signature"].removeprefix("0x"))
+                yield Authorization(**item)
+
+
+async def relay(rpc, private_key, token, queue, **options):
+    from eth_account import Account
+
+    from rpc import connect
+
+    w3 = connect(rpc)
+    try:
+        relayer = Relayer(w3, Account.from_key(private_key), token, **options)
+        await relayer.setup()
+        dropped = sum(not relayer.add(authorization) for authorization in read_queue(queue))
+        if dropped:
+            print(f"Dropped {dropped} duplicate, expired or invalid authorizations.")
+        stop = asyncio.Event()
+        stop.set()
+        await relayer.run(stop)
+    finally:
+        await w3.provider.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay EIP-3009 transfer authorizations to Token in batches.")
+    parser.add_argument("--token", required=True, help="Token address.")
+    parser.add_argument("--queue", required=True, help="JSON lines file of signed authorizations.")
+    parser.add_argument("--rpc", default=os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--key-env", default="RELAYER_PRIVATE_KEY", help="Environment variable holding the relayer's key.")
+    parser.add_argument("--max-batch", type=int, default=MAX_AUTHORIZATIONS, help="Authorizations per transaction.")
+    args = parser.parse_args()
+
+    asyncio.run(relay(args.rpc, os.environ[args.key_env], args.token, args.queue, max_batch=args.max_batch))
+
+
+if __name__ == "__main__":
+    main()
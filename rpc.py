@@ -0,0 +1,310 @@
+"""
+Batching JSON-RPC provider shared by the Python tooling.
+
+    from rpc import connect
+    w3 = connect("http://127.0.0.1:8545")
+
+Requests issued in the same event loop tick, for example by asyncio.gather,
+go to the node as one JSON-RPC batch over a pooled keep-alive connection,
+and identical requests in a batch are sent once. Results that cannot change
+(chain id, mined transactions and receipts, blocks by hash; reorgs aside)
+are cached for good. State reads at the latest block are cached until a new head is seen:
+the head is checked at most every `head_ttl` seconds, piggybacked on the
+next batch, and any transaction sent through the provider drops the state
+cache as well.
+
+    python rpc.py --token 0x... --crowdsale 0x... --holders 200
+
+compares request counts and latency of the plain provider and this one for
+the reads our ops scripts make.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from web3._utils.encoding import Web3JsonEncoder
+from web3.providers.async_rpc import AsyncHTTPProvider
+
+# Results that never change once the node returned them (null results are not cached)
+IMMUTABLE = {
+    "eth_chainId",
+    "net_version",
+    "web3_clientVersion",
+    "eth_getBlockByHash",
+    "eth_getTransactionByHash",
+    "eth_getTransactionReceipt",
+    "eth_getTransactionByBlockHashAndIndex",
+}
+
+# Results valid until the next head
+STATE = {
+    "eth_blockNumber",
+    "eth_call",
+    "eth_estimateGas",
+    "eth_gasPrice",
+    "eth_maxPriorityFeePerGas",
+    "eth_feeHistory",
+    "eth_getBalance",
+    "eth_getCode",
+    "eth_getStorageAt",
+    "eth_getTransactionCount",
+    "eth_getBlockByNumber",
+    "eth_getLogs",
+}
+
+# Requests that change what the state reads return
+WRITES = {"eth_sendRawTransaction", "eth_sendTransaction"}
+
+
+class RPCStats:
+    """
+    Request counters of a BatchingProvider.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.http_requests = 0
+        self.latencies = []
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "sent": self.sent,
+            "http_requests": self.http_requests,
+            "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "p90_ms": 1000 * latencies[int(0.9 * len(latencies))] if latencies else 0.0,
+        }
+
+
+class BatchingProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider that batches, deduplicates and caches requests.
+    """
+
+    def __init__(self, endpoint_uri, head_ttl=1.0, max_batch=200, connections=8, request_kwargs=None):
+        super().__init__(endpoint_uri, request_kwargs)
+        self.head_ttl = head_ttl
+        self.max_batch = max_batch
+        self.connections = connections
+        self.stats = RPCStats()
+        self.head = None
+        self._head_checked = float("-inf")
+        self._immutable = {}
+        self._state = {}
+        # Bumped whenever the state cache is dropped, so reads in flight at the time are not cached
+        self._generation = 0
+        self._queue = {}
+        # Batches in flight, referenced until done so the loop cannot drop them
+        self._tasks = set()
+        self._session = None
+
+    async def _post(self, payload):
+        import aiohttp
+
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.connections, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, headers=self.get_request_headers())
+        started = time.perf_counter()
+        async with self._session.post(self.endpoint_uri, data=payload, timeout=aiohttp.ClientTimeout(total=60)) as response:
+            response.raise_for_status()
+            body = await response.read()
+        self.stats.http_requests += 1
+        self.stats.latencies.append(time.perf_counter() - started)
+        return body
+
+    async def make_request(self, method, params):
+        self.stats.calls += 1
+        params = params or []
+        key = json.dumps([method, params], cls=Web3JsonEncoder, sort_keys=True)
+        head_fresh = time.monotonic() - self._head_checked < self.head_ttl
+
+        if method in IMMUTABLE and key in self._immutable:
+            self.stats.cache_hits += 1
+            return self._response(self._immutable[key])
+        if method in STATE and head_fresh and "pending" not in params and key in self._state:
+            self.stats.cache_hits += 1
+            return self._response(self._state[key])
+        if method in WRITES:
+            self._drop_state()
+            self._head_checked = float("-inf")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queued = self._queue.get(key)
+        if queued is not None:
+            # One request for all waiters, each with its own future so they resume in the same tick
+            self.stats.coalesced += 1
+            queued[2].append(future)
+            return await future
+
+        if not self._queue:
+            # Everything queued until the loop gets back to the callbacks goes in one batch
+            loop.call_soon(self._flush)
+        self._queue[key] = (method, params, [future])
+        return await future
+
+    def _drop_state(self):
+        self._state.clear()
+        self._generation += 1
+
+    @staticmethod
+    def _response(result):
+        return {"jsonrpc": "2.0", "id": 0, "result": result}
+
+    def _flush(self):
+        queue, self._queue = self._queue, {}
+        items = list(queue.items())
+        for start in range(0, len(items), self.max_batch):
+            task = asyncio.ensure_future(self._send(items[start:start + self.max_batch]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, items):
+        check_head = time.monotonic() - self._head_checked >= self.head_ttl
+        generation = self._generation
+        requests = [(method, params) for _, (method, params, _) in items]
+        if check_head:
+            requests.append(("eth_blockNumber", []))
+        payload = [
+            {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+            for request_id, (method, params) in enumerate(requests)
+        ]
+
+        try:
+            body = await self._post(json.dumps(payload, cls=Web3JsonEncoder).encode())
+            self._resolve(items, requests, check_head, generation, json.loads(body))
+        except Exception as error:
+            # Whatever went wrong, no waiter is left without an answer
+            for _, (_, _, futures) in items:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _resolve(self, items, requests, check_head, generation, body):
+        if not isinstance(body, list):
+            # A node that rejects the whole batch answers with one error object
+            error = body.get("error") if isinstance(body, dict) else body
+            raise ValueError(f"JSON-RPC batch failed: {error}")
+        responses = {response["id"]: response for response in body}
+        self.stats.sent += len(requests)
+
+        if check_head:
+            head = responses.get(len(requests) - 1, {}).get("result")
+            # After a write in flight the head is checked again on the next batch
+            if head is not None and generation == self._generation:
+                if head != self.head:
+                    self._drop_state()
+                    self.head = head
+                    generation = self._generation
+                self._head_checked = time.monotonic()
+                self._state[json.dumps(["eth_blockNumber", []], cls=Web3JsonEncoder, sort_keys=True)] = head
+
+        for request_id, (key, (method, params, futures)) in enumerate(items):
+            response = responses.get(request_id)
+            if response is None:
+                response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": -32603, "message": "Missing response in batch."}}
+            result = response.get("result")
+            if "error" not in response and result is not None:
+                if method in IMMUTABLE:
+                    self._immutable[key] = result
+                elif method in STATE and "pending" not in params and generation == self._generation:
+                    self._state[key] = result
+            for future in futures:
+                if not future.done():
+                    future.set_result(response)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+def connect(rpc, **options):
+    """
+    AsyncWeb3 on a BatchingProvider for rpc.
+    """
+
+    from web3 import AsyncWeb3
+
+    return AsyncWeb3(BatchingProvider(rpc, **options))
+
+
+async def read_state(w3, token, crowdsale, holders, rounds=2):
+    """
+    The reads of the ops scripts: balanceOf of every holder, rate and weiRaised, repeated `rounds` times.
+    """
+
+    from eth_abi import decode
+
+    from deploy import encode_call, load_artifact
+
+    token_abi, _ = load_artifact("Token")
+    crowdsale_abi, _ = load_artifact("Crowdsale")
+
+    async def call(to, abi, method, args):
+        return decode(["uint256"], bytes(await w3.eth.call({"to": to, "data": encode_call(abi, method, args)})))[0]
+
+    for _ in range(rounds):
+        reads = [call(token, token_abi, "balanceOf", [holder]) for holder in holders]
+        reads += [call(crowdsale, crowdsale_abi, "rate", []), call(crowdsale, crowdsale_abi, "weiRaised", [])]
+        values = await asyncio.gather(*reads)
+    return values
+
+
+async def compare(rpc, token, crowdsale, holders, rounds=2, **options):
+    """
+    Request counts and wall time of read_state on a plain AsyncHTTPProvider and on a BatchingProvider.
+    """
+
+    from web3 import AsyncWeb3
+
+    class CountingProvider(AsyncHTTPProvider):
+        requests = 0
+
+        async def make_request(self, method, params):
+            CountingProvider.requests += 1
+            return await super().make_request(method, params)
+
+    plain = AsyncWeb3(CountingProvider(rpc))
+    started = time.perf_counter()
+    expected = await read_state(plain, token, crowdsale, holders, rounds)
+    plain_time = time.perf_counter() - started
+
+    batched = connect(rpc, **options)
+    started = time.perf_counter()
+    values = await read_state(batched, token, crowdsale, holders, rounds)
+    batched_time = time.perf_counter() - started
+    await batched.provider.close()
+    assert values == expected
+
+    return {
+        "plain": {"http_requests": CountingProvider.requests, "seconds": plain_time},
+        "batched": {**batched.provider.stats.summary(), "seconds": batched_time},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plain and batched JSON-RPC reads against a node.")
+    parser.add_argument("--token", required=True, help="Token address.")
+    parser.add_argument("--crowdsale", required=True, help="Crowdsale address.")
+    parser.add_argument("--rpc", default=os.environ.get("KIWI_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--holders", type=int, default=200, help="Addresses whose balance is read.")
+    parser.add_argument("--rounds", type=int, default=2, help="Times every read is repeated.")
+    args = parser.parse_args()
+
+    holders = ["0x" + f"{i + 1:040x}" for i in range(args.holders)]
+    report = asyncio.run(compare(args.rpc, args.token, args.crowdsale, holders, args.rounds))
+    for name, row in report.items():
+        print(name, " ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}" for key, value in row.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import time
+
+import click
+from ape import accounts, project
+from ape.cli import NetworkBoundCommand, ape_cli_context, network_option
+
+from evm import benchmark
+
+
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--transactions", default=1_000, help="Token transfers sent through the ape provider.")
+@click.option("--evm-transactions", default=10_000, help="Token transfers applied on the in-process EVM.")
+def cli(cli_ctx, network, transactions, evm_transactions):
+    """
+    Token transfers per second through the ape provider versus evm.EVM,
+    both between ten funded test accounts of a fresh Token.
+    """
+
+    senders = accounts.test_accounts[:10]
+    token = senders[0].deploy(project.Token, 1, 1, senders[2])
+    for account in senders[1:]:
+        token.transfer(account, 10 ** 24, sender=senders[0])
+
+    started = time.perf_counter()
+    for i in range(transactions):
+        token.transfer(senders[(i + 1) % 10], 1000 + i, sender=senders[i % 10])
+    provider = transactions / (time.perf_counter() - started)
+
+    in_process = benchmark(evm_transactions)["tps"]
+    click.echo("Token.transfer between ten accounts")
+    click.echo(f"  ape provider     {provider:8.0f} tx/s ({transactions} transfers)")
+    click.echo(f"  in-process EVM   {in_process:8.0f} tx/s ({evm_transactions} transfers)")
+    click.echo(f"  speedup          {in_process / provider:8.1f}x")
@@ -0,0 +1,84 @@
+import os
+import time
+
+import click
+from ape import accounts, chain, project
+from ape.cli import NetworkBoundCommand, ape_cli_context, network_option
+from eip712.messages import EIP712Message
+from eth_account import Account
+
+from permits import PermitRequest, domain_separator, permit_digest, sign_permits
+
+
+def _eip712_permits(token, chain_id):
+    class Permit(EIP712Message):
+        _name_: "string" = "KIWINATIVE"
+        _version_: "string" = "1.0"
+        _chainId_: "uint256" = chain_id
+        _verifyingContract_: "address" = token
+
+        owner: "address"
+        spender: "address"
+        value: "uint256"
+        nonce: "uint256"
+        deadline: "uint256"
+
+    return Permit
+
+
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--count", default=100_000, help="Number of permits to sign.")
+@click.option("--owners", default=1_000, help="Distinct owner keys, each signs count / owners nonces.")
+@click.option("--baseline", default=1_000, help="Permits signed one by one with EIP712Message for comparison.")
+@click.option("--processes", type=int, help="Signing processes, defaults to all cores.")
+@click.option("--verify", default=20, help="Signatures submitted to Token.permit on chain.")
+def cli(cli_ctx, network, count, owners, baseline, processes, verify):
+    """
+    Throughput of permits.sign_permits against one EIP712Message and
+    sign_message per permit, then submits a sample to a fresh Token.
+    """
+
+    relayer = accounts.test_accounts[0]
+    token = relayer.deploy(project.Token, 1, 1, relayer)
+    domain = token.DOMAIN_SEPARATOR()
+    if domain != domain_separator(chain.chain_id, token.address):
+        cli_ctx.logger.warning("Provider chain id differs from chain.id, using the on-chain domain separator.")
+
+    keys = ["0x" + os.urandom(32).hex() for _ in range(owners)]
+    addresses = [Account.from_key(key).address for key in keys]
+    deadline = chain.pending_timestamp + 3600
+    requests = [
+        PermitRequest(keys[i % owners], addresses[i % owners], relayer.address, 10 ** 18 + i, i // owners, deadline)
+        for i in range(count)
+    ]
+
+    started = time.perf_counter()
+    for _, owner, spender, value, nonce, _ in requests:
+        permit_digest(domain, owner, spender, value, nonce, deadline)
+    hashing = count / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    signatures = sign_permits(domain, requests, processes=processes)
+    bulk = count / (time.perf_counter() - started)
+
+    # Same messages through EIP712Message, as tests/conftest.py signs them
+    Permit = _eip712_permits(token.address, chain.chain_id)
+    started = time.perf_counter()
+    for key, owner, spender, value, nonce, _ in requests[:baseline]:
+        message = Permit(owner, spender, value, nonce, deadline).signable_message
+        Account.sign_message(message, key)
+    one_by_one = baseline / (time.perf_counter() - started)
+
+    click.echo(f"{count} permits from {owners} owners on {processes or os.cpu_count()} processes")
+    click.echo(f"  permit_digest only      {hashing:10.0f} permits/s")
+    click.echo(f"  sign_permits            {bulk:10.0f} permits/s")
+    click.echo(f"  EIP712Message per permit {one_by_one:9.0f} permits/s ({baseline} signed)")
+    click.echo(f"  speedup                 {bulk / one_by_one:10.1f}x")
+
+    # Nonce 0 permits of the first owners verify against the contract
+    for request, signature in list(zip(requests, signatures))[:min(verify, owners)]:
+        token.permit(request.owner, relayer, request.value, deadline, signature, sender=relayer)
+        assert token.allowance(request.owner, relayer) == request.value
+    click.echo(f"  {min(verify, owners)} signatures accepted by Token.permit")
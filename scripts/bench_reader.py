@@ -0,0 +1,98 @@
+import asyncio
+import os
+import time
+
+import click
+from ape import accounts, chain, project
+from ape.cli import NetworkBoundCommand, ape_cli_context, network_option
+from eth_abi import decode
+
+from deploy import encode_call, load_artifact
+from reader import BatchReader
+
+# Upper bound of the receivers array in Token.transferBatch
+MAX_TRANSFER_BATCH = 500
+
+TOKEN_GETTERS = (
+    ("balanceOf", "uint256"),
+    ("blackListAddresses", "bool"),
+    ("isMinter", "bool"),
+    ("nonces", "uint256"),
+)
+
+
+def _async_web3():
+    from web3 import AsyncHTTPProvider, AsyncWeb3
+    from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+    uri = getattr(chain.provider, "uri", None)
+    if uri and uri.startswith("http"):
+        return AsyncWeb3(AsyncHTTPProvider(uri))
+
+    # In-process test chain: share its tester
+    provider = AsyncEthereumTesterProvider()
+    provider.ethereum_tester = chain.provider.web3.provider.ethereum_tester
+    return AsyncWeb3(provider)
+
+
+async def read_individually(w3, token, holders, concurrency):
+    """
+    The same fields as BatchReader.accounts, one eth_call per address and field.
+    """
+
+    abi = load_artifact("Token")[0]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(method, output_type, holder):
+        async with semaphore:
+            result = await w3.eth.call({"to": token, "data": encode_call(abi, method, [holder])})
+        return decode([output_type], bytes(result))[0]
+
+    async def account(holder):
+        return await asyncio.gather(*(call(method, output_type, holder) for method, output_type in TOKEN_GETTERS))
+
+    return await asyncio.gather(*(account(holder) for holder in holders))
+
+
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.option("--count", default=10_000, help="Number of addresses to read.")
+@click.option("--holders", default=1_000, help="How many of them receive tokens first.")
+@click.option("--concurrency", default=8, help="eth_calls in flight at once.")
+def cli(cli_ctx, network, count, holders, concurrency):
+    """
+    Wall time of reading balance, blacklist, minter and nonce for --count
+    addresses through BatchReader versus one eth_call per address and field.
+    Deploys a fresh Token and BatchReader from the first test account.
+    """
+
+    account = accounts.test_accounts[0]
+    token = account.deploy(project.Token, 0, 0, account)
+    reader = account.deploy(project.BatchReader)
+
+    addresses = ["0x" + os.urandom(20).hex() for _ in range(count)]
+    for start in range(0, min(holders, count), MAX_TRANSFER_BATCH):
+        receivers = addresses[start:min(start + MAX_TRANSFER_BATCH, holders)]
+        token.transferBatch(receivers, [10 ** 18] * len(receivers), sender=account)
+
+    async def run():
+        w3 = _async_web3()
+        client = BatchReader(w3, reader.address, token.address, concurrency=concurrency)
+
+        started = time.perf_counter()
+        batched = await client.accounts(addresses)
+        batched_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        individual = await read_individually(w3, token.address, addresses, concurrency)
+        individual_time = time.perf_counter() - started
+
+        assert [tuple(state) for state in batched.values()] == [tuple(row) for row in individual]
+        return client.calls, batched_time, individual_time
+
+    calls, batched_time, individual_time = asyncio.run(run())
+    click.echo(f"{count} addresses, {len(TOKEN_GETTERS)} fields, concurrency {concurrency}")
+    click.echo(f"  BatchReader    {calls:>6} eth_calls  {batched_time:8.2f} s")
+    click.echo(f"  per address    {count * len(TOKEN_GETTERS):>6} eth_calls  {individual_time:8.2f} s")
+    click.echo(f"  speedup        {individual_time / batched_time:.1f}x")
@@ -0,0 +1,92 @@
+import sqlite3
+
+import click
+from ape import chain, project
+from ape.cli import NetworkBoundCommand, account_option, ape_cli_context, network_option
+
+# Upper bound of the packed addresses in Token.blacklistPacked
+MAX_BATCH_SIZE = 1000
+
+# Measured cost of blacklistPacked: fixed overhead plus one changed (cold) address.
+BLACKLIST_BASE_GAS = 30000
+BLACKLIST_ENTRY_GAS = 25000
+
+
+def batch_size(gas_limit, gas_fraction=0.5):
+    """
+    Number of addresses that fit in one blacklistPacked call,
+    using at most gas_fraction of the given block gas limit.
+    """
+
+    budget = int(gas_limit * gas_fraction) - BLACKLIST_BASE_GAS
+    return max(1, min(MAX_BATCH_SIZE, budget // BLACKLIST_ENTRY_GAS))
+
+
+def pack_addresses(addresses):
+    return b"".join(bytes.fromhex(address[2:]) for address in addresses)
+
+
+def read_addresses(screening):
+    """
+    Reads one address per line (first CSV column), ignoring blanks and `#` comments.
+    """
+
+    addresses = set()
+    for line in screening:
+        address = line.split(",")[0].strip()
+        if address and not address.startswith("#"):
+            addresses.add(address.lower())
+    return addresses
+
+
+def indexed_blacklist(db_path):
+    """
+    Blacklisted addresses according to an indexer.py database.
+    """
+
+    db = sqlite3.connect(db_path)
+    return {row[0].lower() for row in db.execute("SELECT address FROM blacklist WHERE listed = 1")}
+
+
+def blacklist_delta(desired, listed, sync=False):
+    """
+    (to blacklist, to unblacklist) turning listed into desired.
+    Without sync, addresses missing from desired stay blacklisted.
+    """
+
+    return sorted(desired - listed), sorted(listed - desired) if sync else []
+
+
+def chunk_addresses(addresses, gas_limit, gas_fraction=0.5):
+    size = batch_size(gas_limit, gas_fraction)
+    for start in range(0, len(addresses), size):
+        yield addresses[start:start + size]
+
+
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@account_option()
+@click.argument("token_address")
+@click.argument("screening", type=click.File())
+@click.option("--db", required=True, help="indexer.py database holding the current blacklist.")
+@click.option("--sync", is_flag=True, help="Also unblacklist addresses missing from the screening list.")
+@click.option("--gas-fraction", default=0.5, help="Share of the block gas limit a batch may use.")
+def cli(cli_ctx, network, account, token_address, screening, db, sync, gas_fraction):
+    """
+    Applies a screening list with Token.blacklistPacked, sending only the
+    difference to the indexed blacklist. A stale index only costs gas:
+    addresses already in the requested state are skipped on chain.
+    """
+
+    token = project.Token.at(token_address)
+    add, remove = blacklist_delta(read_addresses(screening), indexed_blacklist(db), sync)
+    gas_limit = chain.blocks.head.gas_limit
+
+    for state, addresses in ((True, add), (False, remove)):
+        for batch in chunk_addresses(addresses, gas_limit, gas_fraction):
+            receipt = token.blacklistPacked(pack_addresses(batch), state, sender=account)
+            changed = len(list(receipt.decode_logs(token.Blacklist)))
+            cli_ctx.logger.success(
+                f"{'Blacklisted' if state else 'Unblacklisted'} {changed} of {len(batch)} addresses, gas used {receipt.gas_used}."
+            )
@@ -0,0 +1,239 @@
+import re
+from collections import Counter
+
+import click
+from ape import chain, project
+from ape.cli import NetworkBoundCommand, ape_cli_context, network_option
+
+CALL_OPS = {"CALL", "CALLCODE", "DELEGATECALL", "STATICCALL"}
+
+
+def function_ranges(source):
+    """
+    (first line, last line, name) of every function in a Vyper source.
+    A function ends at the next top-level statement, decorators included.
+    """
+
+    lines = source.splitlines()
+    ranges = []
+    start = name = None
+
+    def close(end):
+        while end > start and not lines[end - 1].strip():
+            end -= 1
+        ranges.append((start, end, name))
+
+    for number, line in enumerate(lines, start=1):
+        if start and line and line[0] not in " \t#)":
+            close(number - 1)
+            start = None
+        match = re.match(r"def (\w+)\(", line)
+        if match:
+            start, name = number, match.group(1)
+    if start:
+        close(len(lines))
+    return ranges
+
+
+class ContractSource:
+    """
+    Maps program counters of one contract to source lines and functions.
+    """
+
+    def __init__(self, name, pc_lines, source):
+        self.name = name
+        self.pc_lines = pc_lines
+        self.text = source.splitlines()
+        self.functions = function_ranges(source)
+
+    def function_at(self, line):
+        for start, end, name in self.functions:
+            if start <= line <= end:
+                return name
+        return None
+
+
+class Profile:
+    """
+    Gas of a transaction trace, attributed to source lines,
+    functions (self gas) and folded call stacks.
+    """
+
+    def __init__(self):
+        self.lines = Counter()
+        self.functions = Counter()
+        self.stacks = Counter()
+        self.sources = {}
+
+    @property
+    def total(self):
+        return sum(self.stacks.values())
+
+
+class _Frame:
+    # Execution context of one contract call inside the trace.
+    def __init__(self, source, name, prefix):
+        self.source = source
+        self.name = name
+        self.prefix = prefix
+        self.functions = []
+        self.line = None
+        self.total = 0
+        self.pending_call = None
+
+    def step(self, pc):
+        if self.source is None:
+            return
+        line = self.source.pc_lines.get(pc)
+        if line is None:
+            return
+        self.line = line
+        function = self.source.function_at(line)
+        if function is None:
+            return
+        # Vyper has no recursion: seeing a function already on the stack means it returned into it
+        if function in self.functions:
+            del self.functions[self.functions.index(function) + 1:]
+        else:
+            self.functions.append(function)
+
+    def stack(self):
+        functions = self.functions or ["<dispatch>"]
+        return self.prefix + tuple(f"{self.name}:{function}" for function in functions)
+
+
+def _charge(profile, frame, gas):
+    frame.total += gas
+    profile.stacks[frame.stack()] += gas
+    profile.functions[frame.stack()[-1]] += gas
+    profile.lines[(frame.name, frame.line)] += gas
+
+
+def _call_target(trace_frame):
+    return "0x" + bytes(trace_frame.stack[-2])[-20:].hex()
+
+
+def profile_trace(trace, address, resolve):
+    """
+    Attributes the gas of a geth struct-log trace to source lines.
+    `resolve(address)` returns the ContractSource of a contract or None.
+    CALL opcodes are charged their own cost only, the callee's gas
+    is attributed to the callee's lines.
+    """
+
+    profile = Profile()
+
+    def enter(target, prefix):
+        source = resolve(target)
+        name = source.name if source else target
+        profile.sources[name] = source
+        return _Frame(source, name, prefix)
+
+    frames = [enter(address, ())]
+    depth = None
+    for trace_frame in trace:
+        if depth is None:
+            depth = trace_frame.depth
+
+        if trace_frame.depth > depth:
+            caller = frames[-1]
+            frames.append(enter(_call_target(caller.pending_call), caller.stack()))
+        elif trace_frame.depth < depth:
+            callee = frames.pop()
+            caller = frames[-1]
+            inclusive = caller.pending_call.gas - trace_frame.gas
+            _charge(profile, caller, inclusive - callee.total)
+            caller.total += callee.total
+            caller.pending_call = None
+        elif frames[-1].pending_call is not None:
+            # call into an account without code
+            caller = frames[-1]
+            _charge(profile, caller, caller.pending_call.gas - trace_frame.gas)
+            caller.pending_call = None
+        depth = trace_frame.depth
+
+        frame = frames[-1]
+        frame.step(trace_frame.pc)
+        if trace_frame.op in CALL_OPS:
+            frame.pending_call = trace_frame
+        else:
+            _charge(profile, frame, trace_frame.gas_cost)
+
+    return profile
+
+
+def format_folded(profile):
+    """
+    Folded stacks, one `frame;frame;frame gas` line per stack,
+    as read by flamegraph.pl, inferno and speedscope.
+    """
+
+    return "\n".join(f"{';'.join(stack)} {gas}" for stack, gas in sorted(profile.stacks.items()) if gas)
+
+
+def format_hotspots(profile, top=20):
+    """
+    Tables of the most expensive source lines and functions.
+    """
+
+    total = profile.total or 1
+    rows = [f"{'gas':>9} {'share':>6}  {'location':<20} {'function':<20} code"]
+    for (name, line), gas in profile.lines.most_common(top):
+        source = profile.sources.get(name)
+        function = code = ""
+        if source and line:
+            function = source.function_at(line) or ""
+            code = source.text[line - 1].strip()
+        location = f"{name}:{line or '?'}"
+        rows.append(f"{gas:>9} {gas / total:>6.1%}  {location:<20} {function:<20} {code}")
+
+    rows.append("")
+    rows.append(f"{'gas':>9} {'share':>6}  function (self)")
+    for function, gas in profile.functions.most_common():
+        if not gas:
+            break
+        rows.append(f"{gas:>9} {gas / total:>6.1%}  {function}")
+    return "\n".join(rows)
+
+
+def resolve_contract(address):
+    """
+    Loads the ContractSource of a deployed project contract.
+    """
+
+    contract_type = chain.contracts.get(address)
+    if contract_type is None or contract_type.pcmap is None or contract_type.source_id is None:
+        return None
+
+    pc_lines = {
+        pc: item.line_start
+        for pc, item in contract_type.pcmap.parse().items()
+        if item.line_start is not None
+    }
+    source = (project.contracts_folder / contract_type.source_id).read_text()
+    return ContractSource(contract_type.source_id, pc_lines, source)
+
+
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@click.argument("txn_hash")
+@click.option("--folded", type=click.File("w"), help="Write flamegraph folded stacks to this file.")
+@click.option("--top", default=20, help="Number of source lines in the hotspot table.")
+def cli(cli_ctx, network, txn_hash, folded, top):
+    """
+    Replays a transaction with debug_traceTransaction and reports gas per
+    source line and function. Needs a provider with tracing, e.g.
+    `--network ethereum:local:geth` against a geth dev node.
+    """
+
+    receipt = chain.provider.get_receipt(txn_hash)
+    trace = chain.provider.get_transaction_trace(txn_hash)
+    profile = profile_trace(trace, receipt.receiver, resolve_contract)
+
+    click.echo(format_hotspots(profile, top))
+    click.echo(f"\n{profile.total} gas executed, {receipt.gas_used - profile.total} intrinsic gas net of refunds.")
+
+    if folded:
+        folded.write(format_folded(profile) + "\n")
+        cli_ctx.logger.success(f"Folded stacks written to {folded.name}.")
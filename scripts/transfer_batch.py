@@ -0,0 +1,73 @@
+import csv
+
+import click
+from ape import chain, project
+from ape.cli import NetworkBoundCommand, account_option, ape_cli_context, network_option
+
+# Upper bound of the receivers/amounts arrays in Token.transferBatch
+MAX_BATCH_SIZE = 500
+
+# Measured cost of a batch: fixed overhead plus a cold (empty balance) receiver.
+BATCH_BASE_GAS = 70000
+BATCH_RECIPIENT_GAS = 27000
+
+
+def batch_size(gas_limit, gas_fraction=0.5):
+    """
+    Number of receivers that fit in one transferBatch call,
+    using at most gas_fraction of the given block gas limit.
+    """
+
+    budget = int(gas_limit * gas_fraction) - BATCH_BASE_GAS
+    return max(1, min(MAX_BATCH_SIZE, budget // BATCH_RECIPIENT_GAS))
+
+
+def chunk_transfers(receivers, amounts, gas_limit, gas_fraction=0.5):
+    """
+    Split receivers and amounts into (receivers, amounts) chunks
+    that each fit a single transferBatch call.
+    """
+
+    if len(receivers) != len(amounts):
+        raise ValueError("Receivers and amounts length mismatch.")
+
+    size = batch_size(gas_limit, gas_fraction)
+    for start in range(0, len(receivers), size):
+        yield receivers[start:start + size], amounts[start:start + size]
+
+
+def read_payouts(payouts):
+    """
+    Reads `address,amount` rows from a CSV file.
+    """
+
+    receivers, amounts = [], []
+    for row in csv.reader(payouts):
+        if not row or row[0].startswith("#"):
+            continue
+        receivers.append(row[0].strip())
+        amounts.append(int(row[1]))
+    return receivers, amounts
+
+
+@click.command(cls=NetworkBoundCommand)
+@ape_cli_context()
+@network_option()
+@account_option()
+@click.argument("token_address")
+@click.argument("payouts", type=click.File())
+@click.option("--gas-fraction", default=0.5, help="Share of the block gas limit a batch may use.")
+def cli(cli_ctx, network, account, token_address, payouts, gas_fraction):
+    """
+    Pays out a CSV of `address,amount` rows with Token.transferBatch.
+    """
+
+    token = project.Token.at(token_address)
+    receivers, amounts = read_payouts(payouts)
+    gas_limit = chain.blocks.head.gas_limit
+
+    for batch_receivers, batch_amounts in chunk_transfers(receivers, amounts, gas_limit, gas_fraction):
+        receipt = token.transferBatch(batch_receivers, batch_amounts, sender=account)
+        cli_ctx.logger.success(
+            f"Paid {len(batch_receivers)} receivers, gas used {receipt.gas_used}."
+        )
@@ -0,0 +1,588 @@
+"""
+Fee and supply simulator mirroring Token.vy, for trying txfee/burnfee
+changes before sending updateFees.
+
+    ./kiwi.py simulate --txfee 5 --burnfee 2 --transfers 1000000 --holders 10000
+    ./kiwi.py simulate --txfee 5 --burnfee 2 --db kiwi.sqlite --initial-fees 1 1 0x...
+
+TokenSimulator reproduces the balance, supply, allowance and revert
+semantics of transfer, transferFrom, transferBatch, approve, mint, burn,
+pause, blacklist and operators, including the precomputed `1000 / fee` divisors of _packFees and
+the per-transfer rounding of _decay. Reverts raise Reverted and leave the
+state untouched. Lazy fee accrual is not modelled separately: balanceOf
+and totalSupply read the same with or without it.
+
+Balances are NumPy object arrays of Python ints, so uint256 arithmetic is
+exact. `transfers` applies many independent transfers as array operations
+when every sender can cover all of its debits in the batch, which is when
+no transfer of the batch can revert on balance; otherwise it replays the
+batch one transfer at a time.
+
+Histories come from an indexer.py database. Transfer logs carry the amount
+received, so load_history rebuilds each transfer's gross amount from its
+fee and burn logs (and, for transferBatch, from the batch totals).
+"""
+import json
+import math
+import sqlite3
+from fractions import Fraction
+
+import numpy as np
+
+ZERO_ADDRESS = "0x" + "00" * 20
+MAX_FEE = 1000
+MAX_SUPPLY = 2 ** 128 - 1
+MAX_ALLOWANCE = 2 ** 256 - 1
+INITIAL_SUPPLY = 10000000000000 * 10 ** 18
+
+# Reserved account ids
+ZERO = 0
+TOKEN = 1
+
+
+class Reverted(Exception):
+    pass
+
+
+def _require(condition, reason="Reverted."):
+    if not condition:
+        raise Reverted(reason)
+
+
+def fee_divisor(fee):
+    """
+    Divisor stored by Token._packFees, 0 when the fee is off.
+    """
+
+    return MAX_FEE // fee if fee > 0 else 0
+
+
+class TokenSimulator:
+    """
+    State of one Token deployed by `owner` with the constructor arguments.
+    Accounts are integer ids; `account` maps addresses to ids, with ZERO
+    and TOKEN reserved for the zero address and the token.
+    """
+
+    def __init__(self, txfee, burnfee, fee_address, owner, supply=INITIAL_SUPPLY, token_address=None):
+        self.ids = {ZERO_ADDRESS: ZERO}
+        if token_address is not None:
+            self.ids[token_address.lower()] = TOKEN
+        self._next_id = 2
+        self.balances = np.zeros(64, dtype=object)
+        self.blacklisted = np.zeros(64, dtype=bool)
+        self.allowances = {}
+        self.minters = set()
+        self.operators = set()
+        # (holder, operator) pairs of approveOperator
+        self.operator_approvals = set()
+        self.owner = self.account(owner)
+        self.paused = False
+        self.total_supply = supply
+        self.balances[self.owner] = supply
+        self.fees_paid = 0
+        self.burned = 0
+        self._set_fees(txfee, burnfee, self.account(fee_address))
+
+    def account(self, address):
+        """
+        Id of an address, allocated on first use.
+        """
+
+        address = address.lower()
+        if address not in self.ids:
+            self.ids[address] = self._next_id
+            self._next_id += 1
+        self._grow(self.ids[address])
+        return self.ids[address]
+
+    def new_accounts(self, count):
+        """
+        Ids of count accounts without addresses, for synthetic workloads.
+        """
+
+        first = self._next_id
+        self._next_id += count
+        self._grow(self._next_id - 1)
+        return np.arange(first, first + count)
+
+    def _grow(self, account_id):
+        size = len(self.balances)
+        if account_id < size:
+            return
+        while size <= account_id:
+            size *= 2
+        balances = np.zeros(size, dtype=object)
+        balances[:len(self.balances)] = self.balances
+        blacklisted = np.zeros(size, dtype=bool)
+        blacklisted[:len(self.blacklisted)] = self.blacklisted
+        self.balances, self.blacklisted = balances, blacklisted
+
+    def _set_fees(self, txfee, burnfee, fee_account):
+        _require(txfee <= MAX_FEE and burnfee <= MAX_FEE, "Fees cannot exceed 1000.")
+        self.txfee, self.burnfee, self.fee_account = txfee, burnfee, fee_account
+        self.tx_divisor, self.burn_divisor = fee_divisor(txfee), fee_divisor(burnfee)
+        self._grow(fee_account)
+
+    def balance_of(self, account_id):
+        return self.balances[account_id] if account_id < len(self.balances) else 0
+
+    # Owner functions
+
+    def update_fees(self, caller, txfee, burnfee, fee_account):
+        _require(caller == self.owner)
+        _require(fee_account != ZERO, "Cannot add zero address as new fee address.")
+        self._set_fees(txfee, burnfee, fee_account)
+
+    def pause(self, caller):
+        _require(caller == self.owner, "Access is denied.")
+        _require(not self.paused)
+        self.paused = True
+
+    def unpause(self, caller):
+        _require(caller == self.owner, "Access is denied.")
+        _require(self.paused)
+        self.paused = False
+
+    def blacklist(self, caller, account_id, listed):
+        _require(caller == self.owner, "Access is denied.")
+        _require(not self.paused)
+        self._grow(account_id)
+        _require(self.blacklisted[account_id] != listed)
+        self.blacklisted[account_id] = listed
+
+    def add_minter(self, caller, account_id):
+        _require(caller == self.owner)
+        _require(account_id != ZERO, "Cannot add zero address as minter.")
+        self.minters.add(account_id)
+
+    def set_operator(self, caller, account_id, enabled):
+        _require(caller == self.owner, "Access is denied.")
+        _require(account_id != ZERO, "Cannot add zero address as operator.")
+        if enabled:
+            self.operators.add(account_id)
+        else:
+            self.operators.discard(account_id)
+
+    # Token functions
+
+    def _decay(self, sender, amount):
+        """
+        (received, fee, burn) of a transfer, as Token._decay computes them.
+        """
+
+        if sender == self.fee_account:
+            return amount, 0, 0
+        fee = amount // self.tx_divisor if self.tx_divisor else 0
+        burn = amount // self.burn_divisor if self.burn_divisor else 0
+        _require(fee + burn <= amount)
+        return amount - fee - burn, fee, burn
+
+    def _move(self, sender, receiver, amount, received, fee, burn):
+        _require(self.balances[sender] >= amount)
+        self.balances[sender] -= amount
+        self.balances[receiver] += received
+        self.balances[self.fee_account] += fee
+        self.total_supply -= burn
+        self.fees_paid += fee
+        self.burned += burn
+
+    def _check_transfer(self, caller, receiver):
+        _require(not self.paused)
+        _require(not self.blacklisted[caller])
+        _require(receiver not in (ZERO, TOKEN))
+
+    def transfer(self, sender, receiver, amount):
+        self._grow(max(sender, receiver))
+        self._check_transfer(sender, receiver)
+        self._move(sender, receiver, amount, *self._decay(sender, amount))
+        return True
+
+    def transfer_from(self, spender, sender, receiver, amount):
+        self._grow(max(spender, sender, receiver))
+        self._check_transfer(spender, receiver)
+        received, fee, burn = self._decay(sender, amount)
+        if spender in self.operators and (sender, spender) in self.operator_approvals:
+            # approved operators pull without touching the allowance
+            self._move(sender, receiver, amount, received, fee, burn)
+            return True
+        allowance = self.allowances.get((sender, spender), 0)
+        # the allowance is charged the amount received, not the amount sent
+        _require(allowance >= received)
+        self._move(sender, receiver, amount, received, fee, burn)
+        if allowance != MAX_ALLOWANCE:
+            self.allowances[(sender, spender)] = allowance - received
+        return True
+
+    def transfer_batch(self, sender, receivers, amounts):
+        receivers = np.asarray(receivers, dtype=np.int64)
+        amounts = np.asarray(amounts, dtype=object)
+        _require(len(receivers) == len(amounts), "Receivers and amounts length mismatch.")
+        self._grow(max(sender, int(receivers.max(initial=0))))
+        _require(not self.paused)
+        _require(not self.blacklisted[sender])
+        total = amounts.sum()
+        _require(self.balances[sender] >= total)
+        _require(not np.isin(receivers, (ZERO, TOKEN)).any())
+
+        fees = np.zeros(len(amounts), dtype=object)
+        burns = np.zeros(len(amounts), dtype=object)
+        if sender != self.fee_account:
+            if self.tx_divisor:
+                fees = amounts // self.tx_divisor
+            if self.burn_divisor:
+                burns = amounts // self.burn_divisor
+        received = amounts - fees - burns
+        _require(not (received < 0).astype(bool).any())
+
+        self.balances[sender] -= total
+        np.add.at(self.balances, receivers, received)
+        self.balances[self.fee_account] += fees.sum()
+        self.total_supply -= burns.sum()
+        self.fees_paid += fees.sum()
+        self.burned += burns.sum()
+        return True
+
+    def transfers(self, senders, receivers, amounts):
+        """
+        Applies independent transfer() calls in order and returns which succeeded.
+        """
+
+        senders = np.asarray(senders, dtype=np.int64)
+        receivers = np.asarray(receivers, dtype=np.int64)
+        amounts = np.asarray(amounts, dtype=object)
+        if not len(senders):
+            return np.zeros(0, dtype=bool)
+        if self.paused:
+            return np.zeros(len(senders), dtype=bool)
+        self._grow(int(max(senders.max(), receivers.max())))
+
+        exempt = senders == self.fee_account
+        fees = np.zeros(len(amounts), dtype=object)
+        burns = np.zeros(len(amounts), dtype=object)
+        if self.tx_divisor:
+            fees = np.where(exempt, 0, amounts // self.tx_divisor)
+        if self.burn_divisor:
+            burns = np.where(exempt, 0, amounts // self.burn_divisor)
+        received = amounts - fees - burns
+        ok = ~self.blacklisted[senders] & (receivers != ZERO) & (receivers != TOKEN) & (received >= 0).astype(bool)
+
+        debtors, index = np.unique(senders[ok], return_inverse=True)
+        debits = np.zeros(len(debtors), dtype=object)
+        np.add.at(debits, index, amounts[ok])
+        if not (self.balances[debtors] >= debits).astype(bool).all():
+            # A sender may run dry within the batch, so order matters
+            for i in np.flatnonzero(ok):
+                try:
+                    self.transfer(int(senders[i]), int(receivers[i]), amounts[i])
+                except Reverted:
+                    ok[i] = False
+            return ok
+
+        np.subtract.at(self.balances, senders[ok], amounts[ok])
+        np.add.at(self.balances, receivers[ok], received[ok])
+        fee_total, burn_total = fees[ok].sum(), burns[ok].sum()
+        self.balances[self.fee_account] += fee_total
+        self.total_supply -= burn_total
+        self.fees_paid += fee_total
+        self.burned += burn_total
+        return ok
+
+    def approve(self, owner, spender, amount):
+        _require(not self.paused)
+        self.allowances[(owner, spender)] = amount
+        return True
+
+    def approve_operator(self, holder, operator, approved):
+        _require(operator != ZERO, "Cannot approve zero address as operator.")
+        if approved:
+            self.operator_approvals.add((holder, operator))
+        else:
+            self.operator_approvals.discard((holder, operator))
+        return True
+
+    def burn(self, sender, amount):
+        _require(not self.paused)
+        self._grow(sender)
+        _require(self.balances[sender] >= amount)
+        self.balances[sender] -= amount
+        self.total_supply -= amount
+        return True
+
+    def mint(self, caller, receiver, amount):
+        _require(caller == self.owner or caller in self.minters, "Access is denied.")
+        _require(receiver not in (ZERO, TOKEN))
+        _require(self.total_supply + amount <= MAX_SUPPLY, "Total supply cannot exceed 2**128 - 1.")
+        self._grow(receiver)
+        self.total_supply += amount
+        self.balances[receiver] += amount
+        return True
+
+    def summary(self, top=10):
+        """
+        Supply, fee income and holder distribution.
+        """
+
+        held = np.sort(self.balances[(self.balances > 0).astype(bool)].astype(float))
+        holders = len(held)
+        gini = 0.0
+        if holders and held.sum() > 0:
+            ranks = np.arange(1, holders + 1)
+            gini = float((2 * ranks - holders - 1) @ held / (holders * held.sum()))
+        return {
+            "total_supply": self.total_supply,
+            "burned": self.burned,
+            "fees_paid": self.fees_paid,
+            "fee_balance": self.balances[self.fee_account],
+            "holders": holders,
+            f"top{top}_share": float(held[-top:].sum() / held.sum()) if holders else 0.0,
+            "gini": gini,
+        }
+
+
+def random_workload(sim, holders, transfers, seed=0, balance=10 ** 24):
+    """
+    Funds `holders` new accounts from the owner and returns random transfers
+    between them of up to 1% of the starting balance each.
+    """
+
+    rng = np.random.default_rng(seed)
+    accounts = sim.new_accounts(holders)
+    for start in range(0, holders, 500):
+        batch = accounts[start:start + 500]
+        sim.transfer_batch(sim.owner, batch, [balance] * len(batch))
+    senders = rng.choice(accounts, transfers)
+    receivers = rng.choice(accounts, transfers)
+    # 10**22 does not fit int64, scale small draws up as Python ints
+    amounts = rng.integers(1, 10 ** 6, transfers).astype(object) * (balance // 10 ** 8)
+    return senders, receivers, amounts
+
+
+def invert_decay(received, tx_divisor, burn_divisor):
+    """
+    Gross amounts whose transfer leaves `received` after fees, smallest first.
+    With rate = 1 - 1/tx_divisor - 1/burn_divisor, every such amount g has
+    g * rate <= received < g * rate + 2, which bounds the search.
+    """
+
+    rate = Fraction(1) - (Fraction(1, tx_divisor) if tx_divisor else 0) - (Fraction(1, burn_divisor) if burn_divisor else 0)
+    if rate <= 0:
+        raise ValueError("Fees take the whole amount, gross amounts cannot be rebuilt.")
+
+    def net(gross):
+        return gross - (gross // tx_divisor if tx_divisor else 0) - (gross // burn_divisor if burn_divisor else 0)
+
+    first, last = max(0, math.floor((received - 2) / rate)), math.floor(received / rate)
+    return [g for g in range(first, last + 1) if net(g) == received]
+
+
+def load_history(db_path, txfee, burnfee, fee_address, token_address=None):
+    """
+    Operations replaying the Transfer, UpdateFees and Blacklist events of an
+    indexer.py database. The fees the token was deployed with are needed to
+    rebuild gross amounts until the first UpdateFees event.
+
+    Operations are tuples: ("mint", to, amount), ("burn", from, amount),
+    ("transfer", from, to, amount), ("batch", from, [to], [amount]),
+    ("fees", txfee, burnfee, fee_address) and ("blacklist", address, listed).
+    """
+
+    db = sqlite3.connect(db_path)
+    query = "SELECT tx_hash, event, args FROM events WHERE event IN ('Transfer', 'UpdateFees', 'Blacklist')"
+    if token_address is not None:
+        query += " AND lower(address) = lower(?)"
+    rows = db.execute(query + " ORDER BY block, log_index", () if token_address is None else (token_address,))
+
+    ops, legs, tx = [], [], None
+    fees = [int(txfee), int(burnfee), fee_address.lower()]
+
+    def flush():
+        ops.extend(_transfer_ops(legs, fee_divisor(fees[0]), fee_divisor(fees[1]), fees[2]))
+        legs.clear()
+
+    for tx_hash, event, args in rows:
+        args = json.loads(args)
+        if tx_hash != tx:
+            flush()
+            tx = tx_hash
+        if event == "Transfer":
+            legs.append((args["sender"].lower(), args["receiver"].lower(), int(args["amount"])))
+            continue
+        flush()
+        if event == "UpdateFees":
+            fees[:] = [int(args["txfee"]), int(args["burnfee"]), args["feeAddress"].lower()]
+            ops.append(("fees", *fees))
+        else:
+            ops.append(("blacklist", args["blackListed"].lower(), args["value"]))
+    flush()
+    return ops
+
+
+def _transfer_ops(legs, tx_divisor, burn_divisor, fee_address):
+    """
+    Groups the Transfer logs of one transaction back into token calls:
+    _decay logs [fee] [burn] received, transferBatch logs every receiver
+    first and then the batch's fee and burn totals.
+    """
+
+    ops, i = [], 0
+    while i < len(legs):
+        sender, receiver, amount = legs[i]
+        if sender == ZERO_ADDRESS:
+            ops.append(("mint", receiver, amount))
+            i += 1
+            continue
+
+        # Batch first: a batch's leading legs can look like transfers whose fees round to zero
+        matched = _match_batch(legs, i, tx_divisor, burn_divisor, fee_address)
+        matched = matched or _match_transfer(legs, i, tx_divisor, burn_divisor, fee_address)
+        if matched:
+            ops.append(matched[0])
+            i = matched[1]
+        elif receiver == ZERO_ADDRESS:
+            ops.append(("burn", sender, amount))
+            i += 1
+        else:
+            raise ValueError(f"Cannot rebuild the transfer of log {legs[i]}.")
+    return ops
+
+
+def _match_transfer(legs, i, tx_divisor, burn_divisor, fee_address):
+    sender = legs[i][0]
+    exempt = sender == fee_address
+    fee = burn = 0
+    j = i
+    if not exempt and tx_divisor and j < len(legs) - 1 and legs[j][:2] == (sender, fee_address):
+        fee = legs[j][2]
+        j += 1
+    if not exempt and burn_divisor and j < len(legs) - 1 and legs[j][:2] == (sender, ZERO_ADDRESS):
+        burn = legs[j][2]
+        j += 1
+    if j >= len(legs) or legs[j][0] != sender or legs[j][1] == ZERO_ADDRESS:
+        return None
+
+    gross = legs[j][2] + fee + burn
+    if not exempt:
+        expected_fee = gross // tx_divisor if tx_divisor else 0
+        expected_burn = gross // burn_divisor if burn_divisor else 0
+        if (expected_fee, expected_burn) != (fee, burn):
+            return None
+    return ("transfer", sender, legs[j][1], gross), j + 1
+
+
+def _match_batch(legs, i, tx_divisor, burn_divisor, fee_address):
+    sender = legs[i][0]
+    j = i
+    while j < len(legs) and legs[j][0] == sender and legs[j][1] not in (ZERO_ADDRESS, fee_address):
+        j += 1
+    receivers = [leg[1] for leg in legs[i:j]]
+    received = [leg[2] for leg in legs[i:j]]
+    if not receivers:
+        return None
+
+    fee_total = burn_total = 0
+    if sender != fee_address:
+        if tx_divisor and j < len(legs) and legs[j][:2] == (sender, fee_address):
+            fee_total = legs[j][2]
+            j += 1
+        if burn_divisor and j < len(legs) and legs[j][:2] == (sender, ZERO_ADDRESS):
+            burn_total = legs[j][2]
+            j += 1
+        candidates = [invert_decay(r, tx_divisor, burn_divisor) for r in received]
+    else:
+        candidates = [[r] for r in received]
+    if not all(candidates):
+        return None
+
+    # A received amount has several gross amounts around a fee or burn
+    # rounding step; pick the ones that add up to the logged totals.
+    def split(gross):
+        return (gross // tx_divisor if tx_divisor else 0), (gross // burn_divisor if burn_divisor else 0)
+
+    amounts = [c[0] for c in candidates]
+    missing_fee = fee_total - sum(split(a)[0] for a in amounts)
+    missing_burn = burn_total - sum(split(a)[1] for a in amounts)
+    for k, options in enumerate(candidates):
+        fee, burn = split(options[0])
+        for option in reversed(options[1:]):
+            extra_fee, extra_burn = split(option)[0] - fee, split(option)[1] - burn
+            if extra_fee <= missing_fee and extra_burn <= missing_burn:
+                amounts[k] = option
+                missing_fee, missing_burn = missing_fee - extra_fee, missing_burn - extra_burn
+                break
+    if missing_fee or missing_burn:
+        return None
+    if len(receivers) == 1:
+        return ("transfer", sender, receivers[0], amounts[0]), j
+    return ("batch", sender, receivers, amounts), j
+
+
+def replay(sim, ops, fees=None, chunk=100_000):
+    """
+    Applies history operations to sim and returns the number that reverted.
+    With fees=(txfee, burnfee) those rates replace the historic ones, while
+    fee address changes still apply. Runs of transfers go through
+    `transfers` in chunks.
+    """
+
+    failed = 0
+    pending = []
+
+    def flush():
+        nonlocal failed
+        for start in range(0, len(pending), chunk):
+            senders, receivers, amounts = zip(*pending[start:start + chunk])
+            failed += int((~sim.transfers(senders, receivers, np.array(amounts, dtype=object))).sum())
+        pending.clear()
+
+    for op in ops:
+        if op[0] == "transfer":
+            pending.append((sim.account(op[1]), sim.account(op[2]), op[3]))
+            continue
+        flush()
+        try:
+            if op[0] == "mint":
+                sim.mint(sim.owner, sim.account(op[1]), op[2])
+            elif op[0] == "burn":
+                sim.burn(sim.account(op[1]), op[2])
+            elif op[0] == "batch":
+                sim.transfer_batch(sim.account(op[1]), [sim.account(r) for r in op[2]], op[3])
+            elif op[0] == "fees":
+                txfee, burnfee = fees or op[1:3]
+                sim._set_fees(txfee, burnfee, sim.account(op[3]))
+            elif op[0] == "blacklist":
+                account_id = sim.account(op[1])
+                sim.blacklisted[account_id] = op[2]
+        except Reverted:
+            failed += 1
+    flush()
+    return failed
+
+
+def simulate_history(db_path, initial_fees, fees=None, token_address=None):
+    """
+    Replays an indexed history, with its own fees or with fees=(txfee, burnfee)
+    from the first transfer on. Returns the simulator and the reverted count.
+    """
+
+    txfee, burnfee, fee_address = initial_fees
+    if fees:
+        txfee, burnfee = fees
+    ops = load_history(db_path, *initial_fees, token_address=token_address)
+    # The deployment is replayed as a mint, and mints in a history need no access check
+    sim = TokenSimulator(txfee, burnfee, fee_address, ZERO_ADDRESS, supply=0, token_address=token_address)
+    return sim, replay(sim, ops, fees)
+
+
+def simulate_workload(txfee, burnfee, holders, transfers, seed=0, chunk=1_000_000):
+    """
+    Runs a random workload from a fresh deployment. Returns the simulator and the reverted count.
+    """
+
+    sim = TokenSimulator(txfee, burnfee, "0x" + "fe" * 20, "0x" + "01" * 20)
+    senders, receivers, amounts = random_workload(sim, holders, transfers, seed)
+    failed = 0
+    for start in range(0, transfers, chunk):
+        end = start + chunk
+        failed += int((~sim.transfers(senders[start:end], receivers[start:end], amounts[start:end])).sum())
+    return sim, failed
@@ -1,12 +1,110 @@
+import json
+from pathlib import Path
+
 import pytest
 from ape import Contract
+from ape.exceptions import ContractLogicError
 from eip712.messages import EIP712Message
 
+GAS_BASELINE = Path(__file__).parent / "gas_baseline.json"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-gas-baseline",
+        action="store_true",
+        help="Record the gas used by tests/test_gas.py as the new committed baseline.",
+    )
+    parser.addoption(
+        "--gas-threshold",
+        action="store",
+        type=float,
+        default=None,
+        help="Allowed gas increase over the baseline for every function, as a fraction.",
+    )
+    parser.addoption(
+        "--evm",
+        action="store_true",
+        help="Run the tests marked evm on the in-process EVM of evm.py instead of the ape provider.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "evm: runs unchanged on the in-process EVM with --evm")
+
+
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption("--evm"):
+        return
+    skip = pytest.mark.skip(reason="Needs the ape provider, not supported by --evm.")
+    for item in items:
+        if "evm" not in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def evm(request):
+    """
+    The in-process EVM when running with --evm, else None.
+    """
+    if not request.config.getoption("--evm"):
+        return None
+
+    from evm import EVM
+
+    return EVM(error=ContractLogicError)
+
+
+# With --evm the ape fixtures of the same names are swapped for the in-process EVM
+@pytest.fixture(scope="session")
+def chain(evm, chain):
+    return evm.chain if evm else chain
+
+
+@pytest.fixture(scope="session")
+def accounts(evm, accounts):
+    return evm.accounts if evm else accounts
+
+
+@pytest.fixture(scope="session")
+def project(evm, project):
+    return evm.project if evm else project
+
+
+@pytest.fixture(autouse=True)
+def evm_isolation(evm):
+    """
+    Reverts the in-process EVM after every test, like ape's isolation does for its provider.
+    """
+    if not evm:
+        yield
+        return
+
+    snapshot = evm.snapshot()
+    yield
+    evm.revert(snapshot)
+
+
+@pytest.fixture(scope="session")
+def gas_baseline(request):
+    """
+    Committed gas baseline. Rewritten at the end of the session
+    when running with --update-gas-baseline.
+    """
+    baseline = json.loads(GAS_BASELINE.read_text())
+    recorded = {}
+
+    yield baseline, recorded
+
+    if request.config.getoption("--update-gas-baseline") and recorded:
+        baseline["gas"] = dict(sorted({**baseline["gas"], **recorded}.items()))
+        GAS_BASELINE.write_text(json.dumps(baseline, indent=2) + "\n")
+
 
 @pytest.fixture(scope="session")
 def Permit(chain, token):
     class Permit(EIP712Message):
-        _name_: "string" = "KIWI"
+        _name_: "string" = "KIWINATIVE"
         _version_: "string" = "1.0"
         _chainId_: "uint256" = chain.chain_id
         _verifyingContract_: "address" = token.address
@@ -50,4 +148,19 @@ def roulette(wallet, project, token):
 
 @pytest.fixture(scope="session")
 def sport(wallet, project, token):
-    return wallet.deploy(project.Sport, token.address)
\ No newline at end of file
+    return wallet.deploy(project.Sport, token.address)
+
+@pytest.fixture(scope="session")
+def blueprints(owner, project):
+    from deploy import blueprint_deploy
+
+    addresses = []
+    for contract in (project.Token, project.Crowdsale):
+        code = blueprint_deploy(contract.contract_type.deployment_bytecode.bytecode)
+        txn = owner.provider.network.ecosystem.create_transaction(data=code, sender=owner.address)
+        addresses.append(owner.call(txn).contract_address)
+    return addresses
+
+@pytest.fixture(scope="session")
+def factory(owner, project, blueprints):
+    return owner.deploy(project.Factory, *blueprints)
@@ -0,0 +1,72 @@
+import os
+
+import ape
+import pytest
+
+from airdrop import ProofFile, build_tree, verify, write_tree
+
+AMOUNT = 10 ** 18
+
+
+@pytest.mark.parametrize("count", [1, 2, 7, 64, 1001])
+def test_tree_proofs(tmp_path, count):
+    """
+    Every leaf of the written tree verifies against its root, odd levels included.
+    """
+    accounts = [os.urandom(20) for _ in range(count)]
+    amounts = [AMOUNT + i for i in range(count)]
+    root = write_tree(tmp_path / "airdrop.bin", accounts, amounts)
+    assert root == build_tree(accounts, amounts)[-1][0].tobytes()
+
+    tree = ProofFile(tmp_path / "airdrop.bin")
+    assert (tree.count, tree.root) == (count, root)
+    for index in {0, count // 2, count - 1}:
+        claim = tree.claim("0x" + accounts[index].hex())
+        assert claim["index"] == index
+        assert claim["amount"] == amounts[index]
+        proof = [bytes.fromhex(p[2:]) for p in claim["proof"]]
+        assert verify(root, index, claim["account"], claim["amount"], proof)
+        assert not verify(root, index, claim["account"], claim["amount"] + 1, proof)
+    assert tree.find("0x" + "00" * 20) is None
+
+
+def test_claim(project, token, owner, feeaddress, accounts, tmp_path_factory):
+    """
+    Claims pay through Token.transfer once per leaf and only for valid proofs.
+    """
+    # Not tmp_path: a function scoped fixture makes ape snapshot before the session token is deployed
+    path = tmp_path_factory.mktemp("airdrop") / "airdrop.bin"
+    recipients = [account.address for account in accounts[3:8]]
+    amounts = [AMOUNT * (i + 1) for i in range(len(recipients))]
+    root = write_tree(path, [bytes.fromhex(r[2:]) for r in recipients], amounts)
+    tree = ProofFile(path)
+
+    distributor = owner.deploy(project.MerkleDistributor, token, root)
+    token.transfer(distributor, 100 * AMOUNT, sender=owner)
+
+    claim = tree.claim(recipients[1])
+    before = token.balanceOf(recipients[1])
+    fee_before = token.balanceOf(feeaddress)
+
+    with ape.reverts("Invalid proof."):
+        distributor.claim(claim["index"], claim["account"], claim["amount"] + 1, claim["proof"], sender=accounts[9])
+
+    tx = distributor.claim(claim["index"], claim["account"], claim["amount"], claim["proof"], sender=accounts[9])
+    fee = claim["amount"] // 1000
+    assert token.balanceOf(recipients[1]) == before + claim["amount"] - 2 * fee
+    assert token.balanceOf(feeaddress) == fee_before + fee
+    assert distributor.isClaimed(claim["index"])
+    assert not distributor.isClaimed(0)
+    assert [log.amount for log in tx.decode_logs(distributor.Claimed)] == [claim["amount"]]
+
+    with ape.reverts("Already claimed."):
+        distributor.claim(claim["index"], claim["account"], claim["amount"], claim["proof"], sender=accounts[9])
+
+    token.blacklist(recipients[2], True, sender=owner)
+    claim = tree.claim(recipients[2])
+    with ape.reverts("Account is blacklisted."):
+        distributor.claim(claim["index"], claim["account"], claim["amount"], claim["proof"], sender=accounts[9])
+
+    with ape.reverts("Access is denied."):
+        distributor.withdraw(AMOUNT, sender=accounts[9])
+    distributor.withdraw(AMOUNT, sender=owner)
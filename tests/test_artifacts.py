@@ -0,0 +1,54 @@
+import json
+import shutil
+from pathlib import Path
+
+from artifacts import ArtifactCache
+
+CONTRACTS = Path(__file__).parent.parent / "contracts"
+
+
+def _cache(tmp_path):
+    contracts = tmp_path / "contracts"
+    shutil.copytree(CONTRACTS, contracts)
+    return ArtifactCache(contracts, tmp_path / "cache"), contracts
+
+
+def test_artifact_cache(tmp_path):
+    """
+    Contracts compile once and load from the cache until a source changes.
+    """
+    cache, contracts = _cache(tmp_path)
+    token = cache.load("Token")
+    assert cache.compiled == ["Token"]
+    assert token["deploymentBytecode"]["bytecode"].startswith("0x")
+    assert any(item.get("name") == "transferBatch" for item in token["abi"])
+
+    cache = ArtifactCache(contracts, tmp_path / "cache")
+    assert cache.load("Token") == token
+    assert cache.compiled == []
+
+    # vyper 0.3.7 may order code differently when ape compiles all sources in one
+    # process, so only the interface and code size are compared with ape's build
+    build = Path(__file__).parent.parent / ".build" / "Token.json"
+    if build.exists():
+        ape_build = json.loads(build.read_text())
+        assert [item.get("name") for item in token["abi"]] == [item.get("name") for item in ape_build["abi"]]
+        assert len(token["deploymentBytecode"]["bytecode"]) == len(ape_build["deploymentBytecode"]["bytecode"])
+
+
+def test_artifact_cache_key(tmp_path):
+    """
+    The key covers a contract's own source and the sources it imports.
+    """
+    cache, contracts = _cache(tmp_path)
+    token, crowdsale = cache.key("Token"), cache.key("Crowdsale")
+    assert cache.contracts() == ["BatchReader", "Crowdsale", "Factory", "MerkleDistributor", "Sport", "Token"]
+
+    (contracts / "Crowdsale.vy").write_text((contracts / "Crowdsale.vy").read_text() + "\n")
+    assert cache.key("Token") == token
+    assert cache.key("Crowdsale") != crowdsale
+
+    crowdsale = cache.key("Crowdsale")
+    (contracts / "Token.vy").write_text((contracts / "Token.vy").read_text() + "\n")
+    assert cache.key("Token") != token
+    assert cache.key("Crowdsale") != crowdsale
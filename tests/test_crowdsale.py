@@ -2,6 +2,8 @@ import ape
 import pytest
 from ape.exceptions import ContractError
 
+pytestmark = pytest.mark.evm
+
 # Standard test comes from the interpretation of EIP-20
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
@@ -87,6 +89,115 @@ def test_buyTokens(token, crowdSale, owner, accounts, wallet, chain, Permit):
     assert logs[0].amount == 100
 
 
+def test_inventory_mode(token, crowdSale, owner, accounts, wallet):
+    """
+    Test inventory mode.
+    Purchases are served from tokens deposited in the crowd sale
+    instead of the token owner's allowance.
+    """
+
+    wallet_balance = wallet.balance
+    signer, stranger = accounts[6:8]
+
+    with ape.reverts():
+        crowdSale.setInventoryMode(True, sender=stranger)
+
+    tx = crowdSale.setInventoryMode(True, sender=owner)
+    assert crowdSale.inventoryMode() == True
+
+    logs = list(tx.decode_logs(crowdSale.UpdateInventoryMode))
+    assert len(logs) == 1
+    assert logs[0].enabled == True
+
+    token.approve(crowdSale.address, 100000, sender=owner)
+    crowdSale.depositInventory(100000, sender=owner)
+
+    assert crowdSale.inventory() == 100000 - 2 * 100
+
+    tx = crowdSale.buyTokens(signer, sender=signer, value=100)
+    signer.transfer(crowdSale, 100)
+
+    assert crowdSale.weiRaised() == 200
+    assert wallet.balance == wallet_balance + 200
+    assert token.balanceOf(signer) == 200
+    assert crowdSale.inventory() == 100000 - 2 * 100 - 200
+
+    logs = list(tx.decode_logs(crowdSale.TokenPurchase))
+    assert len(logs) == 1
+    assert logs[0].purchaser == signer
+    assert logs[0].beneficiary == signer
+    assert logs[0].value == 100
+    assert logs[0].amount == 100
+
+    with ape.reverts():
+        crowdSale.withdrawInventory(100, sender=stranger)
+
+    crowdSale.withdrawInventory(crowdSale.inventory(), sender=owner)
+    assert crowdSale.inventory() == 0
+
+    # Cannot sell more than the inventory holds
+    with ape.reverts():
+        crowdSale.buyTokens(signer, sender=signer, value=100)
+
+
+def test_deferred_settlement(token, crowdSale, owner, accounts, wallet):
+    """
+    Test deferred settlement.
+    Raised funds stay in the crowd sale until the threshold is reached
+    or the owner sweeps them to the wallet.
+    """
+
+    wallet_balance = wallet.balance
+    signer, stranger = accounts[6:8]
+
+    with ape.reverts():
+        crowdSale.updateSettlementThreshold(250, sender=stranger)
+
+    tx = crowdSale.updateSettlementThreshold(250, sender=owner)
+    assert crowdSale.settlementThreshold() == 250
+
+    logs = list(tx.decode_logs(crowdSale.UpdateSettlementThreshold))
+    assert len(logs) == 1
+    assert logs[0].threshold == 250
+
+    token.approve(crowdSale.address, 100000, sender=owner)
+
+    crowdSale.buyTokens(signer, sender=signer, value=100)
+    signer.transfer(crowdSale, 100)
+
+    assert crowdSale.weiRaised() == 200
+    assert crowdSale.balance == 200
+    assert wallet.balance == wallet_balance
+    assert token.balanceOf(signer) == 200
+
+    # Reaching the threshold sweeps everything held to the wallet
+    tx = crowdSale.buyTokens(signer, sender=signer, value=100)
+
+    assert crowdSale.balance == 0
+    assert wallet.balance == wallet_balance + 300
+
+    logs = list(tx.decode_logs(crowdSale.TokenPurchase))
+    assert len(logs) == 1
+    assert logs[0].value == 100
+    assert logs[0].amount == 100
+
+    logs = list(tx.decode_logs(crowdSale.Sweep))
+    assert len(logs) == 1
+    assert logs[0].wallet == wallet
+    assert logs[0].value == 300
+
+    crowdSale.buyTokens(signer, sender=signer, value=100)
+    assert crowdSale.balance == 100
+
+    with ape.reverts():
+        crowdSale.sweep(sender=stranger)
+
+    crowdSale.sweep(sender=owner)
+    assert crowdSale.balance == 0
+    assert wallet.balance == wallet_balance + 400
+    assert crowdSale.weiRaised() == 400
+
+
 def test_update_rate(crowdSale, owner, wallet):
     """
     Test update rate function.
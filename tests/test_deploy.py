@@ -0,0 +1,153 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from eth_account import Account
+from web3 import AsyncWeb3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from deploy import Deployer, Journal, Step, contract_address, encode_call, launch_addresses, load_artifact, plan_waves
+
+PLAN = Path(__file__).parent.parent / "deploy-plan.json"
+FACTORY_PLAN = Path(__file__).parent.parent / "factory-plan.json"
+DEPLOYER_KEY = "0x" + "00" * 31 + "01"
+
+
+def test_plan_waves():
+    """
+    Deployments share the first wave, calls wait for their target.
+    """
+    steps = [Step(spec) for spec in json.loads(PLAN.read_text())["steps"]]
+
+    waves = plan_waves(steps)
+    assert [[step.id for step in wave] for wave in waves] == [
+        ["token", "crowdsale", "reader"],
+        ["approve", "minter", "fees"],
+    ]
+
+
+def test_deploy_plan(project, tmp_path):
+    """
+    Deploy the plan on a fresh chain, resuming from the journal after
+    the broadcast of the second transaction failed.
+    """
+    project.load_contracts()
+    steps = [Step(spec) for spec in json.loads(PLAN.read_text())["steps"]]
+    account = Account.from_key(DEPLOYER_KEY)
+    journal_path = tmp_path / "journal.json"
+
+    async def run():
+        w3 = AsyncWeb3(AsyncEthereumTesterProvider())
+        chain_id = await w3.eth.chain_id
+
+        send = w3.eth.send_raw_transaction
+        sent = []
+
+        async def failing_send(raw):
+            sent.append(raw)
+            if len(sent) == 2:
+                raise ConnectionError("node went away")
+            return await send(raw)
+
+        w3.eth.send_raw_transaction = failing_send
+        try:
+            await Deployer(w3, account, steps, Journal(journal_path, account.address, chain_id)).run(log=lambda _: None)
+        except ConnectionError:
+            pass
+
+        journal = Journal(journal_path, account.address, chain_id)
+        # Both transactions were journaled before broadcast, only the first reached the node
+        assert set(journal.steps) == {"token", "crowdsale"}
+        assert [entry["nonce"] for entry in journal.steps.values()] == [0, 1]
+        assert all("status" not in entry for entry in journal.steps.values())
+
+        w3.eth.send_raw_transaction = send
+        results = await Deployer(w3, account, steps, journal).run(log=lambda _: None)
+
+        token = w3.eth.contract(address=results["token"]["address"], abi=load_artifact("Token")[0])
+        allowance = await token.functions.allowance(account.address, results["crowdsale"]["address"]).call()
+        return results, allowance
+
+    results, allowance = asyncio.run(run())
+
+    assert [entry["nonce"] for entry in results.values()] == [0, 1, 2, 3, 4, 5]
+    assert all(entry["status"] == "confirmed" for entry in results.values())
+    assert results["crowdsale"]["address"] == contract_address(account.address, 1)
+    assert allowance == 10 ** 27
+
+
+def test_deploy_failed_step(project, tmp_path):
+    """
+    A step that reverted on chain is sent again with a new nonce when the plan runs again.
+    """
+    project.load_contracts()
+    account = Account.from_key(DEPLOYER_KEY)
+    specs = [
+        {"id": "token", "deploy": "Token", "args": [1, 1, "{deployer}"]},
+        {"id": "minter", "call": "token.addMinter", "args": ["0x" + "00" * 20]},
+    ]
+
+    async def run():
+        w3 = AsyncWeb3(AsyncEthereumTesterProvider())
+        chain_id = await w3.eth.chain_id
+        journal_path = tmp_path / "journal.json"
+
+        # A fixed gas limit gets the reverting call past estimation and mined
+        async def estimate(tx):
+            return 10_000_000
+
+        deployer = Deployer(w3, account, [Step(spec) for spec in specs], Journal(journal_path, account.address, chain_id))
+        deployer._estimate = estimate
+        with pytest.raises(RuntimeError, match="reverted"):
+            await deployer.run(log=lambda _: None)
+        assert Journal(journal_path, account.address, chain_id).steps["minter"]["status"] == "failed"
+
+        specs[1]["args"] = ["0x" + "33" * 20]
+        journal = Journal(journal_path, account.address, chain_id)
+        return await Deployer(w3, account, [Step(spec) for spec in specs], journal).run(log=lambda _: None)
+
+    results = asyncio.run(run())
+    assert [entry["nonce"] for entry in results.values()] == [0, 2]
+    assert all(entry["status"] == "confirmed" for entry in results.values())
+
+
+def test_factory_plan(project, tmp_path):
+    """
+    Deploy the blueprints and the factory in one wave, then launch at the predicted addresses.
+    """
+    project.load_contracts()
+    steps = [Step(spec) for spec in json.loads(FACTORY_PLAN.read_text())["steps"]]
+    assert len(plan_waves(steps)) == 1
+    account = Account.from_key(DEPLOYER_KEY)
+    wallet = "0x" + "22" * 20
+    salt = b"\x07" * 32
+
+    async def run():
+        w3 = AsyncWeb3(AsyncEthereumTesterProvider())
+        chain_id = await w3.eth.chain_id
+        journal = Journal(tmp_path / "journal.json", account.address, chain_id)
+        results = await Deployer(w3, account, steps, journal).run(log=lambda _: None)
+
+        factory = results["factory"]["address"]
+        codes = [(await w3.eth.get_code(results[step]["address"]))[3:] for step in ("token_blueprint", "crowdsale_blueprint")]
+        expected = launch_addresses(factory, account.address, salt, *codes, wallet, 5)
+
+        data = encode_call(load_artifact("Factory")[0], "launch", [salt, 1, 1, wallet, wallet, 5, 10 ** 24])
+        tx = {
+            "to": factory,
+            "data": data,
+            "nonce": await w3.eth.get_transaction_count(account.address),
+            "gas": 5_000_000,
+            "gasPrice": await w3.eth.gas_price,
+            "chainId": chain_id,
+        }
+        tx_hash = await w3.eth.send_raw_transaction(account.sign_transaction(tx).rawTransaction)
+        assert (await w3.eth.wait_for_transaction_receipt(tx_hash))["status"] == 1
+
+        crowdsale = w3.eth.contract(address=expected[1], abi=load_artifact("Crowdsale")[0])
+        return expected, await crowdsale.functions.kiwinativeToken().call(), await crowdsale.functions.owner().call()
+
+    (token, _), crowdsale_token, owner = asyncio.run(run())
+    assert crowdsale_token == token
+    assert owner == account.address
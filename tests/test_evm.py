@@ -0,0 +1,39 @@
+import pytest
+
+from evm import EVM, Reverted, benchmark
+
+pytestmark = pytest.mark.evm
+
+
+def test_evm():
+    """
+    Transactions mine a block each, failures and reverted snapshots leave no trace.
+    """
+    evm = EVM(accounts=3)
+    owner, receiver, feeaddress = evm.accounts
+    token = owner.deploy(evm.project.Token, 1, 1, feeaddress)
+    supply = token.totalSupply()
+    head = evm.chain.blocks.head.number
+
+    snapshot = evm.snapshot()
+    receipt = token.transfer(receiver, 1000, sender=owner)
+    assert receipt.block_number == head + 1 == evm.chain.blocks.head.number
+    assert receipt.return_value is True
+    logs = receipt.decode_logs(token.Transfer)
+    assert {log.sender for log in logs} == {owner.address}
+    assert sorted(log.amount for log in logs) == [1, 1, 998]
+    assert token.balanceOf(receiver) == 998
+    assert 0 < receipt.gas_used < 100_000
+
+    with pytest.raises(Reverted, match="Access is denied."):
+        token.mint(receiver, 1, sender=receiver)
+    assert evm.chain.blocks.head.number == head + 1
+
+    evm.revert(snapshot)
+    assert token.balanceOf(receiver) == 0
+    assert token.totalSupply() == supply
+    assert evm.chain.blocks.head.number == head
+
+
+def test_benchmark():
+    assert benchmark(20)["transactions"] == 20
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from eth_utils import to_checksum_address
+
+from artifacts import ArtifactCache
+from export import LogExporter, amount, decode_logs, read_events, synthetic_transfers
+from indexer import CROWDSALE_EVENTS, TOKEN_EVENTS, EventDecoder
+from rpc import connect
+from tests.test_rpc import Node
+
+AMOUNT = 10 ** 18
+
+
+def _export(chain, out_dir, token, crowdSale):
+    async def run():
+        async with Node(chain) as node:
+            w3 = connect(node.url)
+            try:
+                exporter = LogExporter(w3, out_dir, token.address, crowdSale.address, bucket=5, chunk=4, concurrency=2)
+                return await exporter.run(log=lambda _: None)
+            finally:
+                await w3.provider.close()
+
+    return asyncio.run(run())
+
+
+def _expected(chain, contract, name, events):
+    # The per-log decoding of the indexer
+    decoder = EventDecoder(ArtifactCache().load(name)["abi"], events)
+    logs = chain.provider.web3.eth.get_logs({"fromBlock": 0, "toBlock": "latest", "address": contract.address})
+    return [(log["blockNumber"], log["logIndex"], decoded) for log in logs if (decoded := decoder.decode(log))]
+
+
+def _addresses(table, column):
+    return [to_checksum_address(value) for value in table[column].to_pylist()]
+
+
+def test_export(chain, token, crowdSale, owner, receiver, accounts, tmp_path_factory):
+    """
+    The Parquet export matches the per-log decoding and later runs append only new blocks.
+    """
+    out_dir = tmp_path_factory.mktemp("logs")
+    buyer = accounts[6]
+    token.transfer(receiver, 100 * AMOUNT, sender=owner)
+    token.transferBatch([receiver, accounts[7]], [AMOUNT, 2 * AMOUNT], sender=owner)
+    token.approve(crowdSale.address, 1000 * AMOUNT, sender=owner)
+    crowdSale.buyTokens(buyer, sender=buyer, value=100)
+
+    _export(chain, out_dir, token, crowdSale)
+    head = chain.blocks.head.number
+    files = set(out_dir.glob("*/bucket=*/*.parquet"))
+    assert len({path.parent for path in files}) > 1
+
+    token.transfer(accounts[7], 3 * AMOUNT, sender=receiver)
+    crowdSale.buyTokens(receiver, sender=buyer, value=7)
+    # A file of a run that stopped before its checkpoint is dropped, not duplicated
+    stale = out_dir / "Transfer" / "bucket=0" / f"part-{head + 1:012d}-{head + 1:012d}.parquet"
+    stale.parent.mkdir(parents=True, exist_ok=True)
+    stale.write_bytes(b"")
+
+    assert _export(chain, out_dir, token, crowdSale) >= 2
+    assert not stale.exists()
+    assert files < set(out_dir.glob("*/bucket=*/*.parquet"))
+    assert _export(chain, out_dir, token, crowdSale) == 0
+
+    transfers = read_events(out_dir, "Transfer")
+    expected = _expected(chain, token, "Token", TOKEN_EVENTS)
+    expected = [(block, index, args) for block, index, (name, args) in expected if name == "Transfer"]
+    assert transfers["block"].to_pylist() == [block for block, _, _ in expected]
+    assert transfers["log_index"].to_pylist() == [index for _, index, _ in expected]
+    assert _addresses(transfers, "sender") == [args["sender"] for _, _, args in expected]
+    assert _addresses(transfers, "receiver") == [args["receiver"] for _, _, args in expected]
+    assert amount(transfers, "amount") == [args["amount"] for _, _, args in expected]
+
+    purchases = read_events(out_dir, "TokenPurchase")
+    expected = [args for _, _, (_, args) in _expected(chain, crowdSale, "Crowdsale", CROWDSALE_EVENTS)]
+    assert _addresses(purchases, "beneficiary") == [args["beneficiary"] for args in expected]
+    assert amount(purchases, "value") == [args["value"] for args in expected]
+    assert amount(purchases, "amount") == [args["amount"] for args in expected]
+
+
+def test_decode_logs():
+    logs = synthetic_transfers(250, holders=20)
+    table = decode_logs("Transfer", logs)
+    assert table.num_rows == 250
+    assert table["tx_hash"].to_pylist()[3].hex() == logs[3]["transactionHash"][2:]
+    assert amount(table, "amount") == [int(log["data"], 16) for log in logs]
+
+    logs[0]["data"] = "0x" + "01" + "00" * 31
+    with pytest.raises(ValueError, match="2\\*\\*128"):
+        decode_logs("Transfer", logs)
@@ -0,0 +1,71 @@
+import ape
+import pytest
+from eth_utils import keccak
+
+from deploy import blueprint_deploy, launch_addresses
+
+AMOUNT = 10 ** 18
+SUPPLY = 10000000000000 * 10 ** 18
+
+
+def test_blueprints(project, blueprints, factory):
+    """
+    Blueprints hold the ERC-5202 preamble and the deployment code, and cannot be called.
+    """
+    assert [factory.tokenBlueprint(), factory.crowdsaleBlueprint()] == blueprints
+    code = bytes(ape.chain.provider.get_code(blueprints[0]))
+    assert code[:3] == b"\xfe\x71\x00"
+    assert code[3:] == bytes(project.Token.contract_type.deployment_bytecode.to_bytes())
+    assert blueprint_deploy("0x" + code[3:].hex()).endswith(code)
+
+
+def _launch_addresses(factory, owner, salt, wallet, rate):
+    codes = [bytes(ape.chain.provider.get_code(blueprint))[3:] for blueprint in (factory.tokenBlueprint(), factory.crowdsaleBlueprint())]
+    return launch_addresses(factory.address, owner.address, salt, *codes, wallet.address, rate)
+
+
+def test_launch(project, factory, receiver, feeaddress, wallet, accounts):
+    """
+    One transaction deploys a configured Token and Crowdsale at the predicted addresses.
+    """
+    partner, buyer = receiver, accounts[6]
+    salt = keccak(text="partner-1")
+    token_address, crowdsale_address = _launch_addresses(factory, partner, salt, wallet, 3)
+    assert factory.launchSalt(partner, salt) == keccak(b"\x00" * 12 + bytes.fromhex(partner.address[2:]) + salt)
+
+    receipt = factory.launch(salt, 10, 5, feeaddress, wallet, 3, 1000 * AMOUNT, sender=partner)
+    launched = receipt.decode_logs(factory.Launched)[0]
+    assert (launched.owner, launched.token, launched.crowdsale) == (partner, token_address, crowdsale_address)
+
+    token = project.Token.at(token_address)
+    crowdsale = project.Crowdsale.at(crowdsale_address)
+    assert token.owner() == partner and crowdsale.owner() == partner
+    assert (token.txfee(), token.burnfee(), token.feeAddress()) == (10, 5, feeaddress)
+    assert token.balanceOf(partner) == SUPPLY - 1000 * AMOUNT
+    assert token.balanceOf(factory) == 0
+    assert crowdsale.inventoryMode() and crowdsale.inventory() == 1000 * AMOUNT
+    assert (crowdsale.kiwinativeToken(), crowdsale.wallet(), crowdsale.rate()) == (token_address, wallet, 3)
+
+    # The launch is live: purchases are served from the inventory and fees apply
+    crowdsale.buyTokens(buyer, sender=buyer, value=100)
+    assert token.balanceOf(buyer) == 300 - 300 // 100 - 300 // 200
+    token.updateFees(0, 0, feeaddress, sender=partner)
+    crowdsale.setInventoryMode(False, sender=partner)
+    with ape.reverts():
+        factory.launch(salt, 10, 5, feeaddress, wallet, 3, 0, sender=partner)
+    # The failed CREATE2 burnt the gas it was given, let the base fee settle
+    ape.chain.mine()
+
+    # The same salt from another account gives other addresses
+    other, _ = _launch_addresses(factory, buyer, salt, wallet, 3)
+    assert other != token_address
+    factory.launch(salt, 0, 0, feeaddress, wallet, 3, 0, sender=buyer)
+    token = project.Token.at(other)
+    assert token.balanceOf(buyer) == SUPPLY and not project.Crowdsale.at(crowdsale_address).inventoryMode()
+
+
+@pytest.mark.parametrize("args", [(0, 0, "0x" + "00" * 20, 3, 0), (10, 5, None, 0, 0), (1001, 5, None, 3, 0)])
+def test_launch_invalid(factory, receiver, wallet, feeaddress, args):
+    txfee, burnfee, fee_address, rate, sale = args
+    with ape.reverts():
+        factory.launch(keccak(text=str(args)), txfee, burnfee, fee_address or feeaddress, wallet, rate, sale, sender=receiver)
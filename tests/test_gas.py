@@ -0,0 +1,279 @@
+"""
+Gas benchmarks for Token, Crowdsale, Sport and Factory.
+
+Every scenario is compared against tests/gas_baseline.json and fails when it
+uses more gas than the baseline plus the per-function threshold.
+
+    ape test tests/test_gas.py                          # compare
+    ape test tests/test_gas.py --gas-threshold 0.05     # override thresholds
+    ape test tests/test_gas.py --update-gas-baseline    # record a new baseline
+"""
+import pytest
+from eth_account import Account
+from eth_utils import keccak
+
+from airdrop import build_tree
+from relayer import columns, sign_authorization
+
+AMOUNT = 10 ** 18
+
+
+def _fees_off(ctx):
+    ctx.token.updateFees(0, 0, ctx.feeaddress, sender=ctx.owner)
+
+
+def _fees(ctx, fees):
+    if fees == "off":
+        _fees_off(ctx)
+    elif fees == "lazy":
+        ctx.token.setLazyFees(True, sender=ctx.owner)
+
+
+def _transfer(fees, warm):
+    def scenario(ctx):
+        _fees(ctx, fees)
+        receiver = ctx.accounts[7]
+        if warm:
+            ctx.token.transfer(receiver, AMOUNT, sender=ctx.owner)
+        return ctx.token.transfer(receiver, AMOUNT, sender=ctx.owner)
+
+    return scenario
+
+
+def _transfer_checkpoints(warm, holder, supply=True):
+    """
+    Transfers after the owner, or only another holder, enabled balance checkpoints,
+    with or without total supply checkpoints.
+    """
+    def scenario(ctx):
+        ctx.token.enableCheckpoints(sender=ctx.owner if holder == "sender" else ctx.accounts[8])
+        if supply:
+            ctx.token.enableSupplyCheckpoints(sender=ctx.owner)
+        receiver = ctx.accounts[7]
+        if warm:
+            ctx.token.transfer(receiver, AMOUNT, sender=ctx.owner)
+        return ctx.token.transfer(receiver, AMOUNT, sender=ctx.owner)
+
+    return scenario
+
+
+def _transfer_from(fees, warm):
+    def scenario(ctx):
+        _fees(ctx, fees)
+        receiver, spender = ctx.accounts[7], ctx.accounts[3]
+        ctx.token.approve(spender, 10 * AMOUNT, sender=ctx.owner)
+        if warm:
+            ctx.token.transferFrom(ctx.owner, receiver, AMOUNT, sender=spender)
+        return ctx.token.transferFrom(ctx.owner, receiver, AMOUNT, sender=spender)
+
+    return scenario
+
+
+def _approve(ctx):
+    return ctx.token.approve(ctx.accounts[3], AMOUNT, sender=ctx.owner)
+
+
+def _permit(ctx):
+    spender = ctx.accounts[3]
+    deadline = ctx.chain.pending_timestamp + 60
+    permit = ctx.Permit(ctx.owner.address, spender.address, AMOUNT, ctx.token.nonces(ctx.owner), deadline)
+    signature = ctx.owner.sign_message(permit.signable_message).encode_rsv()
+    return ctx.token.permit(ctx.owner, spender, AMOUNT, deadline, signature, sender=spender)
+
+
+def _permit_and_transfer_from(ctx):
+    spender, receiver = ctx.accounts[3], ctx.accounts[7]
+    deadline = ctx.chain.pending_timestamp + 60
+    permit = ctx.Permit(ctx.owner.address, spender.address, AMOUNT, ctx.token.nonces(ctx.owner), deadline)
+    signature = ctx.owner.sign_message(permit.signable_message).encode_rsv()
+    return ctx.token.permitAndTransferFrom(ctx.owner, receiver, AMOUNT, AMOUNT, deadline, signature, sender=spender)
+
+
+def _transfer_with_authorizations(count, batch):
+    def scenario(ctx):
+        key = keccak(text="gas authorizer")
+        ctx.token.transfer(Account.from_key(key).address, 1000 * AMOUNT, sender=ctx.owner)
+        domain, valid_before = ctx.token.DOMAIN_SEPARATOR(), ctx.chain.pending_timestamp + 3600
+        authorizations = [sign_authorization(key, domain, ctx.accounts[7].address, AMOUNT, valid_before) for _ in range(count)]
+        if not batch:
+            return ctx.token.transferWithAuthorization(*authorizations[0], sender=ctx.accounts[3])
+        return ctx.token.transferWithAuthorizations(*columns(authorizations), sender=ctx.accounts[3])
+
+    return scenario
+
+
+def _mint(ctx):
+    return ctx.token.mint(ctx.accounts[7], AMOUNT, sender=ctx.owner)
+
+
+def _burn(ctx):
+    return ctx.token.burn(AMOUNT, sender=ctx.owner)
+
+
+def _pull(ctx, spender, pull):
+    """
+    Lets spender pull from the owner: by an allowance of AMOUNT, the max allowance or as an operator the owner approved.
+    """
+    if pull == "allowance":
+        ctx.token.approve(spender, AMOUNT, sender=ctx.owner)
+    elif pull == "max-allowance":
+        ctx.token.approve(spender, 2 ** 256 - 1, sender=ctx.owner)
+    else:
+        ctx.token.setOperator(spender, True, sender=ctx.owner)
+        ctx.token.approveOperator(spender, True, sender=ctx.owner)
+
+
+def _transfer_from_pull(pull):
+    def scenario(ctx):
+        spender = ctx.accounts[3]
+        _pull(ctx, spender, pull)
+        return ctx.token.transferFrom(ctx.owner, ctx.accounts[7], AMOUNT, sender=spender)
+
+    return scenario
+
+
+def _buy_tokens(pull):
+    def scenario(ctx):
+        buyer = ctx.accounts[6]
+        _pull(ctx, ctx.crowdSale.address, pull)
+        return ctx.crowdSale.buyTokens(buyer, sender=buyer, value=100)
+
+    return scenario
+
+
+def _claim(ctx):
+    recipients = [ctx.accounts[7].address, ctx.accounts[8].address]
+    levels = build_tree([bytes.fromhex(r[2:]) for r in recipients], [AMOUNT, AMOUNT])
+    distributor = ctx.owner.deploy(ctx.project.MerkleDistributor, ctx.token, levels[-1][0].tobytes())
+    ctx.token.transfer(distributor, 10 * AMOUNT, sender=ctx.owner)
+    return distributor.claim(0, recipients[0], AMOUNT, [levels[0][1].tobytes()], sender=ctx.accounts[7])
+
+
+def _claim_fees(ctx):
+    ctx.token.setLazyFees(True, sender=ctx.owner)
+    ctx.token.transfer(ctx.accounts[7], AMOUNT, sender=ctx.owner)
+    return ctx.token.claimFees(sender=ctx.feeaddress)
+
+
+def _bets(ctx, count):
+    """
+    Opens an event with count bets from four players, alternating between two outcomes.
+    """
+    players = ctx.accounts[6:10]
+    for player in players:
+        ctx.token.transfer(player, 1000 * AMOUNT, sender=ctx.owner)
+        ctx.token.approve(ctx.sport.address, 1000 * AMOUNT, sender=player)
+    ctx.sport.createEvent(2, sender=ctx.wallet)
+    for i in range(count):
+        ctx.sport.placeBet(0, i % 2, AMOUNT, sender=players[i % len(players)])
+    return players
+
+
+def _place_bet(ctx):
+    players = _bets(ctx, 1)
+    return ctx.sport.placeBet(0, 0, AMOUNT, sender=players[1])
+
+
+def _resolve_bets(count):
+    def scenario(ctx):
+        _bets(ctx, count)
+        return ctx.sport.resolveBets(0, 0, sender=ctx.wallet)
+
+    return scenario
+
+
+def _launch(ctx):
+    return ctx.factory.launch(b"\x01" * 32, 1, 1, ctx.feeaddress, ctx.wallet, 1, 1000 * AMOUNT, sender=ctx.accounts[6])
+
+
+def _fallback(ctx):
+    buyer = ctx.accounts[6]
+    ctx.token.approve(ctx.crowdSale.address, AMOUNT, sender=ctx.owner)
+    return buyer.transfer(ctx.crowdSale, 100)
+
+
+# The function name before "[" selects the threshold in the baseline file.
+SCENARIOS = {
+    "transfer[fees-on,cold]": _transfer(fees="on", warm=False),
+    "transfer[fees-on,warm]": _transfer(fees="on", warm=True),
+    "transfer[fees-off,cold]": _transfer(fees="off", warm=False),
+    "transfer[fees-off,warm]": _transfer(fees="off", warm=True),
+    "transfer[fees-lazy,cold]": _transfer(fees="lazy", warm=False),
+    "transfer[fees-lazy,warm]": _transfer(fees="lazy", warm=True),
+    "transfer[checkpoints,cold]": _transfer_checkpoints(warm=False, holder="sender"),
+    "transfer[checkpoints,warm]": _transfer_checkpoints(warm=True, holder="sender"),
+    "transfer[checkpoints-other,warm]": _transfer_checkpoints(warm=True, holder="other"),
+    "transfer[checkpoints-other,no-supply,warm]": _transfer_checkpoints(warm=True, holder="other", supply=False),
+    "transferFrom[fees-on,cold]": _transfer_from(fees="on", warm=False),
+    "transferFrom[fees-on,warm]": _transfer_from(fees="on", warm=True),
+    "transferFrom[fees-off,cold]": _transfer_from(fees="off", warm=False),
+    "transferFrom[fees-off,warm]": _transfer_from(fees="off", warm=True),
+    "transferFrom[fees-lazy,cold]": _transfer_from(fees="lazy", warm=False),
+    "transferFrom[fees-lazy,warm]": _transfer_from(fees="lazy", warm=True),
+    "transferFrom[max-allowance]": _transfer_from_pull("max-allowance"),
+    "transferFrom[operator]": _transfer_from_pull("operator"),
+    "approve": _approve,
+    "permit": _permit,
+    "permitAndTransferFrom": _permit_and_transfer_from,
+    "transferWithAuthorization": _transfer_with_authorizations(1, batch=False),
+    "transferWithAuthorizations[1]": _transfer_with_authorizations(1, batch=True),
+    "transferWithAuthorizations[50]": _transfer_with_authorizations(50, batch=True),
+    "mint": _mint,
+    "burn": _burn,
+    "buyTokens": _buy_tokens("allowance"),
+    "buyTokens[max-allowance]": _buy_tokens("max-allowance"),
+    "buyTokens[operator]": _buy_tokens("operator"),
+    "claim": _claim,
+    "claimFees": _claim_fees,
+    "__default__": _fallback,
+    "placeBet": _place_bet,
+    "resolveBets[1]": _resolve_bets(1),
+    "resolveBets[50]": _resolve_bets(50),
+    "resolveBets[500]": _resolve_bets(500),
+    "launch": _launch,
+}
+
+
+class Context:
+    def __init__(self, **fixtures):
+        self.__dict__.update(fixtures)
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_gas(scenario, request, gas_baseline, chain, project, token, crowdSale, sport, factory, owner, feeaddress, wallet, accounts, Permit):
+    """
+    Gas used by the scenario must stay within the baseline threshold.
+    """
+    baseline, recorded = gas_baseline
+    ctx = Context(
+        chain=chain,
+        project=project,
+        token=token,
+        crowdSale=crowdSale,
+        sport=sport,
+        factory=factory,
+        owner=owner,
+        feeaddress=feeaddress,
+        wallet=wallet,
+        accounts=accounts,
+        Permit=Permit,
+    )
+
+    gas_used = SCENARIOS[scenario](ctx).gas_used
+    recorded[scenario] = gas_used
+
+    if request.config.getoption("--update-gas-baseline"):
+        return
+
+    expected = baseline["gas"].get(scenario)
+    if expected is None:
+        pytest.skip(f"No baseline for {scenario}, record one with --update-gas-baseline.")
+
+    threshold = request.config.getoption("--gas-threshold")
+    if threshold is None:
+        function = scenario.split("[")[0]
+        threshold = baseline["thresholds"].get(function, baseline["thresholds"]["default"])
+
+    assert gas_used <= expected * (1 + threshold), (
+        f"{scenario} used {gas_used} gas, baseline {expected} (+{threshold:.0%} allowed)"
+    )
@@ -0,0 +1,81 @@
+import asyncio
+
+from web3 import AsyncWeb3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from indexer import Indexer, Store
+
+AMOUNT = 10 ** 18
+
+
+def _index(chain, store, token, crowdSale, max_range=None, queried=None):
+    # Index the chain the test suite runs on
+    provider = AsyncEthereumTesterProvider()
+    provider.ethereum_tester = chain.provider.web3.provider.ethereum_tester
+    w3 = AsyncWeb3(provider)
+
+    if max_range:
+        get_logs = w3.eth.get_logs
+
+        async def limited_get_logs(params):
+            if params["toBlock"] - params["fromBlock"] >= max_range:
+                raise ValueError("query returned more than 10000 results")
+            queried.append((params["fromBlock"], params["toBlock"]))
+            return await get_logs(params)
+
+        w3.eth.get_logs = limited_get_logs
+
+    indexer = Indexer(w3, store, token.address, crowdSale.address, chunk=8, concurrency=3)
+    asyncio.run(indexer.run(log=lambda _: None))
+    return indexer
+
+
+def _assert_balances(store, token):
+    holders = store.db.execute("SELECT holder, balance FROM balances").fetchall()
+    assert holders
+    for holder, balance in holders:
+        assert int(balance) == token.balanceOf(holder)
+    assert store.total("total_supply") == token.totalSupply()
+
+
+def test_indexer(chain, token, crowdSale, owner, receiver, feeaddress, accounts, tmp_path):
+    """
+    The index matches on-chain balances and resumes from its checkpoint.
+    """
+    buyer, spender = accounts[6], accounts[3]
+    token.transfer(receiver, 100 * AMOUNT, sender=owner)
+    token.transferBatch([receiver, accounts[7]], [AMOUNT, 2 * AMOUNT], sender=owner)
+    token.approve(spender, 5 * AMOUNT, sender=owner)
+    token.transferFrom(owner, accounts[8], AMOUNT, sender=spender)
+    token.burn(AMOUNT, sender=owner)
+    token.blacklist(accounts[9], True, sender=owner)
+    token.updateFees(10, 5, feeaddress, sender=owner)
+    token.approve(crowdSale.address, 1000 * AMOUNT, sender=owner)
+    crowdSale.buyTokens(buyer, sender=buyer, value=100)
+
+    db = tmp_path / "kiwi.sqlite"
+    store = Store(db, "kiwi")
+    queried = []
+    indexer = _index(chain, store, token, crowdSale, max_range=4, queried=queried)
+
+    assert store.checkpoint == chain.blocks.head.number
+    _assert_balances(store, token)
+    assert store.allowance(owner.address, crowdSale.address) == 1000 * AMOUNT
+    assert store.db.execute("SELECT listed FROM blacklist WHERE address = ?", (accounts[9].address,)).fetchone() == (1,)
+    assert store.db.execute("SELECT txfee, burnfee, fee_address FROM fees").fetchall()[-1] == (10, 5, feeaddress.address)
+    assert store.total("purchased_wei") == 100
+    assert store.db.execute("SELECT beneficiary FROM purchases").fetchall() == [(buyer.address,)]
+    # Ranges wider than the node allows were split, and nothing was skipped
+    assert indexer.requests > len(queried)
+    assert sorted(queried)[0][0] == 0
+    assert all(last + 1 == first for (_, last), (first, _) in zip(sorted(queried), sorted(queried)[1:]))
+
+    checkpoint = store.checkpoint
+    token.transfer(accounts[7], 3 * AMOUNT, sender=receiver)
+    token.burn(AMOUNT, sender=receiver)
+
+    store = Store(db, "kiwi")
+    indexer = _index(chain, store, token, crowdSale)
+    assert indexer.requests == 1
+    assert store.checkpoint == checkpoint + 2
+    _assert_balances(store, token)
@@ -0,0 +1,35 @@
+import asyncio
+
+from eth_account import Account
+from web3 import AsyncWeb3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from loadgen import LoadGenerator, format_report, parse_mix, wallet_keys
+
+
+def test_load(chain, token, crowdSale, owner):
+    """
+    Every operation of the mix lands, none reverts, and the report covers each kind.
+    """
+    provider = AsyncEthereumTesterProvider()
+    provider.ethereum_tester = chain.provider.web3.provider.ethereum_tester
+    mix = parse_mix("transfer=3,transferFrom=2,permit=2,buyTokens=1")
+    generator = LoadGenerator(
+        AsyncWeb3(provider), Account.from_key(owner.private_key), token.address, crowdSale.address, wallets=6, ops=8, mix=mix, depth=3, seed=7
+    )
+    report = asyncio.run(generator.run())
+
+    assert report["transactions"] == 48
+    assert sum(report[operation]["count"] for operation in mix) == 48
+    for operation in mix:
+        assert report[operation]["revert_rate"] == 0
+        assert report[operation]["gas"] > 21000
+    # Permits were relayed in nonce order
+    for wallet in generator.wallets:
+        assert token.nonces(wallet.permit_account.public_key.to_checksum_address()) == wallet.permit_nonce
+    assert "tx/s" in format_report(report)
+
+
+def test_wallet_keys():
+    assert wallet_keys(3, 1) == wallet_keys(3, 1)
+    assert len(set(wallet_keys(3, 1) + wallet_keys(3, 2) + wallet_keys(3, 1, "permit"))) == 9
@@ -0,0 +1,27 @@
+from permits import PermitRequest, domain_separator, sign_permits
+
+
+def test_sign_permits(chain, token, accounts, Permit):
+    """
+    Bulk signatures equal sign_message's and are accepted by Token.permit.
+    """
+    spender = accounts[3]
+    deadline = chain.pending_timestamp + 600
+    owners = accounts[4:8]
+    permit = Permit(owners[0].address, spender.address, 0, 0, deadline)
+    assert domain_separator(permit._chainId_, token.address) == token.DOMAIN_SEPARATOR()
+
+    requests = [
+        PermitRequest(owner.private_key, owner.address if i % 2 else None, spender.address, 100 + i, token.nonces(owner), deadline)
+        for i, owner in enumerate(owners)
+    ]
+    signatures = sign_permits(token.DOMAIN_SEPARATOR(), requests)
+    # Through the process pool, in order
+    assert sign_permits(token.DOMAIN_SEPARATOR(), requests, processes=2, chunk_size=1) == signatures
+
+    for owner, request, signature in zip(owners, requests, signatures):
+        permit = Permit(owner.address, spender.address, request.value, request.nonce, deadline)
+        assert signature == owner.sign_message(permit.signable_message).encode_rsv()
+
+        token.permit(owner, spender, request.value, deadline, signature, sender=spender)
+        assert token.allowance(owner, spender) == request.value
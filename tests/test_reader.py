@@ -0,0 +1,73 @@
+import asyncio
+
+import ape
+from web3 import AsyncWeb3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from reader import MAX_BATCH_SIZE, AccountState, BatchReader, batch_size
+
+AMOUNT = 10 ** 18
+
+
+def test_batch_size():
+    """
+    Chunks must fit the gas cap and never exceed the contract bound.
+    """
+    assert batch_size("accounts", 50_000_000) == MAX_BATCH_SIZE
+    assert batch_size("accounts", 1_000_000) == (1_000_000 - 100_000) // 14_000
+    assert batch_size("balances", 1_000_000) > batch_size("accounts", 1_000_000)
+    assert batch_size("accounts", 50_000) == 1
+
+
+def test_batch_reader(chain, project, token, owner, accounts):
+    """
+    One call returns what balanceOf, blackListAddresses, isMinter and nonces return per address.
+    """
+    reader = owner.deploy(project.BatchReader)
+    holders = [owner, *accounts[1:8]]
+    token.transfer(accounts[3], 7 * AMOUNT, sender=owner)
+    token.blacklist(accounts[4], True, sender=owner)
+    token.addMinter(accounts[5], sender=owner)
+    token.approve(accounts[6], 3 * AMOUNT, sender=owner)
+
+    states = reader.accounts(token, holders)
+    assert len(states) == len(holders)
+    for holder, state in zip(holders, states):
+        assert tuple(state) == (
+            token.balanceOf(holder),
+            token.blackListAddresses(holder),
+            token.isMinter(holder),
+            token.nonces(holder),
+        )
+
+    assert list(reader.balances(token, holders)) == [token.balanceOf(holder) for holder in holders]
+    assert list(reader.allowances(token, [owner, owner], [accounts[6], accounts[7]])) == [3 * AMOUNT, 0]
+
+    with ape.reverts("Owners and spenders length mismatch."):
+        reader.allowances(token, [owner], [])
+
+
+def test_batch_reader_client(chain, project, token, owner, accounts):
+    """
+    The client splits reads into chunks that fit the gas cap and keeps their order.
+    """
+    reader = owner.deploy(project.BatchReader)
+    holders = [account.address for account in accounts] * 2
+    token.transferBatch(holders[:5], [AMOUNT] * 5, sender=owner)
+
+    provider = AsyncEthereumTesterProvider()
+    provider.ethereum_tester = chain.provider.web3.provider.ethereum_tester
+    client = BatchReader(AsyncWeb3(provider), reader.address, token.address, gas_cap=200_000)
+
+    async def read():
+        return await client.accounts(holders), await client.allowances([(owner.address, h) for h in holders])
+
+    states, allowances = asyncio.run(read())
+    chunks = [-(-len(holders) // batch_size(method, 200_000)) for method in ("accounts", "allowances")]
+    assert chunks[0] > 1
+    assert client.calls == sum(chunks)
+    for holder in holders:
+        assert states[holder] == AccountState(
+            token.balanceOf(holder), token.blackListAddresses(holder), token.isMinter(holder), token.nonces(holder)
+        )
+        assert allowances[(owner.address, holder)] == token.allowance(owner, holder)
@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+from eth_account import Account
+from eth_utils import keccak
+
+from relayer import Relayer, columns, format_flush, sign_authorization, split_fees
+from rpc import connect
+from tests.test_rpc import Node
+
+
+def _relay(chain, owner, token, steps, **options):
+    """
+    Runs steps(relayer) against the test chain behind a local JSON-RPC node.
+    """
+
+    async def run():
+        async with Node(chain) as node:
+            w3 = connect(node.url, head_ttl=0)
+            try:
+                relayer = Relayer(w3, Account.from_key(owner.private_key), token.address, **options)
+                await relayer.setup()
+                return await steps(relayer)
+            finally:
+                await w3.provider.close()
+
+    return asyncio.run(run())
+
+
+def test_relayer(chain, token, owner, receiver, feeaddress, accounts):
+    """
+    Duplicates and invalid signatures are dropped, batches flush by size,
+    skipped authorizations are reported and the accounting matches the balances.
+    """
+    keys = [keccak(text=f"custodial user {i}") for i in range(4)]
+    users = [Account.from_key(key).address for key in keys]
+    token.transferBatch(users, [10 ** 6] * len(users), sender=owner)
+    domain = token.DOMAIN_SEPARATOR()
+    valid_before = chain.pending_timestamp + 3600
+    authorizations = [sign_authorization(key, domain, receiver.address, 1000 * (i + 1), valid_before) for i, key in enumerate(keys)]
+    # Submitted by someone else before the relayer gets to it
+    raced = sign_authorization(keys[0], domain, receiver.address, 5000, valid_before)
+    balances = [token.balanceOf(user) for user in users]
+    receiver_balance, fee_balance = token.balanceOf(receiver), token.balanceOf(feeaddress)
+
+    async def steps(relayer):
+        assert [relayer.add(a) for a in authorizations] == [True] * 4
+        assert not relayer.add(authorizations[1])
+        assert not relayer.add(authorizations[2]._replace(amount=1))
+        assert not relayer.add(sign_authorization(keys[3], domain, receiver.address, 1, chain.pending_timestamp - 3600))
+        assert relayer.add(raced)
+        assert relayer.due()
+
+        first = await relayer.flush()
+        assert first.applied == authorizations[:3] and first.skipped == []
+        token.transferWithAuthorization(*raced, sender=accounts[6])
+
+        assert not relayer.due()
+        second = await relayer.flush()
+        assert second.applied == authorizations[3:] and second.skipped == [raced]
+        assert await relayer.flush() is None
+        return first, second
+
+    first, second = _relay(chain, owner, token, steps, max_batch=3, max_age=60)
+
+    assert [token.authorizationState(a.authorizer, a.nonce) for a in authorizations] == [True] * 4
+    assert [token.balanceOf(user) for user in users] == [
+        balances[0] - 1000 - 5000,
+        balances[1] - 2000,
+        balances[2] - 3000,
+        balances[3] - 4000,
+    ]
+    raced_received, raced_fee, _ = split_fees(5000, 1000, 1000)
+    assert first.received + second.received == token.balanceOf(receiver) - receiver_balance - raced_received
+    assert first.fees + second.fees == token.balanceOf(feeaddress) - fee_balance - raced_fee
+    assert (first.received, first.fees, first.burned) == (5988, 6, 6)
+    assert first.gas_used > 0 and "applied 3/3" in format_flush(first)
+
+
+def test_relayer_run(chain, token, owner, receiver):
+    """
+    run flushes the queue by age and empties it once stopped.
+    """
+    key = keccak(text="custodial user")
+    user = Account.from_key(key).address
+    token.transfer(user, 10 ** 6, sender=owner)
+    domain = token.DOMAIN_SEPARATOR()
+    valid_before = chain.pending_timestamp + 3600
+    flushes = []
+
+    async def steps(relayer):
+        stop = asyncio.Event()
+        task = asyncio.create_task(relayer.run(stop, log=flushes.append))
+        relayer.add(sign_authorization(key, domain, receiver.address, 100, valid_before))
+        while not flushes:
+            await asyncio.sleep(0.01)
+        for amount in (200, 300):
+            relayer.add(sign_authorization(key, domain, receiver.address, amount, valid_before))
+        stop.set()
+        await task
+        return relayer
+
+    relayer = _relay(chain, owner, token, steps, max_batch=10, max_age=0.05, poll=0.01)
+    assert len(flushes) == 2 and not relayer.pending
+    assert "applied 1/1" in flushes[0] and "applied 2/2" in flushes[1]
+
+
+def test_relayer_send_failure(chain, token, owner, receiver):
+    """
+    A rejected send does not use up its nonce, and run logs the failed flush and retries.
+    """
+    key = keccak(text="custodial user")
+    user = Account.from_key(key).address
+    token.transfer(user, 10 ** 6, sender=owner)
+    domain = token.DOMAIN_SEPARATOR()
+    valid_before = chain.pending_timestamp + 3600
+    nonce = owner.nonce
+    lines = []
+
+    async def steps(relayer):
+        send = relayer.w3.eth.send_raw_transaction
+        rejected = []
+
+        async def flaky_send(raw):
+            if not rejected:
+                rejected.append(raw)
+                raise ValueError("transaction underpriced")
+            return await send(raw)
+
+        relayer.w3.eth.send_raw_transaction = flaky_send
+        stop = asyncio.Event()
+        task = asyncio.create_task(relayer.run(stop, log=lines.append))
+        relayer.add(sign_authorization(key, domain, receiver.address, 100, valid_before))
+        while not any("applied" in line for line in lines):
+            await asyncio.sleep(0.01)
+        stop.set()
+        await task
+        return rejected
+
+    rejected = _relay(chain, owner, token, steps, max_batch=10, max_age=0.05, poll=0.01)
+    assert len(rejected) == 1
+    assert lines[0].startswith("Flush failed") and "applied 1/1" in lines[1]
+    # The batch was sent again with the nonce the rejected send had
+    assert owner.nonce == nonce + 1
+
+
+def test_relayer_receipt_timeout(chain, token, owner, receiver):
+    """
+    A batch whose receipt wait timed out is awaited again on the next flush, not sent twice.
+    """
+    key = keccak(text="custodial user")
+    user = Account.from_key(key).address
+    token.transfer(user, 10 ** 6, sender=owner)
+    domain = token.DOMAIN_SEPARATOR()
+    valid_before = chain.pending_timestamp + 3600
+    nonce = owner.nonce
+    authorization = sign_authorization(key, domain, receiver.address, 100, valid_before)
+
+    async def steps(relayer):
+        wait = relayer.w3.eth.wait_for_transaction_receipt
+        timeouts = []
+
+        async def slow_wait(tx_hash, **kwargs):
+            if not timeouts:
+                timeouts.append(tx_hash)
+                raise TimeoutError("receipt not found in time")
+            return await wait(tx_hash, **kwargs)
+
+        relayer.w3.eth.wait_for_transaction_receipt = slow_wait
+        relayer.add(authorization)
+        with pytest.raises(TimeoutError):
+            await relayer.flush()
+        assert relayer.due() and not relayer.pending
+        return await relayer.flush()
+
+    flush = _relay(chain, owner, token, steps, max_batch=10, max_age=60)
+    assert flush.applied == [authorization] and flush.skipped == []
+    assert owner.nonce == nonce + 1
+
+
+def test_columns():
+    assert columns([]) == [[]] * 7
+    with pytest.raises(ValueError):
+        Relayer(None, None, None, max_batch=101)
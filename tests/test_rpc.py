@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+from aiohttp import web
+from eth_account import Account
+from web3 import Web3
+from web3._utils.encoding import Web3JsonEncoder
+from web3.providers.eth_tester import EthereumTesterProvider
+
+from deploy import encode_call, load_artifact
+from rpc import compare, connect, read_state
+
+
+class Node:
+    """
+    JSON-RPC over HTTP in front of the test chain, counting the HTTP requests it serves.
+    """
+
+    def __init__(self, chain):
+        w3 = Web3(EthereumTesterProvider(chain.provider.web3.provider.ethereum_tester))
+        self.request = w3.provider.request_func(w3, ())
+        self.http_requests = 0
+        self.methods = []
+
+    async def handle(self, request):
+        self.http_requests += 1
+        body = await request.json()
+        calls = body if isinstance(body, list) else [body]
+        responses = []
+        for call in calls:
+            self.methods.append(call["method"])
+            response = dict(self.request(call["method"], call["params"]))
+            response["id"] = call["id"]
+            responses.append(response)
+        result = responses if isinstance(body, list) else responses[0]
+        return web.Response(text=json.dumps(result, cls=Web3JsonEncoder), content_type="application/json")
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def test_batching(chain, token, crowdSale, owner, accounts):
+    """
+    Reads of one tick share a batch, repeated reads come from the cache until a new head or a write.
+    """
+    holders = [account.address for account in accounts[:6]]
+    expected = [token.balanceOf(h) for h in holders] + [crowdSale.rate(), crowdSale.weiRaised()]
+
+    async def run():
+        async with Node(chain) as node:
+            w3 = connect(node.url, head_ttl=60)
+            stats = w3.provider.stats
+
+            assert await read_state(w3, token.address, crowdSale.address, holders, rounds=1) == expected
+            # web3 asks for the chain id before calls, then one batch with the head check piggybacked
+            assert node.http_requests == 2
+            assert node.methods.count("eth_chainId") == 1
+            assert stats.sent == len(expected) + 2
+
+            hits = stats.cache_hits
+            assert await read_state(w3, token.address, crowdSale.address, holders, rounds=1) == expected
+            assert node.http_requests == 2
+            # Every read and its chain id check
+            assert stats.cache_hits - hits == 2 * len(expected)
+
+            # Identical requests in one tick are sent once
+            coalesced = stats.coalesced
+            block, same = await asyncio.gather(w3.eth.get_block("latest"), w3.eth.get_block("latest"))
+            assert block == same and stats.coalesced == coalesced + 1
+            assert await w3.eth.chain_id == await w3.eth.chain_id
+            assert node.methods.count("eth_chainId") == 1
+
+            # A transaction sent through the provider drops the state cache
+            receiver = accounts[7].address
+            sender = Account.from_key(owner.private_key)
+            tx = {
+                "to": token.address,
+                "data": encode_call(load_artifact("Token")[0], "transfer", [receiver, 10000]),
+                "nonce": await w3.eth.get_transaction_count(sender.address),
+                "gas": 200_000,
+                "gasPrice": await w3.eth.gas_price,
+                "chainId": await w3.eth.chain_id,
+            }
+            tx_hash = await w3.eth.send_raw_transaction(sender.sign_transaction(tx).rawTransaction)
+            assert (await w3.eth.wait_for_transaction_receipt(tx_hash))["status"] == 1
+            balances = await read_state(w3, token.address, crowdSale.address, [owner.address, receiver], rounds=1)
+            assert balances[:2] == [token.balanceOf(owner), token.balanceOf(receiver)]
+            # Receipts are immutable once mined
+            requests = node.http_requests
+            await w3.eth.get_transaction_receipt(tx_hash)
+            assert node.http_requests == requests
+
+            # Without writes of ours, a new head invalidates the cache
+            w3.provider.head_ttl = 0
+            token.transfer(receiver, 10000, sender=owner)
+            balances = await read_state(w3, token.address, crowdSale.address, [receiver], rounds=1)
+            assert balances[0] == token.balanceOf(receiver)
+            await w3.provider.close()
+
+    asyncio.run(run())
+
+
+def test_compare(chain, token, crowdSale, accounts):
+    """
+    The plain provider makes an HTTP request per read, plus web3's chain id check, ours two batches in all.
+    """
+    holders = [account.address for account in accounts[:5]]
+
+    async def run():
+        async with Node(chain) as node:
+            return await compare(node.url, token.address, crowdSale.address, holders, rounds=2, head_ttl=60)
+
+    report = asyncio.run(run())
+    reads = 2 * (len(holders) + 2)
+    assert report["plain"]["http_requests"] == 2 * reads
+    assert report["batched"]["http_requests"] == 2
+    assert report["batched"]["sent"] == len(holders) + 4
+
+
+class BrokenNode(Node):
+    """
+    Node answering batches with `reply(calls)` instead of the responses.
+    """
+
+    def __init__(self, chain, reply):
+        super().__init__(chain)
+        self.reply = reply
+
+    async def handle(self, request):
+        body = await request.json()
+        return web.Response(text=json.dumps(self.reply(body)), content_type="application/json")
+
+
+def test_broken_batches(chain):
+    """
+    Short replies, replies without ids and batch-level errors fail every waiter instead of leaving it hanging.
+    """
+    replies = [
+        lambda calls: [{"jsonrpc": "2.0", "id": calls[0]["id"], "result": "0x1"}],
+        lambda calls: [{"jsonrpc": "2.0", "result": "0x1"} for _ in calls],
+        lambda calls: {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Batch too large."}},
+        lambda calls: "not json-rpc",
+    ]
+
+    async def run(reply):
+        async with BrokenNode(chain, reply) as node:
+            w3 = connect(node.url, head_ttl=0)
+            try:
+                results = await asyncio.wait_for(
+                    asyncio.gather(*(w3.provider.make_request("eth_getBalance", [f"0x{i:040x}", "latest"]) for i in range(3)), return_exceptions=True),
+                    timeout=10,
+                )
+            finally:
+                await w3.provider.close()
+            assert not w3.provider._tasks
+            return results
+
+    short = asyncio.run(run(replies[0]))
+    assert short[0]["result"] == "0x1"
+    assert [result["error"]["message"] for result in short[1:]] == ["Missing response in batch."] * 2
+    for reply in replies[1:]:
+        results = asyncio.run(run(reply))
+        assert all(isinstance(result, Exception) for result in results)
@@ -0,0 +1,106 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.blacklist import blacklist_delta, chunk_addresses, pack_addresses, read_addresses
+from scripts.gas_profile import ContractSource, format_folded, function_ranges, profile_trace
+from scripts.transfer_batch import MAX_BATCH_SIZE, batch_size, chunk_transfers
+
+CONTRACTS = Path(__file__).parent.parent / "contracts"
+
+
+def test_batch_size():
+    """
+    Batches must fit in the gas budget and never exceed the contract bound.
+    """
+    assert batch_size(30_000_000) == MAX_BATCH_SIZE
+    assert batch_size(10_000_000) == (5_000_000 - 70000) // 27000
+    assert batch_size(100_000) == 1
+
+
+def test_chunk_transfers():
+    """
+    Chunks must keep receivers and amounts aligned and cover every payout.
+    """
+    receivers = [f"0x{i:040x}" for i in range(1, 1201)]
+    amounts = list(range(1, 1201))
+
+    chunks = list(chunk_transfers(receivers, amounts, 30_000_000))
+    assert [len(r) for r, _ in chunks] == [500, 500, 200]
+    assert sum((r for r, _ in chunks), []) == receivers
+    assert sum((a for _, a in chunks), []) == amounts
+
+    with pytest.raises(ValueError):
+        list(chunk_transfers(receivers, amounts[:-1], 30_000_000))
+
+
+
+def test_blacklist_delta():
+    """
+    Only addresses whose state differs from the index are sent, unlisting only with sync.
+    """
+    desired = read_addresses(["# screening\n", "0x" + "AA" * 20 + ",sanctions\n", "\n", "0x" + "bb" * 20 + "\n"])
+    listed = {"0x" + "bb" * 20, "0x" + "cc" * 20}
+
+    assert blacklist_delta(desired, listed) == (["0x" + "aa" * 20], [])
+    assert blacklist_delta(desired, listed, sync=True) == (["0x" + "aa" * 20], ["0x" + "cc" * 20])
+    assert pack_addresses(sorted(listed)) == bytes.fromhex("bb" * 20 + "cc" * 20)
+
+
+def test_chunk_addresses():
+    """
+    Blacklist batches must fit in the gas budget and the contract bound.
+    """
+    addresses = [f"0x{i:040x}" for i in range(1, 1501)]
+
+    assert [len(c) for c in chunk_addresses(addresses, 30_000_000)] == [598, 598, 304]
+    assert [len(c) for c in chunk_addresses(addresses, 100_000_000)] == [1000, 500]
+    assert sum(chunk_addresses(addresses, 30_000_000), []) == addresses
+
+def test_function_ranges():
+    """
+    Every Token function must be found, with its body inside its range.
+    """
+    source = (CONTRACTS / "Token.vy").read_text()
+    lines = source.splitlines()
+    ranges = {name: (start, end) for start, end, name in function_ranges(source)}
+
+    assert {"_decay", "_blackList", "transfer", "transferFrom", "permit"} <= set(ranges)
+    start, end = ranges["_decay"]
+    assert lines[start - 1].startswith("def _decay(")
+    assert lines[end - 1].strip() == "return newValue"
+
+
+def test_profile_trace():
+    """
+    Gas must be attributed to lines and internal functions,
+    and a call must be charged to the callee, not the caller.
+    """
+    caller = ContractSource("A.vy", {0: 2, 1: 5, 2: 6}, "def a():\n    pass\n\n\ndef _b():\n    pass\n")
+    callee = ContractSource("B.vy", {0: 1}, "def c():\n    pass\n")
+    target = "0x" + "bb" * 20
+    frame = lambda pc, op, gas, cost, depth, stack=(): SimpleNamespace(
+        pc=pc, op=op, gas=gas, gas_cost=cost, depth=depth, stack=list(stack)
+    )
+    trace = [
+        frame(0, "PUSH1", 1000, 3, 1),
+        frame(1, "SLOAD", 997, 2100, 1),
+        frame(2, "CALL", 500, 400, 1, [bytes(12) + bytes.fromhex("bb" * 20), bytes(32)]),
+        frame(0, "SSTORE", 300, 200, 2),
+        frame(0, "STOP", 100, 0, 2),
+        frame(1, "STOP", 50, 0, 1),
+    ]
+
+    profile = profile_trace(trace, "0x" + "aa" * 20, {"0x" + "aa" * 20: caller, target: callee}.get)
+
+    assert profile.total == 3 + 2100 + 250 + 200
+    assert profile.lines[("A.vy", 5)] == 2100
+    assert profile.lines[("A.vy", 6)] == 250
+    assert profile.functions["A.vy:_b"] == 2350
+    assert profile.functions["B.vy:c"] == 200
+    assert format_folded(profile).splitlines() == [
+        "A.vy:a 3",
+        "A.vy:a;A.vy:_b 2350",
+        "A.vy:a;A.vy:_b;B.vy:c 200",
+    ]
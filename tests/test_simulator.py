@@ -0,0 +1,217 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+from ape.exceptions import ContractLogicError
+from web3 import AsyncWeb3
+from web3.providers.eth_tester import AsyncEthereumTesterProvider
+
+from indexer import Indexer, Store
+from simulator import Reverted, TokenSimulator, load_history, random_workload, replay
+
+AMOUNT = 10 ** 18
+FEES = [0, 1, 3, 7, 333, 500, 1000]
+
+
+def _amount(rng, balance):
+    # Mostly amounts around the fee rounding steps, sometimes more than the balance
+    return rng.choice([rng.randrange(0, 3000), rng.randrange(0, balance + 1), balance, balance + 1, rng.randrange(0, AMOUNT)])
+
+
+def _step(rng, token, sim, ids, owner, accounts):
+    """
+    Runs one random call on chain and in the simulator, returns (chain reverted, simulator reverted).
+    """
+    caller = rng.choice(accounts[:8])
+    other = rng.choice(accounts[:8])
+    kind = rng.choice(
+        ["transfer"] * 6
+        + ["transferFrom"] * 3
+        + ["approve", "transferBatch", "mint", "burn", "pause", "blacklist", "fees", "lazy", "setOperator", "approveOperator"]
+    )
+    if sim.paused and rng.random() < 0.5:
+        kind = "pause"
+    balance = sim.balance_of(ids[caller.address])
+
+    if kind == "transfer":
+        args, call = (other, _amount(rng, balance)), sim.transfer
+    elif kind == "transferFrom":
+        source = rng.choice(accounts[:8])
+        args, call = (source, other, _amount(rng, sim.balance_of(ids[source.address]))), sim.transfer_from
+    elif kind == "approve":
+        amount = 2 ** 256 - 1 if rng.random() < 0.3 else rng.randrange(0, 2 * AMOUNT)
+        args, call = (other, amount), sim.approve
+    elif kind == "setOperator":
+        caller = rng.choice([owner, owner, other])
+        args, call = (rng.choice(accounts[:8]), rng.random() < 0.7), sim.set_operator
+    elif kind == "approveOperator":
+        args, call = (other, rng.random() < 0.7), sim.approve_operator
+    elif kind == "transferBatch":
+        receivers = [rng.choice(accounts[:8]) for _ in range(rng.randrange(1, 4))]
+        args = (receivers, [_amount(rng, balance // 3) for _ in receivers])
+        call = sim.transfer_batch
+    elif kind == "mint":
+        caller = rng.choice([owner, other])
+        args, call = (other, rng.randrange(0, AMOUNT)), sim.mint
+    elif kind == "burn":
+        args, call = (_amount(rng, balance),), sim.burn
+    elif kind == "pause":
+        caller = rng.choice([owner, owner, other])
+        kind = "unpause" if sim.paused else "pause"
+        args, call = (), getattr(sim, kind)
+    elif kind == "blacklist":
+        listed = bool(sim.blacklisted[ids[other.address]])
+        caller = owner
+        args, call = (other, not listed if rng.random() < 0.8 else listed), sim.blacklist
+    elif kind == "fees":
+        caller = owner
+        args, call = (rng.choice(FEES), rng.choice(FEES), other), sim.update_fees
+    else:
+        # Lazy accrual changes storage only, the simulator has no counterpart
+        token.setLazyFees(not token.lazyFees(), sender=owner)
+        return False, False
+
+    def sim_args(value):
+        if isinstance(value, list):
+            return [sim_args(v) for v in value]
+        return ids[value.address] if hasattr(value, "address") else value
+
+    try:
+        getattr(token, "updateFees" if kind == "fees" else kind)(*args, sender=caller)
+        chain_reverted = False
+    except ContractLogicError:
+        chain_reverted = True
+    try:
+        call(ids[caller.address], *[sim_args(a) for a in args])
+        sim_reverted = False
+    except Reverted:
+        sim_reverted = True
+    return chain_reverted, sim_reverted
+
+
+def test_differential(token, owner, feeaddress, accounts):
+    """
+    Random call sequences leave the simulator with the chain's balances, supply and reverts.
+    """
+    rng = random.Random(1)
+    sim = TokenSimulator(1, 1, feeaddress.address, owner.address, token_address=token.address)
+    ids = {account.address: sim.account(account.address) for account in accounts}
+    holder_index = {ids[account.address]: i for i, account in enumerate(accounts)}
+    # Spread funds so most accounts can send
+    token.transferBatch(accounts[1:8], [1000 * AMOUNT] * 7, sender=owner)
+    sim.transfer_batch(ids[owner.address], [ids[a.address] for a in accounts[1:8]], [1000 * AMOUNT] * 7)
+
+    for step in range(100):
+        assert _step(rng, token, sim, ids, owner, accounts) in ((False, False), (True, True)), step
+        if step % 10 == 9:
+            for account in accounts[:8]:
+                assert token.balanceOf(account) == sim.balance_of(ids[account.address]), step
+            assert token.totalSupply() == sim.total_supply
+            for (holder, spender), allowance in sim.allowances.items():
+                assert token.allowance(accounts[holder_index[holder]], accounts[holder_index[spender]]) == allowance, step
+
+
+def test_differential_pulls(token, owner, feeaddress, accounts):
+    """
+    Max allowances and approved operators pull without decreasing the allowance, on chain and in the simulator.
+    """
+    sim = TokenSimulator(1, 1, feeaddress.address, owner.address, token_address=token.address)
+    holder, spender, receiver = accounts[3], accounts[4], accounts[6]
+    ids = {account.address: sim.account(account.address) for account in (owner, holder, spender, receiver)}
+
+    def both(name, sim_name, *args, sender):
+        getattr(token, name)(*args, sender=sender)
+        getattr(sim, sim_name)(ids[sender.address], *[ids.get(getattr(a, "address", None), a) for a in args])
+
+    def same():
+        for account in (holder, spender, receiver, feeaddress):
+            assert token.balanceOf(account) == sim.balance_of(sim.account(account.address))
+        assert token.allowance(holder, spender) == sim.allowances.get((ids[holder.address], ids[spender.address]), 0)
+
+    both("transfer", "transfer", holder, 10 * AMOUNT, sender=owner)
+    both("approve", "approve", spender, 2 ** 256 - 1, sender=holder)
+    both("transferFrom", "transfer_from", holder, receiver, AMOUNT, sender=spender)
+    same()
+    assert sim.allowances[(ids[holder.address], ids[spender.address])] == 2 ** 256 - 1
+
+    # Registered and approved operators skip the allowance, a finite one stays as it is
+    both("approve", "approve", spender, 100, sender=holder)
+    both("setOperator", "set_operator", spender, True, sender=owner)
+    both("approveOperator", "approve_operator", spender, True, sender=holder)
+    both("transferFrom", "transfer_from", holder, receiver, AMOUNT, sender=spender)
+    same()
+    assert sim.allowances[(ids[holder.address], ids[spender.address])] == 100
+
+    # Without the holder's approval the allowance applies again
+    both("approveOperator", "approve_operator", spender, False, sender=holder)
+    with pytest.raises(ContractLogicError):
+        token.transferFrom(holder, receiver, AMOUNT, sender=spender)
+    with pytest.raises(Reverted):
+        sim.transfer_from(ids[spender.address], ids[holder.address], ids[receiver.address], AMOUNT)
+    both("transferFrom", "transfer_from", holder, receiver, 100, sender=spender)
+    same()
+
+
+def test_transfers_batched():
+    """
+    Array transfers match one-by-one transfers, also when senders run dry mid-batch.
+    """
+    for holders, balance in ((100, 10 ** 24), (5, 10 ** 19)):
+        batched = TokenSimulator(7, 3, "0x" + "fe" * 20, "0x" + "01" * 20)
+        senders, receivers, amounts = random_workload(batched, holders, 5000, seed=holders, balance=balance)
+        receivers[::97] = 0
+        batched.blacklisted[senders[5]] = True
+        single = TokenSimulator(7, 3, "0x" + "fe" * 20, "0x" + "01" * 20)
+        random_workload(single, holders, 0, seed=holders, balance=balance)
+        single.blacklisted[senders[5]] = True
+
+        ok = batched.transfers(senders, receivers, amounts)
+        for i, (sender, receiver, amount) in enumerate(zip(senders, receivers, amounts)):
+            try:
+                single.transfer(int(sender), int(receiver), amount)
+                assert ok[i]
+            except Reverted:
+                assert not ok[i]
+        assert (batched.balances == single.balances).all()
+        assert (batched.total_supply, batched.fees_paid) == (single.total_supply, single.fees_paid)
+        assert 0 < ok.sum() < len(ok)
+
+
+def test_replay_history(chain, token, crowdSale, owner, feeaddress, accounts, tmp_path_factory):
+    """
+    A history rebuilt from indexed Transfer logs replays to the chain's balances.
+    """
+    receiver, spender = accounts[3], accounts[4]
+    token.transfer(receiver, 100 * AMOUNT, sender=owner)
+    # 999 and 1001 both arrive as 999, only the batch totals tell them apart
+    token.transferBatch([receiver, accounts[5], accounts[6], accounts[7]], [999, 1001, 1000, 2 * AMOUNT + 1], sender=owner)
+    token.approve(spender, 5 * AMOUNT, sender=receiver)
+    token.transferFrom(receiver, accounts[8], AMOUNT, sender=spender)
+    token.transfer(feeaddress, 3 * AMOUNT, sender=receiver)
+    token.burn(AMOUNT, sender=receiver)
+    token.blacklist(accounts[9], True, sender=owner)
+    token.updateFees(3, 7, accounts[6], sender=owner)
+    token.transfer(accounts[9], 7 * AMOUNT + 333, sender=receiver)
+    token.transferBatch([receiver, accounts[8]], [12345, 10 ** 6], sender=accounts[7])
+    token.transfer(receiver, 10, sender=accounts[6])
+    token.mint(accounts[8], AMOUNT, sender=owner)
+
+    provider = AsyncEthereumTesterProvider()
+    provider.ethereum_tester = chain.provider.web3.provider.ethereum_tester
+    store = Store(tmp_path_factory.mktemp("simulator") / "kiwi.sqlite", "kiwi")
+    asyncio.run(Indexer(AsyncWeb3(provider), store, token.address, crowdSale.address).run(log=lambda _: None))
+
+    ops = load_history(store.db.execute("PRAGMA database_list").fetchone()[2], 1, 1, feeaddress.address, token.address)
+    assert [op[0] for op in ops].count("batch") == 2
+    sim = TokenSimulator(1, 1, feeaddress.address, owner.address, supply=0, token_address=token.address)
+    assert replay(sim, ops) == 0
+    for account in accounts:
+        assert sim.balance_of(sim.account(account.address)) == token.balanceOf(account)
+    assert sim.total_supply == token.totalSupply()
+
+    # The same history under other fees still runs and moves supply accordingly
+    proposed = TokenSimulator(10, 10, feeaddress.address, owner.address, supply=0, token_address=token.address)
+    replay(proposed, ops, fees=(10, 10))
+    assert proposed.burned > sim.burned
+    assert np.sum(proposed.balances) == proposed.total_supply
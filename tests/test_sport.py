@@ -2,6 +2,8 @@ import ape
 import pytest
 from ethpm_types.utils import HexBytes
 
+pytestmark = pytest.mark.evm
+
 # Standard test comes from the interpretation of EIP-20
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
@@ -17,6 +19,112 @@ def test_initial_state(token, sport, wallet, accounts, owner):
     assert token.balanceOf(to) == 0
     token.transfer(wallet, 10000, sender=owner)
     token.approve(sport.address, 1000, sender=wallet)
-    sport.transfer(wallet, to, 1000, sender=to)
+
+    # Only the house pays out its approved tokens
+    with ape.reverts("Access is denied."):
+        sport.transfer(wallet, to, 1000, sender=to)
+    sport.transfer(wallet, to, 1000, sender=wallet)
     
-    assert token.balanceOf(to) == 1000
\ No newline at end of file
+    # Token fees apply, 1/1000 txfee and 1/1000 burnfee
+    assert token.balanceOf(to) == 998
+
+    token.approve(sport.address, 1000, sender=to)
+    with ape.reverts("Only house funds can be transferred."):
+        sport.transfer(to, wallet, 1, sender=wallet)
+
+
+def _fund(token, sport, owner, players):
+    for player in players:
+        token.transfer(player, 10 ** 6, sender=owner)
+        token.approve(sport.address, 10 ** 6, sender=player)
+
+
+def test_bets(token, sport, wallet, accounts, owner):
+    """
+    Winners share the whole pool pro rata to their stakes, losers get nothing.
+    """
+    players = accounts[6:9]
+    _fund(token, sport, owner, players)
+    sport.createEvent(3, sender=wallet)
+    assert sport.eventInfo(0) == (3, 0, 0, 0, False)
+
+    # Stakes are the amounts received after fees
+    sport.placeBet(0, 1, 100000, sender=players[0])
+    sport.placeBet(0, 1, 300000, sender=players[1])
+    sport.placeBet(0, 2, 600000, sender=players[2])
+    assert sport.stakes(0, 1) == 399200
+    assert sport.stakes(0, 2) == 598800
+    bet = sport.bets(0, 1)
+    assert (bet & (2 ** 160 - 1), (bet >> 160) & (2 ** 88 - 1), bet >> 248) == (int(players[1].address, 16), 299400, 1)
+
+    with ape.reverts("Access is denied."):
+        sport.resolveBets(0, 1, sender=players[0])
+    with ape.reverts("Invalid outcome."):
+        sport.resolveBets(0, 3, sender=wallet)
+    assert sport.resolveBets.call(0, 1, sender=wallet) == 0
+    sport.resolveBets(0, 1, sender=wallet)
+    assert sport.eventInfo(0) == (3, 3, 3, 1, True)
+
+    pool = 399200 + 598800
+    assert sport.claimable(players[0]) == 99800 * pool // 399200
+    assert sport.claimable(players[1]) == 299400 * pool // 399200
+    assert sport.claimable(players[2]) == 0
+    with ape.reverts("Betting is closed."):
+        sport.placeBet(0, 1, 1000, sender=players[2])
+    with ape.reverts("Event resolved with another outcome."):
+        sport.resolveBets(0, 2, sender=wallet)
+
+    before = token.balanceOf(players[1])
+    payout = 299400 * pool // 399200
+    sport.claim(sender=players[1])
+    assert token.balanceOf(players[1]) - before == payout - 2 * (payout // 1000)
+    assert sport.claimable(players[1]) == 0
+    with ape.reverts("Nothing to claim."):
+        sport.claim(sender=players[1])
+
+
+def test_no_winner_refunds(token, sport, wallet, accounts, owner):
+    """
+    If nobody bet on the winning outcome every stake is refunded.
+    """
+    players = accounts[6:8]
+    _fund(token, sport, owner, players)
+    sport.createEvent(2, sender=wallet)
+    sport.placeBet(0, 0, 1000, sender=players[0])
+    sport.placeBet(0, 0, 5000, sender=players[1])
+    sport.resolveBets(0, 1, sender=wallet)
+    assert sport.claimable(players[0]) == 998
+    assert sport.claimable(players[1]) == 4990
+
+
+def test_invalid_events(sport, wallet, accounts):
+    with ape.reverts("Access is denied."):
+        sport.createEvent(2, sender=accounts[6])
+    with ape.reverts("Invalid number of outcomes."):
+        sport.createEvent(1, sender=wallet)
+    with ape.reverts("Invalid number of outcomes."):
+        sport.createEvent(17, sender=wallet)
+    # Unknown events have no outcomes to bet on
+    with ape.reverts("Invalid outcome."):
+        sport.placeBet(5, 0, 1000, sender=accounts[6])
+
+
+def test_resolve_in_batches(token, sport, wallet, accounts, owner):
+    """
+    Events with more than 500 bets settle over several resolveBets calls.
+    """
+    players = accounts[6:8]
+    _fund(token, sport, owner, players)
+    sport.createEvent(2, sender=wallet)
+    for i in range(502):
+        sport.placeBet(0, i % 2, 1000, sender=players[i % 2])
+
+    sport.resolveBets(0, 0, sender=wallet)
+    assert sport.eventInfo(0) == (2, 502, 500, 0, True)
+    assert sport.resolveBets.call(0, 0, sender=wallet) == 0
+    sport.resolveBets(0, 0, sender=wallet)
+    assert sport.eventInfo(0) == (2, 502, 502, 0, True)
+    # Settled bets are not credited twice
+    sport.resolveBets(0, 0, sender=wallet)
+    assert sport.claimable(players[0]) == 251 * 998 * 2
+    assert sport.claimable(players[1]) == 0
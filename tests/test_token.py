@@ -1,7 +1,13 @@
 import ape
 from ape.exceptions import ContractLogicError
+from eth_account import Account
+from eth_utils import keccak
 import pytest
 
+from relayer import columns, sign_authorization
+
+pytestmark = pytest.mark.evm
+
 # Standard test comes from the interpretation of EIP-20
 ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
 
@@ -84,17 +90,12 @@ def test_transfer(token, owner, receiver, feeaddress):
 
     # validate that Transfer Log is correct
     # https://docs.apeworx.io/ape/stable/methoddocs/api.html?highlight=decode#ape.api.networks.EcosystemAPI.decode_logs
+    # Fees round down to zero, so no fee or burn Transfer is logged
     logs = list(tx.decode_logs(token.Transfer))
-    assert len(logs) == 3
+    assert len(logs) == 1
     assert logs[0].sender == owner
-    assert logs[0].receiver == feeaddress
-    assert logs[0].amount == int(100 * 0.0001)
-    assert logs[1].sender == owner
-    assert logs[1].receiver == ZERO_ADDRESS
-    assert logs[1].amount == int(100 * 0.0001)
-    assert logs[2].sender == owner
-    assert logs[2].receiver == receiver
-    assert logs[2].amount == 100
+    assert logs[0].receiver == receiver
+    assert logs[0].amount == 100
 
     receiver_balance = token.balanceOf(receiver)
     assert receiver_balance == 100
@@ -114,6 +115,197 @@ def test_transfer(token, owner, receiver, feeaddress):
     tx = token.transfer(owner, 0, sender=owner)
 
 
+def test_transfer_fees(token, owner, receiver, feeaddress):
+    """
+    Transfer must charge txfee to the fee address and burn the burnfee.
+    Fee address transfers are not charged.
+    """
+    totalSupply = token.totalSupply()
+
+    tx = token.transfer(receiver, 10000, sender=owner)
+
+    logs = list(tx.decode_logs(token.Transfer))
+    assert len(logs) == 3
+    assert logs[0].sender == owner
+    assert logs[0].receiver == feeaddress
+    assert logs[0].amount == 10
+    assert logs[1].sender == owner
+    assert logs[1].receiver == ZERO_ADDRESS
+    assert logs[1].amount == 10
+    assert logs[2].sender == owner
+    assert logs[2].receiver == receiver
+    assert logs[2].amount == 9980
+
+    assert token.balanceOf(receiver) == 9980
+    assert token.balanceOf(feeaddress) == 10
+    assert token.totalSupply() == totalSupply - 10
+
+    tx = token.transfer(receiver, 10, sender=feeaddress)
+
+    logs = list(tx.decode_logs(token.Transfer))
+    assert len(logs) == 1
+    assert token.balanceOf(receiver) == 9990
+    assert token.balanceOf(feeaddress) == 0
+
+
+def test_lazy_fees(token, owner, accounts, feeaddress):
+    """
+    Lazy fees accrue in one counter, are visible in balanceOf(feeAddress)
+    and are credited on claim, on fee address change or when feeAddress spends.
+    """
+    receiver, spender = accounts[3], accounts[4]
+    fee_balance = token.balanceOf(feeaddress)
+    totalSupply = token.totalSupply()
+
+    with ape.reverts("Access is denied."):
+        token.setLazyFees(True, sender=receiver)
+    tx = token.setLazyFees(True, sender=owner)
+    assert token.lazyFees()
+    assert [log.enabled for log in tx.decode_logs(token.LazyFees)] == [True]
+
+    tx = token.transfer(receiver, 10000, sender=owner)
+    assert [log.amount for log in tx.decode_logs(token.Transfer)] == [10, 10, 9980]
+    token.approve(spender, 20000, sender=owner)
+    token.transferFrom(owner, receiver, 20000, sender=spender)
+    token.transferBatch([receiver, spender], [10000, 10000], sender=owner)
+
+    assert token.accruedFees() == 50
+    assert token.balanceOf(feeaddress) == fee_balance + 50
+    assert token.totalSupply() == totalSupply - 50
+    assert token.balanceOf(receiver) == 9980 * 4
+
+    # feeAddress can spend its accrued fees
+    token.transfer(receiver, fee_balance + 30, sender=feeaddress)
+    assert token.accruedFees() == 0
+    assert token.balanceOf(feeaddress) == 20
+
+    token.transfer(receiver, 10000, sender=owner)
+    assert token.claimFees.call(sender=receiver) == 10
+    token.claimFees(sender=receiver)
+    assert (token.accruedFees(), token.balanceOf(feeaddress)) == (0, 30)
+
+    # Accrued fees stay with the fee address they accrued for
+    token.transfer(receiver, 10000, sender=owner)
+    token.updateFees(1, 1, spender, sender=owner)
+    assert token.lazyFees()
+    assert token.balanceOf(feeaddress) == 40
+    assert token.balanceOf(spender) == 9980
+    token.transfer(receiver, 10000, sender=owner)
+    assert token.balanceOf(spender) == 9990
+
+    token.setLazyFees(False, sender=owner)
+    assert (token.accruedFees(), token.balanceOf(spender)) == (0, 9990)
+    token.updateFees(1, 1, feeaddress, sender=owner)
+    with ape.reverts():
+        token.setLazyFees(False, sender=owner)
+
+
+def test_checkpoints(chain, token, owner, accounts, feeaddress):
+    """
+    balanceOfAt returns the balance at the end of every block since the holder enabled checkpoints,
+    and totalSupplyAt the total supply since the owner enabled supply checkpoints.
+    """
+    holders = [owner, feeaddress] + list(accounts[3:6])
+    with ape.reverts("Checkpoints are disabled."):
+        token.totalSupplyAt(0)
+    token.transfer(accounts[3], 10000, sender=owner)
+
+    # Holders opting in do not start the total supply checkpoints, only the owner does
+    token.enableCheckpoints(sender=accounts[9])
+    assert token.checkpointsFrom(ZERO_ADDRESS) == 0
+    with ape.reverts("Access is denied."):
+        token.enableSupplyCheckpoints(sender=accounts[9])
+    tx = token.enableSupplyCheckpoints(sender=owner)
+    assert token.checkpointsFrom(ZERO_ADDRESS) == tx.block_number
+    assert [(log.holder, log.fromBlock) for log in tx.decode_logs(token.CheckpointsEnabled)] == [(ZERO_ADDRESS, tx.block_number)]
+    with ape.reverts("Checkpoints are already enabled."):
+        token.enableSupplyCheckpoints(sender=owner)
+
+    for holder in holders:
+        tx = token.enableCheckpoints(sender=holder)
+        assert token.checkpointsFrom(holder) == tx.block_number
+        assert [(log.holder, log.fromBlock) for log in tx.decode_logs(token.CheckpointsEnabled)] == [(holder, tx.block_number)]
+    with ape.reverts("Checkpoints are already enabled."):
+        token.enableCheckpoints(sender=owner)
+    start = tx.block_number
+    history = {start: ([token.balanceOf(h) for h in holders], token.totalSupply())}
+
+    calls = [
+        # A self-transfer only loses the fees, also as the first update since enabling
+        lambda: token.transfer(accounts[3], 3000, sender=accounts[3]),
+        lambda: token.transfer(accounts[4], 5000, sender=accounts[3]),
+        lambda: token.transferBatch([accounts[5], accounts[5], accounts[3]], [100, 200, 3000], sender=owner),
+        lambda: token.mint(accounts[4], 7777, sender=owner),
+        lambda: token.burn(1000, sender=accounts[4]),
+        lambda: token.approve(accounts[5], 4000, sender=accounts[3]),
+        lambda: token.transferFrom(accounts[3], accounts[5], 2000, sender=accounts[5]),
+        lambda: token.transferFrom(accounts[3], accounts[3], 1000, sender=accounts[5]),
+        lambda: token.transfer(accounts[3], 10, sender=feeaddress),
+        lambda: token.transfer(accounts[8], 500, sender=accounts[4]),
+    ]
+    for call in calls:
+        tx = call()
+        history[tx.block_number] = ([token.balanceOf(h) for h in holders], token.totalSupply())
+    chain.mine()
+
+    # Both credits to the same receiver in one batch share a checkpoint, after the one from enabling
+    assert token.numCheckpoints(accounts[5]) == 3
+
+    previous = None
+    for block in range(start, chain.blocks.head.number):
+        previous = history.get(block, previous)
+        balances, supply = previous
+        assert [token.balanceOfAt(h, block) for h in holders] == balances, block
+        assert token.totalSupplyAt(block) == supply, block
+
+    # Holders that did not enable checkpoints have none, even after receiving tokens
+    assert token.numCheckpoints(accounts[8]) == 0
+    assert token.checkpointsFrom(accounts[8]) == 0
+    with ape.reverts("Checkpoints are disabled."):
+        token.balanceOfAt(accounts[8], start)
+    with ape.reverts("Block is before checkpoints were enabled."):
+        token.balanceOfAt(accounts[5], token.checkpointsFrom(accounts[5]) - 1)
+    with ape.reverts("Block is not yet mined."):
+        token.totalSupplyAt(chain.blocks.head.number + 1)
+
+
+def test_transfer_batch(token, owner, accounts, feeaddress):
+    """
+    Batch transfer must credit every receipient like a single transfer.
+    Fees and burns are settled once for the whole batch.
+    Must trigger one Transfer Event per receipient.
+    """
+    receivers = accounts[6:9]
+    amounts = [1000, 2000, 3000]
+    totalSupply = token.totalSupply()
+
+    tx = token.transferBatch(receivers, amounts, sender=owner)
+
+    logs = list(tx.decode_logs(token.Transfer))
+    assert len(logs) == 5
+    for log, receiver, amount in zip(logs, receivers, amounts):
+        assert log.sender == owner
+        assert log.receiver == receiver
+        assert log.amount == amount - 2 * amount // 1000
+    assert logs[3].receiver == feeaddress
+    assert logs[3].amount == 6
+    assert logs[4].receiver == ZERO_ADDRESS
+    assert logs[4].amount == 6
+
+    assert [token.balanceOf(r) for r in receivers] == [998, 1996, 2994]
+    assert token.balanceOf(feeaddress) == 6
+    assert token.balanceOf(owner) == 10000000000000 * 10 ** 18 - 6000
+    assert token.totalSupply() == totalSupply - 6
+
+    # Lengths must match
+    with ape.reverts():
+        token.transferBatch(receivers, amounts[:2], sender=owner)
+
+    # Cannot send more than the balance in total
+    with ape.reverts():
+        token.transferBatch(receivers[:2], [1000, 2000], sender=receivers[0])
+
+
 def test_transfer_from(token, owner, accounts):
     """
     Transfer tokens to an address.
@@ -147,16 +339,10 @@ def test_transfer_from(token, owner, accounts):
     tx = token.transferFrom(owner, receiver, 200, sender=spender)
 
     logs = list(tx.decode_logs(token.Transfer))
-    assert len(logs) == 3
+    assert len(logs) == 1
     assert logs[0].sender == owner
-    assert logs[0].receiver == feeaddress
-    assert logs[0].amount == int(200 * 0.0001)
-    assert logs[1].sender == owner
-    assert logs[1].receiver == '0x0000000000000000000000000000000000000000'
-    assert logs[1].amount == int(200 * 0.0001)
-    assert logs[2].sender == owner
-    assert logs[2].receiver == receiver
-    assert logs[2].amount == 200
+    assert logs[0].receiver == receiver
+    assert logs[0].amount == 200
 
     assert token.allowance(owner, spender) == 100
 
@@ -201,6 +387,97 @@ def test_approve(token, owner, receiver):
     assert token.allowance(owner, spender) == 0
 
 
+def test_max_allowance(chain, token, owner, receiver, accounts, Permit):
+    """
+    An allowance of max uint256 is not decreased by transferFrom or
+    permitAndTransferFrom, and transferFrom never logs Approval.
+    """
+    spender = accounts[3]
+    token.approve(spender, 2 ** 256 - 1, sender=owner)
+
+    tx = token.transferFrom(owner, receiver, 200, sender=spender)
+    assert len(list(tx.decode_logs(token.Approval))) == 0
+    assert token.allowance(owner, spender) == 2 ** 256 - 1
+    assert token.balanceOf(receiver) == 200
+
+    # Any other allowance is decreased as before
+    token.approve(spender, 2 ** 256 - 2, sender=owner)
+    tx = token.transferFrom(owner, receiver, 200, sender=spender)
+    assert len(list(tx.decode_logs(token.Approval))) == 0
+    assert token.allowance(owner, spender) == 2 ** 256 - 202
+
+    relayer = accounts[4]
+    deadline = chain.pending_timestamp + 60
+    permit = Permit(owner.address, relayer.address, 2 ** 256 - 1, token.nonces(owner), deadline)
+    signature = owner.sign_message(permit.signable_message).encode_rsv()
+    tx = token.permitAndTransferFrom(owner, receiver, 100, 2 ** 256 - 1, deadline, signature, sender=relayer)
+    assert list(tx.decode_logs(token.Approval))[0].amount == 2 ** 256 - 1
+    assert token.allowance(owner, relayer) == 2 ** 256 - 1
+
+
+def test_operators(token, owner, receiver, accounts):
+    """
+    Registered operators pull without allowance only from holders that approved them.
+    Allowances stay untouched and no Approval is logged. Only the owner registers operators.
+    """
+    operator, holder, other = accounts[3], accounts[4], accounts[6]
+    token.transfer(holder, 1000, sender=owner)
+    token.transfer(other, 1000, sender=owner)
+    token.approve(operator, 50, sender=holder)
+
+    with ape.reverts("Access is denied."):
+        token.setOperator(operator, True, sender=operator)
+    with ape.reverts("Cannot add zero address as operator."):
+        token.setOperator(ZERO_ADDRESS, True, sender=owner)
+    with ape.reverts("Cannot approve zero address as operator."):
+        token.approveOperator(ZERO_ADDRESS, True, sender=holder)
+
+    tx = token.setOperator(operator, True, sender=owner)
+    logs = list(tx.decode_logs(token.UpdateOperator))
+    assert len(logs) == 1
+    assert logs[0].operator == operator and logs[0].enabled
+    assert token.isOperator(operator)
+
+    # Registration alone does not let the operator pull from anyone
+    assert not token.isOperatorFor(operator, holder)
+    with ape.reverts():
+        token.transferFrom(other, receiver, 100, sender=operator)
+    with ape.reverts():
+        token.transferFrom(holder, receiver, 300, sender=operator)
+
+    tx = token.approveOperator(operator, True, sender=holder)
+    logs = list(tx.decode_logs(token.OperatorApproval))
+    assert len(logs) == 1
+    assert (logs[0].holder, logs[0].operator, logs[0].approved) == (holder, operator, True)
+    assert token.isOperatorFor(operator, holder) and not token.isOperatorFor(operator, other)
+
+    tx = token.transferFrom(holder, receiver, 300, sender=operator)
+    assert len(list(tx.decode_logs(token.Approval))) == 0
+    assert token.allowance(holder, operator) == 50
+    assert token.balanceOf(receiver) == 300
+
+    # Roles share a word: blacklisting and minting are unaffected, a blacklisted operator cannot pull
+    token.addMinter(operator, sender=owner)
+    token.blacklist(operator, True, sender=owner)
+    assert token.isOperator(operator) and token.isMinter(operator) and token.blackListAddresses(operator)
+    with ape.reverts():
+        token.transferFrom(holder, receiver, 100, sender=operator)
+    token.blacklist(operator, False, sender=owner)
+
+    # Withdrawing either the registration or the approval falls back to the allowance
+    token.approveOperator(operator, False, sender=holder)
+    with ape.reverts():
+        token.transferFrom(holder, receiver, 100, sender=operator)
+    token.approveOperator(operator, True, sender=holder)
+    token.setOperator(operator, False, sender=owner)
+    assert not token.isOperator(operator) and token.isMinter(operator)
+    assert not token.isOperatorFor(operator, holder)
+    with ape.reverts():
+        token.transferFrom(holder, receiver, 100, sender=operator)
+    token.transferFrom(holder, receiver, 50, sender=operator)
+    assert token.allowance(holder, operator) == 0
+
+
 def test_mint(token, owner, receiver):
     """
     Create an approved amount of tokens.
@@ -297,6 +574,45 @@ def test_permit(chain, token, owner, receiver, Permit):
     token.permit(owner, receiver, amount, deadline, signature, sender=receiver)
 
     assert token.allowance(owner, receiver) == 100
+    assert token.DOMAIN_SEPARATOR() == permit.signable_message.header
+
+
+def test_permit_and_transfer_from(chain, token, owner, receiver, feeaddress, accounts, Permit):
+    """
+    Permit and transferFrom in one call by the spender the Permit is signed for.
+    """
+    relayer = accounts[3]
+    amount, value = 10 ** 6, 2 * 10 ** 6
+    fee = amount // 1000  # txfee and burnfee are 1/1000
+    nonce = token.nonces(owner)
+    deadline = chain.pending_timestamp + 60
+    permit = Permit(owner.address, relayer.address, value, nonce, deadline)
+    signature = owner.sign_message(permit.signable_message).encode_rsv()
+
+    with ape.reverts():
+        token.permitAndTransferFrom(owner, receiver, amount, value, deadline, signature, sender=receiver)
+    with ape.reverts():
+        token.permitAndTransferFrom(owner, receiver, amount, value + 1, deadline, signature, sender=relayer)
+    with ape.reverts():
+        token.permitAndTransferFrom(owner, receiver, 3 * 10 ** 6, value, deadline, signature, sender=relayer)
+
+    owner_balance = token.balanceOf(owner)
+    tx = token.permitAndTransferFrom(owner, receiver, amount, value, deadline, signature, sender=relayer)
+
+    assert token.balanceOf(owner) == owner_balance - amount
+    assert token.balanceOf(receiver) == amount - 2 * fee
+    assert token.balanceOf(feeaddress) == fee
+    assert token.allowance(owner, relayer) == value - (amount - 2 * fee)
+    assert token.nonces(owner) == nonce + 1
+
+    approvals = list(tx.decode_logs(token.Approval))
+    assert len(approvals) == 1
+    assert approvals[0].amount == value - (amount - 2 * fee)
+    assert len(list(tx.decode_logs(token.Transfer))) == 3
+
+    # The Permit is used up
+    with ape.reverts():
+        token.permitAndTransferFrom(owner, receiver, amount, value, deadline, signature, sender=relayer)
 
 
 def test_updateFees(token, owner, feeaddress):
@@ -329,7 +645,11 @@ def test_updateFees(token, owner, feeaddress):
     assert logs[0].txfee == 10
     assert logs[0].txfee == 10
     assert logs[0].feeAddress == feeAddress
-    
+
+    # Fees are expressed in 1/1000 and cannot exceed 100%
+    with ape.reverts():
+        token.updateFees(1001, 10, feeaddress, sender=owner)
+
     
 def test_blacklist(token, owner, accounts):
     """
@@ -359,6 +679,40 @@ def test_blacklist(token, owner, accounts):
     assert len(logs) == 1
     assert logs[0].blackListed == spender
     assert logs[0].value == True
+
+    with ape.reverts("Access is denied."):
+        token.blacklist(receiver, True, sender=spender)
+
+
+def test_blacklist_packed(token, owner, accounts):
+    """
+    Bulk blacklist skips addresses already in the requested state.
+    """
+
+    listed = [a.address for a in accounts[4:8]]
+    packed = b"".join(bytes.fromhex(a[2:]) for a in listed)
+    token.blacklist(listed[0], True, sender=owner)
+
+    assert token.blacklistPacked.call(packed, True, sender=owner) == 3
+    tx = token.blacklistPacked(packed, True, sender=owner)
+    assert all(token.blackListAddresses(a) for a in listed)
+    logs = list(tx.decode_logs(token.Blacklist))
+    assert len(logs) == 3
+    assert all(log.value for log in logs)
+
+    assert token.blacklistPacked.call(packed, True, sender=owner) == 0
+    tx = token.blacklistPacked(packed, True, sender=owner)
+    assert not list(tx.decode_logs(token.Blacklist))
+
+    assert token.blacklistPacked.call(packed[:40], False, sender=owner) == 2
+    token.blacklistPacked(packed[:40], False, sender=owner)
+    assert [token.blackListAddresses(a) for a in listed] == [False, False, True, True]
+
+    with ape.reverts("Addresses must be packed as 20 bytes each."):
+        token.blacklistPacked(packed[:30], True, sender=owner)
+    with ape.reverts("Access is denied."):
+        token.blacklistPacked(packed, False, sender=accounts[4])
+    token.blacklistPacked(packed, False, sender=owner)
     
     
 def test_transferOwnership(token, owner, accounts):
@@ -381,4 +735,101 @@ def test_transferOwnership(token, owner, accounts):
     logs = list(tx.decode_logs(token.OwnershipTransferred))
     assert len(logs) == 1
     assert logs[0].previousOwner == owner
-    assert logs[0].newOwner == newOwner
\ No newline at end of file
+    assert logs[0].newOwner == newOwner
+
+def _authorizer(name):
+    key = keccak(text=name)
+    return key, Account.from_key(key).address
+
+
+def test_transfer_with_authorization(chain, token, owner, receiver, feeaddress, accounts):
+    """
+    Anyone submits a transfer signed by its authorizer, once per random nonce, within its validity window.
+    """
+    key, authorizer = _authorizer("authorizer")
+    token.transfer(authorizer, 10020, sender=owner)  # 10000 after fees
+    domain = token.DOMAIN_SEPARATOR()
+    valid_before = chain.pending_timestamp + 3600
+    submitter = accounts[4]
+
+    authorization = sign_authorization(key, domain, receiver.address, 1000, valid_before)
+    assert not token.authorizationState(authorizer, authorization.nonce)
+    tx = token.transferWithAuthorization(*authorization, sender=submitter)
+    logs = list(tx.decode_logs(token.AuthorizationUsed))
+    assert len(logs) == 1
+    assert logs[0].authorizer == authorizer and logs[0].nonce == authorization.nonce
+    assert token.authorizationState(authorizer, authorization.nonce)
+    # Fees apply as in transfer
+    assert [log.amount for log in tx.decode_logs(token.Transfer)] == [1, 1, 998]
+    assert token.balanceOf(receiver) == 998
+    assert token.balanceOf(authorizer) == 9000
+
+    with ape.reverts("Authorization is used."):
+        token.transferWithAuthorization(*authorization, sender=submitter)
+
+    # Nonces are not ordered, a later signature is valid first
+    first = sign_authorization(key, domain, receiver.address, 100, valid_before)
+    second = sign_authorization(key, domain, receiver.address, 200, valid_before)
+    token.transferWithAuthorization(*second, sender=submitter)
+    token.transferWithAuthorization(*first, sender=submitter)
+    assert token.balanceOf(authorizer) == 8700
+
+    with ape.reverts("Authorization is not yet valid."):
+        late = sign_authorization(key, domain, receiver.address, 100, valid_before, valid_after=valid_before - 1)
+        token.transferWithAuthorization(*late, sender=submitter)
+    with ape.reverts("Authorization is expired."):
+        expired = sign_authorization(key, domain, receiver.address, 100, chain.pending_timestamp - 1)
+        token.transferWithAuthorization(*expired, sender=submitter)
+    forged = sign_authorization(key, domain, receiver.address, 100, valid_before)._replace(amount=101)
+    with ape.reverts("Invalid signature."):
+        token.transferWithAuthorization(*forged, sender=submitter)
+
+    token.blacklist(authorizer, True, sender=owner)
+    with ape.reverts():
+        token.transferWithAuthorization(*sign_authorization(key, domain, receiver.address, 1, valid_before), sender=submitter)
+
+
+def test_transfer_with_authorizations(chain, token, owner, receiver, feeaddress, accounts):
+    """
+    A batch applies every valid authorization, skips the others and settles fees once.
+    """
+    domain = token.DOMAIN_SEPARATOR()
+    valid_before = chain.pending_timestamp + 3600
+    signers = [_authorizer(f"authorizer {i}") for i in range(3)]
+    for _, authorizer in signers:
+        token.transfer(authorizer, 10020, sender=owner)  # 10000 after fees
+    (key0, a0), (key1, a1), (key2, a2) = signers
+    fee_balance = token.balanceOf(feeaddress)
+    supply = token.totalSupply()
+
+    used = sign_authorization(key0, domain, receiver.address, 1000, valid_before)
+    token.transferWithAuthorization(*used, sender=receiver)
+    batch = [
+        sign_authorization(key0, domain, receiver.address, 2000, valid_before),
+        used,
+        sign_authorization(key1, domain, accounts[6].address, 3000, valid_before),
+        sign_authorization(key1, domain, accounts[6].address, 10 ** 6, valid_before),
+        sign_authorization(key2, domain, accounts[6].address, 500, valid_before)._replace(amount=499),
+        sign_authorization(key2, domain, accounts[6].address, 700, valid_before)._replace(signature=b"\x01" * 64),
+        sign_authorization(key2, domain, accounts[6].address, 999, valid_before),
+        sign_authorization(key2, domain, ZERO_ADDRESS, 1, valid_before),
+    ]
+    assert token.transferWithAuthorizations.call(*columns(batch), sender=accounts[4]) == 3
+    tx = token.transferWithAuthorizations(*columns(batch), sender=accounts[4])
+
+    logs = list(tx.decode_logs(token.AuthorizationUsed))
+    assert [(log.authorizer, log.nonce) for log in logs] == [(a0, batch[0].nonce), (a1, batch[2].nonce), (a2, batch[6].nonce)]
+    assert token.balanceOf(a0) == 10000 - 3000
+    assert token.balanceOf(a1) == 10000 - 3000
+    assert token.balanceOf(a2) == 10000 - 999
+    assert token.balanceOf(accounts[6]) == 2994 + 999
+    # Fees rounded per authorization: 1000 and 2000 transfers pay 1 and 2, 999 pays none
+    assert token.balanceOf(feeaddress) == fee_balance + 1 + 2 + 3
+    assert token.totalSupply() == supply - 1 - 2 - 3
+    assert not token.authorizationState(a1, batch[3].nonce)
+    # A signature shorter than 65 bytes is skipped like any invalid one
+    assert not token.authorizationState(a2, batch[5].nonce)
+
+    token.pause(sender=owner)
+    with ape.reverts():
+        token.transferWithAuthorizations(*columns(batch[3:4]), sender=accounts[4])